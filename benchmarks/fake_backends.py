@@ -0,0 +1,490 @@
+"""
+In-memory fakes of the Cloud Storage and Data Catalog clients used by the
+benchmarks. Every RPC is counted, and can be slowed down, throttled or
+failed, to reproduce the behaviour of the real services without network.
+"""
+import collections
+import datetime
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+
+import grpc
+from google.api_core import exceptions
+from google.cloud import datacatalog_v1
+
+
+class FakeServiceConfig:
+    """
+    `latency` is the duration of every RPC, in seconds. `error_rate` is the
+    share of RPCs failing with UNAVAILABLE. `quota` is the number of RPCs
+    allowed per second, further RPCs fail with RESOURCE_EXHAUSTED; 0 means
+    unlimited.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, quota=0, page_size=1000, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota = quota
+        self.page_size = page_size
+        self.seed = seed
+
+
+class FakeService:
+    """
+    Base of the fake clients: counts the RPCs by method and status code and
+    applies the configured quota and error rate.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.rpc_counts = collections.Counter()
+        self.error_counts = collections.Counter()
+        self.__lock = threading.Lock()
+        self.__random = random.Random(config.seed)
+        self.__quota_window = 0
+        self.__quota_used = 0
+        # Set on the threads completing gRPC futures, where the latency is
+        # already simulated by the scheduling of the completion.
+        self.timer_thread = threading.local()
+
+    @property
+    def rpc_total(self):
+        return sum(self.rpc_counts.values())
+
+    def _rpc(self, method):
+        # Raises the injected error, if any, after the RPC latency.
+        error = self._admit(method)
+        if self.config.latency and not getattr(self.timer_thread, 'active', False):
+            time.sleep(self.config.latency)
+        if error:
+            raise error
+
+    def _admit(self, method):
+        with self.__lock:
+            self.rpc_counts[method] += 1
+            error = None
+            if self.config.quota:
+                window = int(time.monotonic())
+                if window != self.__quota_window:
+                    self.__quota_window = window
+                    self.__quota_used = 0
+                self.__quota_used += 1
+                if self.__quota_used > self.config.quota:
+                    error = exceptions.ResourceExhausted(f'Quota exceeded for {method}')
+            if not error and self.__random.random() < self.config.error_rate:
+                error = exceptions.ServiceUnavailable(f'{method} is unavailable')
+            if error:
+                self.error_counts[f'{method}:{error.code}'] += 1
+            return error
+
+
+class FakeBlob:
+    __slots__ = ('name', 'size', 'time_created', 'updated')
+
+    def __init__(self, name, size, time_created, updated):
+        self.name = name
+        self.size = size
+        self.time_created = time_created
+        self.updated = updated
+
+    def to_resource(self):
+        # JSON API representation, as given to the item_to_value of listings.
+        return {
+            'name': self.name,
+            'size': str(self.size),
+            'timeCreated': self.time_created.isoformat().replace('+00:00', 'Z'),
+            'updated': self.updated.isoformat().replace('+00:00', 'Z')
+        }
+
+
+class FakeBucket:
+    """
+    Bucket of `objects_count` generated objects, spread over `directories`
+    top level prefixes and numbered from `first_index`, so that object names
+    are unique across buckets. Blobs are generated on demand, so the dataset
+    costs no memory until listed.
+    """
+
+    __BASE_TIME = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def __init__(self, name, objects_count, directories=16, first_index=0):
+        self.name = name
+        self.objects_count = objects_count
+        self.directories = max(1, directories)
+        self.first_index = first_index
+
+    def select(self, prefix):
+        # Returns the indexes of the objects under `prefix`.
+        if not prefix:
+            return range(self.objects_count)
+        for directory in range(self.directories):
+            if prefix == self.__directory_name(directory):
+                return range(directory, self.objects_count, self.directories)
+        return range(0)
+
+    def make_blob(self, index):
+        number = self.first_index + index
+        name = f'{self.__directory_name(index % self.directories)}file{number:09d}.csv'
+        return FakeBlob(name, number % 100000, self.__BASE_TIME,
+                        self.__BASE_TIME + datetime.timedelta(seconds=number))
+
+    def list_directories(self):
+        return [self.__directory_name(directory) for directory in range(self.directories)]
+
+    @classmethod
+    def __directory_name(cls, directory):
+        return f'dir{directory:04d}/'
+
+
+class FakePageIterator:
+    """
+    Mimics the page iterators of google-api-core: `pages`, starting at
+    `next_page_token`, `item_to_value` and, for blob listings, `prefixes`.
+    """
+
+    def __init__(self, service, method, items, make_item, page_size, page_token=None):
+        self.prefixes = set()
+        self.next_page_token = page_token
+        # When set, gets the JSON API representation of the items.
+        self.item_to_value = None
+        self.__service = service
+        self.__method = method
+        self.__items = items
+        self.__make_item = make_item
+        self.__page_size = page_size
+
+    @property
+    def pages(self):
+        for start in range(int(self.next_page_token or 0), len(self.__items), self.__page_size):
+            self.__service._rpc(self.__method)
+            end = start + self.__page_size
+            self.next_page_token = str(end) if end < len(self.__items) else None
+            page = [self.__make_item(item) for item in self.__items[start:end]]
+            if self.item_to_value:
+                page = [self.item_to_value(self, item.to_resource()) for item in page]
+            yield page
+
+        if not self.__items:
+            self.__service._rpc(self.__method)
+
+    def __iter__(self):
+        for page in self.pages:
+            yield from page
+
+
+class FakeStorageClient(FakeService):
+    """
+    Fake of google.cloud.storage.Client over generated buckets.
+    """
+
+    def __init__(self, config, buckets):
+        super().__init__(config)
+        self.__buckets = {bucket.name: bucket for bucket in buckets}
+
+    def get_bucket(self, name):
+        self._rpc('get_bucket')
+        if name not in self.__buckets:
+            raise exceptions.NotFound(f'Bucket {name} not found')
+        return self.__buckets[name]
+
+    def list_buckets(self, prefix=None, project=None):
+        buckets = [
+            bucket for name, bucket in sorted(self.__buckets.items())
+            if not prefix or name.startswith(prefix)
+        ]
+        return FakePageIterator(self, 'list_buckets', buckets, lambda bucket: bucket,
+                                self.config.page_size)
+
+    def list_blobs(self,
+                   bucket,
+                   prefix=None,
+                   delimiter=None,
+                   page_token=None,
+                   page_size=None,
+                   **kwargs):
+        bucket = self.__buckets[bucket if isinstance(bucket, str) else bucket.name]
+        indexes = bucket.select(prefix)
+        iterator = FakePageIterator(self, 'list_blobs', indexes, bucket.make_blob,
+                                    min(page_size or self.config.page_size,
+                                        self.config.page_size), page_token)
+        if delimiter and not prefix:
+            # Every object lives in a top level directory.
+            iterator = FakePageIterator(self, 'list_blobs', range(0), bucket.make_blob,
+                                        self.config.page_size)
+            iterator.prefixes.update(bucket.list_directories())
+        return iterator
+
+
+class FakeDataCatalogClient(datacatalog_v1.DataCatalogClient, FakeService):
+    """
+    Fake of datacatalog_v1.DataCatalogClient keeping Entry Groups, Tag
+    Templates, Entries and Tags in memory. `transport` provides the gRPC
+    futures used by the asyncio engine.
+    """
+
+    __ENTRY_ID_REGEX = r'^[a-zA-Z_][a-zA-Z\d_]{0,63}$'
+
+    def __init__(self, config):
+        FakeService.__init__(self, config)
+        self.entry_groups = {}
+        self.tag_templates = {}
+        self.entries = {}
+        self.tags = collections.defaultdict(list)
+        self.__tag_ids = itertools.count()
+        self.__lock = threading.Lock()
+        self.__transport = FakeDataCatalogTransport(self)
+
+    @property
+    def transport(self):
+        return self.__transport
+
+    def populate(self, entry_group_name, system, objects_count):
+        """
+        Create `objects_count` Entries without going through the RPCs, e.g.
+        to benchmark the cleanup of obsolete Entries.
+        """
+        self.entry_groups[entry_group_name] = datacatalog_v1.types.EntryGroup(
+            name=entry_group_name)
+        for index in range(objects_count):
+            entry_name = f'{entry_group_name}/entries/file{index:09d}'
+            self.entries[entry_name] = datacatalog_v1.types.Entry(
+                name=entry_name,
+                user_specified_system=system,
+                linked_resource=f'gs://populated/file{index:09d}.csv')
+
+    def get_entry_group(self, name, **kwargs):
+        self._rpc('get_entry_group')
+        if name not in self.entry_groups:
+            raise exceptions.PermissionDenied(f'Entry Group {name} not found')
+        return self.entry_groups[name]
+
+    def create_entry_group(self, parent, entry_group_id, entry_group, **kwargs):
+        self._rpc('create_entry_group')
+        entry_group.name = f'{parent}/entryGroups/{entry_group_id}'
+        self.entry_groups[entry_group.name] = entry_group
+        return entry_group
+
+    def update_entry_group(self, entry_group, update_mask=None, **kwargs):
+        self._rpc('update_entry_group')
+        self.entry_groups[entry_group.name] = entry_group
+        return entry_group
+
+    def delete_entry_group(self, name, **kwargs):
+        self._rpc('delete_entry_group')
+        if any(entry_name.startswith(f'{name}/') for entry_name in self.entries):
+            raise exceptions.FailedPrecondition(f'Entry Group {name} is not empty')
+        self.entry_groups.pop(name, None)
+
+    def get_tag_template(self, name, **kwargs):
+        self._rpc('get_tag_template')
+        if name not in self.tag_templates:
+            raise exceptions.PermissionDenied(f'Tag Template {name} not found')
+        return self.tag_templates[name]
+
+    def create_tag_template(self, parent, tag_template_id, tag_template, **kwargs):
+        self._rpc('create_tag_template')
+        tag_template.name = f'{parent}/tagTemplates/{tag_template_id}'
+        self.tag_templates[tag_template.name] = tag_template
+        return tag_template
+
+    def get_entry(self, name, **kwargs):
+        self._rpc('get_entry')
+        if name not in self.entries:
+            raise exceptions.PermissionDenied(f'Entry {name} not found')
+        return self.entries[name]
+
+    def create_entry(self, parent, entry_id, entry, **kwargs):
+        self._rpc('create_entry')
+        if not re.match(self.__ENTRY_ID_REGEX, entry_id):
+            raise exceptions.InvalidArgument(f'Invalid entry id: {entry_id}')
+        entry.name = f'{parent}/entries/{entry_id}'
+        with self.__lock:
+            if entry.name in self.entries:
+                raise exceptions.AlreadyExists(f'Entry {entry.name} already exists')
+            self.entries[entry.name] = entry
+        return entry
+
+    def update_entry(self, entry, update_mask=None, **kwargs):
+        self._rpc('update_entry')
+        self.entries[entry.name] = entry
+        return entry
+
+    def delete_entry(self, name, **kwargs):
+        self._rpc('delete_entry')
+        with self.__lock:
+            if self.entries.pop(name, None) is None:
+                raise exceptions.PermissionDenied(f'Entry {name} not found')
+            self.tags.pop(name, None)
+
+    def list_entries(self, parent, page_size=None, **kwargs):
+        entries = [
+            entry for entry_name, entry in list(self.entries.items())
+            if entry_name.startswith(f'{parent}/entries/')
+        ]
+        return FakePageIterator(self, 'list_entries', entries, lambda entry: entry, page_size
+                                or self.config.page_size)
+
+    def list_tags(self, parent, **kwargs):
+        tags = list(self.tags.get(parent, []))
+        return FakePageIterator(self, 'list_tags', tags, lambda tag: tag, self.config.page_size)
+
+    def create_tag(self, parent, tag, **kwargs):
+        self._rpc('create_tag')
+        tag.name = f'{parent}/tags/{next(self.__tag_ids)}'
+        with self.__lock:
+            self.tags[parent].append(tag)
+        return tag
+
+    def update_tag(self, tag, update_mask=None, **kwargs):
+        self._rpc('update_tag')
+        entry_name = tag.name.split('/tags/')[0]
+        with self.__lock:
+            self.tags[entry_name] = [
+                tag if current_tag.name == tag.name else current_tag
+                for current_tag in self.tags[entry_name]
+            ]
+        return tag
+
+
+class FakeRpcError(grpc.RpcError, grpc.Call):
+    """
+    gRPC error carrying the status code of an api_core exception, as the
+    client transport would raise it.
+    """
+
+    def __init__(self, error):
+        self.__error = error
+
+    def code(self):
+        return self.__error.grpc_status_code
+
+    def details(self):
+        return self.__error.message
+
+    def initial_metadata(self):
+        return None
+
+    def trailing_metadata(self):
+        return None
+
+    def is_active(self):
+        return False
+
+    def time_remaining(self):
+        return None
+
+    def cancel(self):
+        return False
+
+    def add_callback(self, callback):
+        return False
+
+
+class FakeGrpcFuture:
+
+    def __init__(self):
+        self.__callbacks = []
+        self.__result = None
+        self.__exception = None
+
+    def resolve(self, result=None, exception=None):
+        self.__result = result
+        self.__exception = exception
+        for callback in self.__callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        self.__callbacks.append(callback)
+
+    def exception(self):
+        return self.__exception
+
+    def result(self):
+        if self.__exception:
+            raise self.__exception
+        return self.__result
+
+
+class FakeDataCatalogTransport:
+    """
+    Exposes `<method>.future(request, timeout)` like the gRPC stubs of the
+    client transport. Calls complete after the configured latency on a single
+    timer thread, so any number of them can be in flight.
+    """
+
+    __METHODS = {
+        'create_entry': lambda client, request: client.create_entry(
+            request.parent, request.entry_id, request.entry),
+        'get_entry': lambda client, request: client.get_entry(request.name),
+        'update_entry': lambda client, request: client.update_entry(request.entry),
+        'delete_entry': lambda client, request: client.delete_entry(request.name),
+        'list_tags': lambda client, request: ListTagsResponse(client.list_tags(request.parent)),
+        'create_tag': lambda client, request: client.create_tag(request.parent, request.tag),
+        'update_tag': lambda client, request: client.update_tag(request.tag),
+    }
+
+    def __init__(self, client):
+        self.__client = client
+        self.__timer = _Timer()
+
+    def __getattr__(self, method):
+        if method not in self.__METHODS:
+            raise AttributeError(method)
+        return _FakeStub(self.__client, self.__timer, self.__METHODS[method])
+
+
+class ListTagsResponse:
+
+    def __init__(self, tags):
+        self.tags = tags
+
+
+class _FakeStub:
+
+    def __init__(self, client, timer, function):
+        self.__client = client
+        self.__timer = timer
+        self.__function = function
+
+    def future(self, request, timeout=None):
+        future = FakeGrpcFuture()
+        self.__timer.schedule(self.__client.config.latency, self.__complete, future, request)
+        return future
+
+    def __complete(self, future, request):
+        self.__client.timer_thread.active = True
+        try:
+            result = self.__function(self.__client, request)
+        except exceptions.GoogleAPICallError as e:
+            future.resolve(exception=FakeRpcError(e))
+            return
+        future.resolve(result)
+
+
+class _Timer:
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__heap = []
+        self.__sequence = itertools.count()
+        thread = threading.Thread(target=self.__run, daemon=True)
+        thread.start()
+
+    def schedule(self, delay, function, *args):
+        with self.__condition:
+            heapq.heappush(self.__heap,
+                           (time.monotonic() + delay, next(self.__sequence), function, args))
+            self.__condition.notify()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                while not self.__heap or self.__heap[0][0] > time.monotonic():
+                    timeout = self.__heap[0][0] - time.monotonic() if self.__heap else None
+                    self.__condition.wait(timeout)
+                _, _, function, args = heapq.heappop(self.__heap)
+            function(*args)
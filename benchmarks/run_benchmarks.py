@@ -0,0 +1,218 @@
+"""
+Offline benchmarks of the listing, sync and cleanup steps, run against the
+in-memory fakes of benchmarks.fake_backends. Each case runs in a fresh
+process, so peak memory is measured per case.
+
+    python -m benchmarks.run_benchmarks --objects 1000 100000 --latency 0.005
+
+Results can be saved with --output and compared against a previous run
+with --baseline: the exit status is 1 when entries/sec, RPCs per entry or
+peak memory regressed by more than --max-regression.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import timeit
+import tracemalloc
+from unittest import mock
+
+from benchmarks import fake_backends
+from datacatalog_object_storage_processor.datacatalog_helper import DataCatalogHelper
+from datacatalog_object_storage_processor.object_storage.cloud_storage import storage_processor
+from datacatalog_object_storage_processor.object_storage_processor import \
+    ObjectStorageProcessor
+
+PROJECT_ID = 'benchmark-project'
+ENTRY_GROUP_NAME = f'projects/{PROJECT_ID}/locations/us-central1/entryGroups/benchmark'
+SYSTEM = 'cloud_storage'
+SCENARIOS = ('listing', 'sync', 'resync', 'delete')
+
+
+def run_case(scenario, objects_count, args):
+    logging.basicConfig(level=args.log_level)
+    config = fake_backends.FakeServiceConfig(args.latency, args.error_rate, args.quota,
+                                             args.page_size)
+    storage_client = fake_backends.FakeStorageClient(config, make_buckets(objects_count, args))
+    datacatalog_client = fake_backends.FakeDataCatalogClient(config)
+
+    with mock.patch('google.cloud.storage.Client',
+                    returning(fake_backends.FakeStorageClient, storage_client)), \
+            mock.patch('google.cloud.datacatalog_v1.DataCatalogClient',
+                       returning(fake_backends.FakeDataCatalogClient, datacatalog_client)):
+        run = prepare_case(scenario, objects_count, args, datacatalog_client)
+        for client in (storage_client, datacatalog_client):
+            client.rpc_counts.clear()
+            client.error_counts.clear()
+
+        if args.trace_memory:
+            tracemalloc.start()
+        start_time = timeit.default_timer()
+        entries_count = run()
+        elapsed_time = timeit.default_timer() - start_time
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else None
+
+    rpc_counts = dict(storage_client.rpc_counts + datacatalog_client.rpc_counts)
+    rpc_total = sum(rpc_counts.values())
+    return {
+        'scenario': scenario,
+        'objects': objects_count,
+        'entries': entries_count,
+        'seconds': round(elapsed_time, 3),
+        'entries_per_second': round(entries_count / elapsed_time, 1) if elapsed_time else None,
+        'rpcs_per_entry': round(rpc_total / entries_count, 3) if entries_count else None,
+        'rpc_counts': rpc_counts,
+        'error_counts': dict(storage_client.error_counts + datacatalog_client.error_counts),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'traced_peak_mb': round(traced_peak / 2**20, 1) if traced_peak is not None else None
+    }
+
+
+def prepare_case(scenario, objects_count, args, datacatalog_client):
+    def listing():
+        records, _ = storage_processor.StorageProcessor(PROJECT_ID).create_object_storage_data(
+            workers=args.bucket_workers, prefix_workers=args.prefix_workers)
+        return len(records)
+
+    def sync():
+        ObjectStorageProcessor(SYSTEM, PROJECT_ID).sync_entries(
+            ENTRY_GROUP_NAME,
+            stream=args.stream,
+            workers=args.workers,
+            bucket_workers=args.bucket_workers,
+            prefix_workers=args.prefix_workers,
+            engine=args.engine,
+            max_in_flight=args.max_in_flight)
+        return objects_count
+
+    def delete():
+        DataCatalogHelper(PROJECT_ID).delete_obsolete_metadata([], SYSTEM, ENTRY_GROUP_NAME,
+                                                               args.workers)
+        return objects_count
+
+    if scenario == 'listing':
+        return listing
+    if scenario == 'sync':
+        return sync
+    if scenario == 'resync':
+        # Nothing changed since the first sync, which is not measured.
+        sync()
+        return sync
+    datacatalog_client.populate(ENTRY_GROUP_NAME, SYSTEM, objects_count)
+    return delete
+
+
+def make_buckets(objects_count, args):
+    buckets_count = max(1, min(args.buckets, objects_count))
+    buckets = []
+    first_index = 0
+    for index in range(buckets_count):
+        bucket_objects_count = objects_count // buckets_count + (
+            1 if index < objects_count % buckets_count else 0)
+        buckets.append(
+            fake_backends.FakeBucket(f'bucket-{index:04d}', bucket_objects_count,
+                                     args.directories, first_index))
+        first_index += bucket_objects_count
+    return buckets
+
+
+def returning(base, instance):
+    # Class usable in place of `base`, whose instances are all `instance`.
+    return type(base.__name__, (base, ), {'__new__': lambda cls, *args, **kwargs: instance})
+
+
+def peak_rss_mb():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return max_rss / 2**20 if sys.platform == 'darwin' else max_rss / 2**10
+
+
+def find_regressions(results, baseline, max_regression):
+    baseline_results = {(result['scenario'], result['objects']): result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get((result['scenario'], result['objects']))
+        if not reference:
+            continue
+
+        checks = [('entries_per_second', -1), ('rpcs_per_entry', 1), ('peak_rss_mb', 1)]
+        for metric, direction in checks:
+            value, reference_value = result.get(metric), reference.get(metric)
+            if not value or not reference_value:
+                continue
+            change = (value - reference_value) / reference_value * direction
+            if change > max_regression:
+                regressions.append(f'{result["scenario"]} [{result["objects"]} objects]:'
+                                   f' {metric} {reference_value} -> {value}')
+
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--objects',
+                        nargs='+',
+                        type=int,
+                        default=[1000, 10000],
+                        help='Dataset sizes, e.g. 1000 100000 10000000')
+    parser.add_argument('--buckets', type=int, default=10)
+    parser.add_argument('--directories',
+                        type=int,
+                        default=16,
+                        help='Top level prefixes per bucket')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per RPC')
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of RPCs failing')
+    parser.add_argument('--quota', type=int, default=0, help='RPCs per second, 0 is unlimited')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--bucket-workers', type=int, default=1)
+    parser.add_argument('--prefix-workers', type=int, default=1)
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--max-in-flight', type=int, default=500)
+    parser.add_argument('--trace-memory',
+                        action='store_true',
+                        help='Also report the Python heap peak, at the cost of speed')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='JSON file the results are written to')
+    parser.add_argument('--baseline', help='JSON results of a previous run to compare with')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print(f'{"scenario":<10}{"objects":>10}{"seconds":>10}{"entries/s":>12}{"rpcs/entry":>12}'
+          f'{"errors":>8}{"peak MB":>10}')
+    for objects_count in args.objects:
+        for scenario in args.scenarios:
+            with context.Pool(1) as pool:
+                result = pool.apply(run_case, (scenario, objects_count, args))
+            results.append(result)
+            print(f'{scenario:<10}{objects_count:>10}{result["seconds"]:>10}'
+                  f'{result["entries_per_second"] or 0:>12}{result["rpcs_per_entry"] or 0:>12}'
+                  f'{sum(result["error_counts"].values()):>8}{result["peak_rss_mb"]:>10}')
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = find_regressions(results, json.load(baseline_file),
+                                           args.max_regression)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -23,9 +23,13 @@ setuptools.setup(
     include_package_data=True,
     install_requires=(
         'google-cloud-datacatalog>=1,<2',
-        'google-cloud-storage',
+        'google-cloud-storage>=1.31',
         'pandas',
     ),
+    extras_require={
+        'pubsub': ('google-cloud-pubsub>=2', ),
+        'yaml': ('PyYAML>=5', ),
+    },
     setup_requires=('pytest-runner', ),
     tests_require=('pytest-cov', ),
     python_requires='>=3.6',
@@ -0,0 +1,166 @@
+import collections
+import json
+import os
+
+from datacatalog_object_storage_processor.object_storage import object_storage_filter
+from datacatalog_object_storage_processor.object_storage import object_storage_grouping
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class SyncRoute:
+    """
+    Route of a batch sync: the objects of the buckets starting with one of
+    `bucket_prefixes`, of every bucket when there is none, which are kept
+    by `object_filter`, an ObjectStorageFilter, are synchronized to the
+    Entry Group `entry_group_name`, grouped by `grouping`, an
+    ObjectStorageGrouping, when given. The route is the scope of its Entry
+    Group, as the options of a sync-entries run would be.
+    """
+
+    def __init__(self, entry_group_name, bucket_prefixes=None, object_filter=None, grouping=None):
+        self.entry_group_name = entry_group_name
+        self.bucket_prefixes = sorted(set(bucket_prefixes or []))
+        self.object_filter = object_filter
+        self.grouping = grouping
+        self.__bucket_prefixes = tuple(self.bucket_prefixes)
+
+    def __str__(self):
+        details = [f'buckets {", ".join(self.bucket_prefixes) or "*"}']
+        if self.object_filter:
+            details.append(f'filter {self.object_filter}')
+        if self.grouping:
+            details.append(f'grouping {self.grouping}')
+        return ', '.join(details)
+
+    def selects_bucket(self, bucket_name):
+        return not self.__bucket_prefixes or bucket_name.startswith(self.__bucket_prefixes)
+
+    def select_records(self, records):
+        """Returns the ObjectStorageRecords routed to the Entry Group."""
+        if not self.__bucket_prefixes and not self.object_filter:
+            return records
+
+        selected_records = object_storage_records.ObjectStorageRecords(records.system)
+        for record in records:
+            if self.selects_bucket(record.bucket_name):
+                selected_records.append(record.bucket_name, record.file_name, record.size,
+                                        record.time_created, record.time_updated)
+        if self.object_filter:
+            selected_records = self.object_filter.filter_records(selected_records)
+        return selected_records
+
+
+class BatchSyncConfig:
+    """
+    Routes of a batch sync, which lists the buckets once for all of them.
+    Each route is a JSON or YAML object with the `entry_group_name` it
+    synchronizes, and optionally:
+
+    - `bucket_prefix`, one bucket prefix or a list of them;
+    - `object_filter`, the arguments of an ObjectStorageFilter, e.g.
+      {"object_prefixes": ["logs/"], "exclude": ["*/_SUCCESS"]};
+    - `group_depth` or `group_pattern`, see ObjectStorageGrouping.
+
+    An object is synchronized to every route selecting it, while an Entry
+    Group only takes a single route, whose scope its obsolete Entries are
+    computed from.
+    """
+
+    __ROUTE_KEYS = {
+        'entry_group_name', 'bucket_prefix', 'object_filter', 'group_depth', 'group_pattern'
+    }
+
+    def __init__(self, routes):
+        if not routes:
+            raise ValueError('At least one route is required')
+
+        routes_counts = collections.Counter(route.entry_group_name for route in routes)
+        duplicated_names = sorted(name for name, count in routes_counts.items() if count > 1)
+        if duplicated_names:
+            raise ValueError(f'Entry Groups targeted by several routes: {duplicated_names}')
+
+        self.routes = list(routes)
+
+    @classmethod
+    def read(cls, path):
+        """Read the routes of a JSON file, or of a YAML one ending with .yaml or .yml."""
+        with open(path) as config_file:
+            if path.endswith(('.yaml', '.yml')):
+                # Only imported when needed, as it is optional.
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError('PyYAML is required to read YAML configuration files,'
+                                      ' install it with the yaml extra')
+                config = yaml.safe_load(config_file)
+            else:
+                config = json.load(config_file)
+
+        return cls.from_dict(config)
+
+    @classmethod
+    def from_dict(cls, config):
+        if not isinstance(config, dict) or not isinstance(config.get('routes'), list):
+            raise ValueError('The batch sync configuration requires a list of routes')
+        return cls(
+            [cls.__make_route(index, route) for index, route in enumerate(config['routes'])])
+
+    def get_bucket_prefix(self):
+        """
+        Returns the prefix shared by the buckets of every route, which the
+        buckets are listed with, or None.
+        """
+        bucket_prefixes = self.get_bucket_prefixes()
+        if not bucket_prefixes:
+            return None
+        return os.path.commonprefix(bucket_prefixes) or None
+
+    def get_bucket_prefixes(self):
+        """
+        Returns the prefixes of the buckets selected by any route, or None
+        when a route selects every bucket.
+        """
+        if any(not route.bucket_prefixes for route in self.routes):
+            return None
+        return sorted({prefix for route in self.routes for prefix in route.bucket_prefixes})
+
+    def get_listing_filter(self):
+        """
+        Returns an ObjectStorageFilter of the object prefixes every route
+        can be served by, so they are pushed down into the single listing,
+        or None when the buckets must be listed whole.
+        """
+        object_prefixes = []
+        for route in self.routes:
+            listing_prefixes = route.object_filter.get_listing_prefixes() \
+                if route.object_filter else [None]
+            if None in listing_prefixes:
+                return None
+            object_prefixes.extend(listing_prefixes)
+
+        return object_storage_filter.ObjectStorageFilter(object_prefixes=object_prefixes)
+
+    @classmethod
+    def __make_route(cls, index, route):
+        if not isinstance(route, dict) or not route.get('entry_group_name'):
+            raise ValueError(f'Route {index} requires an entry_group_name')
+        unknown_keys = sorted(set(route) - cls.__ROUTE_KEYS)
+        if unknown_keys:
+            raise ValueError(f'Unknown keys in route {index}: {unknown_keys}')
+
+        bucket_prefixes = route.get('bucket_prefix')
+        if isinstance(bucket_prefixes, str):
+            bucket_prefixes = [bucket_prefixes]
+
+        try:
+            object_filter = object_storage_filter.ObjectStorageFilter(
+                **route['object_filter']) if route.get('object_filter') else None
+        except TypeError as e:
+            raise ValueError(f'Invalid object_filter in route {index}: {e}')
+
+        grouping = None
+        if route.get('group_depth') is not None or route.get('group_pattern') is not None:
+            grouping = object_storage_grouping.ObjectStorageGrouping(route.get('group_depth'),
+                                                                     route.get('group_pattern'))
+
+        return SyncRoute(route['entry_group_name'], bucket_prefixes, object_filter, grouping)
@@ -20,9 +20,12 @@ class DataCatalogEntityFactory:
         entry.display_name = entry_dict['display_name']
         entry.description = entry_dict['description']
         entry.linked_resource = entry_dict['linked_resource']
-        entry.source_system_timestamps.create_time.seconds = int(
-            entry_dict['time_created'].timestamp())
-        entry.source_system_timestamps.update_time.seconds = int(
-            entry_dict['time_updated'].timestamp())
+        # Objects may be listed without their creation or update time.
+        if entry_dict['time_created']:
+            entry.source_system_timestamps.create_time.seconds = int(
+                entry_dict['time_created'].timestamp())
+        if entry_dict['time_updated']:
+            entry.source_system_timestamps.update_time.seconds = int(
+                entry_dict['time_updated'].timestamp())
 
         return entry
@@ -1,13 +1,22 @@
+import asyncio
+import collections
+import datetime
+import hashlib
+import itertools
 import logging
+import math
 import re
 import timeit
+from concurrent import futures
 
-import pandas as pd
+from google.api_core import datetime_helpers
 from google.api_core import exceptions
 from google.cloud import datacatalog_v1
 
 from datacatalog_object_storage_processor import datacatalog_entity_factory
+from datacatalog_object_storage_processor import sync_plan
 from datacatalog_object_storage_processor import utils
+from datacatalog_object_storage_processor.object_storage import object_storage_records
 
 
 class DataCatalogHelper:
@@ -17,10 +26,52 @@ class DataCatalogHelper:
 
     __LOCATION = 'us-central1'
     __TAG_TEMPLATE = 'object_storage_entries_sync_details'
-
-    def __init__(self, project_id):
-        self.__datacatalog = datacatalog_v1.DataCatalogClient()
+    __GROUP_TAG_TEMPLATE = 'object_storage_prefixes_sync_details'
+    __GROUP_ENTRY_TYPE = 'prefix'
+    __MAX_PENDING_ENTRIES_PER_WORKER = 2
+    __LIST_ENTRIES_PAGE_SIZE = 1000
+    __DELETE_PROGRESS_EVERY = 1000
+    __ASYNC_CALL_TIMEOUT = 60
+    __METRICS_SERVICE = 'datacatalog'
+    __MAX_ENTRY_ID_LENGTH = 64
+    __ENTRY_ID_HASH_LENGTH = 8
+    __GROUP_FINGERPRINT_LENGTH = 8
+    # Tag fields that change on every run without the file changing; they
+    # are written along with real changes but never trigger an update.
+    __VOLATILE_TAG_FIELDS = ('execution_time', )
+    __ENTRY_GROUP_DESCRIPTION = 'This Entry Group is used as a container for object storage ' \
+                                'entries'
+
+    def __init__(self,
+                 project_id,
+                 read_limiter=None,
+                 write_limiter=None,
+                 metrics=None,
+                 transport_options=None):
+        # Every call goes through the limiters, which are meant to be shared
+        # by all the threads, and helpers, using the same quota.
+        self.__metrics = metrics or utils.RpcMetrics()
+        self.__datacatalog = utils.RateLimitedClient(
+            (transport_options or utils.TransportOptions()).make_datacatalog_client(), read_limiter
+            or utils.AdaptiveRateLimiter('datacatalog read'), write_limiter
+            or utils.AdaptiveRateLimiter('datacatalog write'), self.__metrics,
+            self.__METRICS_SERVICE)
         self.__project_id = project_id
+        # Tag Template names by Entry Group, see apply_object_changes.
+        self.__prepared_entry_groups = {}
+        # Names of the Entry Groups and Tag Templates known to exist, which
+        # are not looked up again by later syncs, see clear_metadata_cache.
+        self.__loaded_entry_groups = set()
+        self.__loaded_tag_templates = set()
+
+    def clear_metadata_cache(self):
+        """
+        Forget the Entry Groups and Tag Templates loaded by previous syncs,
+        e.g. after a failure, so the next sync looks them up again.
+        """
+        self.__prepared_entry_groups.clear()
+        self.__loaded_entry_groups.clear()
+        self.__loaded_tag_templates.clear()
 
     def create_tag_template(self, tag_template_name):
         tag_template = datacatalog_v1.types.TagTemplate()
@@ -60,29 +111,272 @@ class DataCatalogHelper:
             tag_template_id=tag_template_id,
             tag_template=tag_template)
 
-    def sync_entries_from_dataframe(self, dataframe, entry_group_name, system):
-        execution_time = pd.Timestamp.utcnow()
+    def create_group_tag_template(self, tag_template_name):
+        tag_template = datacatalog_v1.types.TagTemplate()
+        tag_template.display_name = 'Tag Template with details of ingested object storage ' \
+                                    'prefixes - all entries are a snapshot of the execution time'
+
+        fields = [('execution_time', 'Sync Execution time', 'TIMESTAMP'),
+                  ('bucket_name', 'Bucket Name', 'STRING'), ('prefix', 'Prefix', 'STRING'),
+                  ('files_count', 'Files Count', 'DOUBLE'), ('total_size', 'Total Size', 'DOUBLE'),
+                  ('min_time_updated', 'Oldest File Update time', 'TIMESTAMP'),
+                  ('max_time_updated', 'Newest File Update time', 'TIMESTAMP'),
+                  ('file_types', 'File Types', 'STRING')]
+        for field_id, display_name, primitive_type in fields:
+            tag_template.fields[field_id].display_name = display_name
+            tag_template.fields[field_id].type.primitive_type = \
+                datacatalog_v1.enums.FieldType.PrimitiveType[primitive_type].value
 
-        project_id, location_id, entry_group_id = \
-            self.extract_resources_from_entry_group(entry_group_name)
+        project_id, location_id, tag_template_id = \
+            self.extract_resources_from_template(tag_template_name)
 
-        logging.info(f'[PROJECT: {project_id}]')
-        logging.info(f'[LOCATION: {location_id}]')
-        logging.info(f'[ENTRY_GROUP: {entry_group_id}]')
-        logging.info('')
+        return self.__datacatalog.create_tag_template(
+            parent=datacatalog_v1.DataCatalogClient.location_path(project_id, location_id),
+            tag_template_id=tag_template_id,
+            tag_template=tag_template)
 
-        self.__load_entry_group(entry_group_id, entry_group_name, location_id, project_id)
+    def sync_entries_from_dataframe(self, dataframe, entry_group_name, system, *args, **kwargs):
+        self.sync_entries_from_records(dataframe.itertuples(index=False), entry_group_name, system,
+                                       *args, **kwargs)
+
+    def sync_entries_from_dataframes(self, dataframes, entry_group_name, system, *args, **kwargs):
+        records = (row for dataframe in dataframes for row in dataframe.itertuples(index=False))
+        self.sync_entries_from_records(records, entry_group_name, system, *args, **kwargs)
+
+    def sync_entries_from_records(self,
+                                  records,
+                                  entry_group_name,
+                                  system,
+                                  workers=1,
+                                  delete_obsolete=True,
+                                  verify_tags=False,
+                                  state_store=None,
+                                  shard=None,
+                                  grouped=False):
+        """
+        Synchronize Entries from an iterable of records, such as
+        ObjectStorageRecords or dataframe rows. Each record is synced as soon
+        as it is produced, so a lazy iterable keeps memory bounded.
+
+        Up to `workers` Entries, with their Tags, are synchronized
+        concurrently. Entries that were not synchronized are deleted
+        afterwards, unless `delete_obsolete` is False. The Tags of up-to-date
+        Entries are only checked when `verify_tags` is True.
+
+        When a SyncStateStore is given, Entries whose fingerprint matches the
+        one recorded by a previous run are not sent to Data Catalog at all,
+        and obsolete Entries are computed from the stored state. The run is
+        checkpointed as well: `records` may be interleaved with
+        ListingCursor items, each saved once every record before it has been
+        processed.
+
+        When the records are the slice of an ObjectStorageShard, only the
+        obsolete Entries owned by that shard are deleted. `grouped` must be
+        True when the records include ObjectStorageGroupRecords, whose Tags
+        use a Tag Template of their own.
+
+        Returns the names of the synchronized Entries.
+        """
+        execution_time, resolved_tag_template_name = self.__prepare_sync(entry_group_name, grouped)
+
+        return self.__sync_entries_from_records(records, entry_group_name,
+                                                resolved_tag_template_name, execution_time, system,
+                                                workers, delete_obsolete, verify_tags, state_store,
+                                                shard)
+
+    async def sync_entries_from_records_async(self,
+                                              records_pages,
+                                              entry_group_name,
+                                              system,
+                                              max_in_flight=500,
+                                              delete_obsolete=True,
+                                              verify_tags=False,
+                                              shard=None,
+                                              grouped=False):
+        """
+        asyncio counterpart of sync_entries_from_records. Entries are
+        synchronized through non-blocking gRPC calls, with up to
+        `max_in_flight` Entries in progress at once, so far more requests can
+        be kept in flight than with a thread pool.
+
+        `records_pages` is an iterable of record iterables; the next page is
+        fetched off the event loop, as are the other blocking calls, so they
+        do not stall the in-flight calls.
+
+        Returns the names of the synchronized Entries.
+        """
+        loop = asyncio.get_event_loop()
+        execution_time, resolved_tag_template_name = await loop.run_in_executor(
+            None, self.__prepare_sync, entry_group_name, grouped)
+        start_time = timeit.default_timer()
 
-        resolved_tag_template_name = self.__load_tag_template()
+        entries_index = await loop.run_in_executor(None, self.load_entries_index, entry_group_name)
+        semaphore = asyncio.Semaphore(max_in_flight)
+        entries_names = []
+        entries_count = 0
+        pending = set()
+        records_pages = iter(records_pages)
+        while True:
+            records = await loop.run_in_executor(None, next, records_pages, None)
+            if records is None:
+                break
+
+            for entry_id, entry, tags in self.__make_entries_from_records(
+                    records, resolved_tag_template_name, execution_time):
+                # Released by the task once the Entry is synchronized.
+                await semaphore.acquire()
+                task = asyncio.ensure_future(
+                    self.__synchronize_entry_async(entry_group_name, entry_id, entry, tags,
+                                                   entries_index, not verify_tags, semaphore,
+                                                   entries_names))
+                task.add_done_callback(pending.discard)
+                pending.add(task)
+                entries_count += 1
+
+        if pending:
+            await asyncio.wait(pending)
+
+        logging.info(f'===> {entries_count} Entries processed...')
+
+        if entries_count == 0:
+            logging.info('===> Nothing to Synchronize...')
+        else:
+            await loop.run_in_executor(None, self.__record_execution_time, entry_group_name,
+                                       execution_time)
+            if delete_obsolete:
+                await self.__delete_obsolete_metadata_async(entries_names, system,
+                                                            entry_group_name, entries_index,
+                                                            semaphore, shard)
+
+        elapsed_time = int(timeit.default_timer() - start_time)
+        logging.info(f'=> Sync Entries took [{elapsed_time} seconds]')
+        return entries_names
+
+    def plan_sync_from_records(self,
+                               records,
+                               entry_group_name,
+                               system,
+                               plan_path,
+                               workers=1,
+                               delete_obsolete=True,
+                               verify_tags=False,
+                               shard=None,
+                               grouped=False):
+        """
+        Compute the operations sync_entries_from_records would make, without
+        writing anything to Data Catalog, and write them to a SyncPlan at
+        `plan_path`. The current Entries are listed once; the Tags of changed
+        Entries, or of every Entry with `verify_tags`, are fetched by up to
+        `workers` concurrent list_tags calls.
+
+        Returns the SyncPlan, see apply_sync_plan.
+        """
+        start_time = timeit.default_timer()
+        execution_time = datetime.datetime.now(datetime.timezone.utc)
+        resolved_tag_template_name = self.get_tag_template_name()
 
-        logging.info(f'===> Creating Entries on project: {self.__project_id}...')
-        logging.info('')
+        entries_index = self.__load_existing_entries_index(entry_group_name)
+        entries_names = set()
+        # The delete operations are only computed once every record was
+        # planned, which fills entries_names.
+        operations = itertools.chain(
+            self.__plan_entries_operations(records, entry_group_name, entries_index,
+                                           resolved_tag_template_name, execution_time, workers,
+                                           verify_tags, entries_names),
+            self.__plan_delete_operations(entries_index, entries_names, system, shard)
+            if delete_obsolete else [])
+        plan = sync_plan.SyncPlan.write(plan_path, entry_group_name, system,
+                                        resolved_tag_template_name,
+                                        datetime_helpers.to_rfc3339(execution_time), operations,
+                                        grouped)
+
+        elapsed_time = int(timeit.default_timer() - start_time)
+        logging.info(f'=> Plan Entries took [{elapsed_time} seconds]')
+        return plan
+
+    def apply_sync_plan(self, plan, workers=1):
+        """
+        Apply the operations of a SyncPlan, up to `workers` at once. An Entry
+        planned for creation that exists by then is synchronized instead.
+
+        Returns the counts of applied and of failed operations, by kind.
+        """
+        start_time = timeit.default_timer()
+        project_id, location_id, entry_group_id = \
+            self.extract_resources_from_entry_group(plan.entry_group_name)
+        self.__load_entry_group(entry_group_id, plan.entry_group_name, location_id, project_id)
+        resolved_tag_template_name = self.__load_tag_templates(plan.grouped)
+        if resolved_tag_template_name != plan.tag_template_name:
+            raise ValueError(f'The sync plan is for Tag Template {plan.tag_template_name},'
+                             f' not {resolved_tag_template_name}')
+
+        execution_time = datetime_helpers.from_rfc3339(plan.execution_time)
+        max_pending = max(1, workers) * self.__MAX_PENDING_ENTRIES_PER_WORKER
+        applied_counts = collections.Counter()
+        failed_counts = collections.Counter()
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for operation in plan.iterate_operations():
+                if len(pending) >= max_pending:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    self.__collect_applied_operations(done, pending, applied_counts, failed_counts)
+
+                pending[executor.submit(self.__apply_operation, plan, operation,
+                                        execution_time)] = operation['operation']
+
+            self.__collect_applied_operations(list(pending), pending, applied_counts,
+                                              failed_counts)
+
+        if applied_counts:
+            self.__record_execution_time(plan.entry_group_name, execution_time)
+
+        elapsed_time = int(timeit.default_timer() - start_time)
+        logging.info(f'=> {sum(applied_counts.values())} operations applied'
+                     f' {dict(applied_counts)}, {sum(failed_counts.values())} failed'
+                     f' {dict(failed_counts)}, took [{elapsed_time} seconds]')
+        return dict(applied_counts), dict(failed_counts)
+
+    def apply_object_changes(self, records, deleted_records, entry_group_name, workers=1):
+        """
+        Upsert the Entries of `records`, e.g. of objects just created or
+        updated, and delete the Entries of `deleted_records`, up to `workers`
+        at once, without listing the Entry Group. An Entry is only deleted
+        when it links to the deleted object. The Entry Group and the Tag
+        Template are only loaded by the first call.
+
+        Returns the records, of both lists, whose change failed.
+        """
+        resolved_tag_template_name = self.__prepared_entry_groups.get(entry_group_name)
+        if not resolved_tag_template_name:
+            _, resolved_tag_template_name = self.__prepare_sync(entry_group_name, False)
+            self.__prepared_entry_groups[entry_group_name] = resolved_tag_template_name
+
+        execution_time = datetime.datetime.now(datetime.timezone.utc)
+        failed_records = []
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            pending = {}
+            for record in records:
+                pending[executor.submit(self.__upsert_object_entry, entry_group_name, record,
+                                        resolved_tag_template_name, execution_time)] = record
+            pending.update({
+                executor.submit(self.__delete_object_entry, entry_group_name, record):
+                record
+                for record in deleted_records
+            })
+            for future in futures.as_completed(pending):
+                try:
+                    applied = future.result()
+                except exceptions.GoogleAPICallError as e:
+                    logging.warning('Object change was not applied: %s', str(e))
+                    applied = False
+
+                if not applied:
+                    failed_records.append(pending[future])
 
-        self.__sync_entries_from_dataframe(dataframe, entry_group_name, resolved_tag_template_name,
-                                           execution_time, system)
+        return failed_records
 
-    def delete_entries(self, entry_group_name, system):
-        self.delete_obsolete_metadata([], system, entry_group_name)
+    def delete_entries(self, entry_group_name, system, workers=1):
+        self.delete_obsolete_metadata([], system, entry_group_name, workers)
 
     def create_entry_group(self, project_id, location_id, entry_group_id, entry_group):
         created_entry_group = self.__datacatalog.create_entry_group(
@@ -132,11 +426,30 @@ class DataCatalogHelper:
     def get_entry_group(self, name):
         return self.__datacatalog.get_entry_group(name=name)
 
-    def synchronize_entry(self, entry_group_name, entry_id, entry, tags):
+    def synchronize_entry(self,
+                          entry_group_name,
+                          entry_id,
+                          entry,
+                          tags,
+                          entries_index=None,
+                          skip_unchanged_tags=False):
+        """
+        Upsert an Entry and its Tags. With `skip_unchanged_tags`, the Tags of
+        an Entry that is already up-to-date are assumed to be up-to-date as
+        well, saving the list_tags call. Hence an Entry whose Tags fail to be
+        written is reverted, so the next sync does not take it as up-to-date.
+        """
         start_time = timeit.default_timer()
         try:
-            self.upsert_entry(entry_group_name, entry_id, entry)
-            self.synchronize_tags(entry.name, tags)
+            _, entry_changed, current_entry = self.__upsert_entry(entry_group_name, entry_id,
+                                                                  entry, entries_index)
+            if entry_changed or not skip_unchanged_tags:
+                try:
+                    self.synchronize_tags(entry.name, tags)
+                except exceptions.GoogleAPICallError:
+                    if entry_changed:
+                        self.__revert_entry(entry.name, current_entry)
+                    raise
             stop_time = timeit.default_timer()
             elapsed_time = int(stop_time - start_time)
             entry_name = entry.name
@@ -146,48 +459,24 @@ class DataCatalogHelper:
             logging.warning('Entry was not synchronized: %s', entry_id)
             logging.warning('Error: %s', str(e))
 
-    def synchronize_tags(self, entry_name, tags):
-        current_tags = self.__datacatalog.list_tags(parent=entry_name)
-        for tag in tags:
-            tag_to_create = tag
-            tag_to_update = None
-            for current_tag in current_tags:
-                logging.info(f'Tag loaded: {current_tag.name}')
-                if tag.template == current_tag.template:
-                    tag_to_create = None
-                    if not self.__tags_fields_are_equal(tag, current_tag):
-                        tag.name = current_tag.name
-                        tag_to_update = tag
-
-            if tag_to_create:
-                tag = self.__datacatalog.create_tag(parent=entry_name, tag=tag_to_create)
-                logging.info(f'Tag created: {tag.name}')
-            elif tag_to_update:
-                self.__datacatalog.update_tag(tag=tag_to_update, update_mask=None)
-                logging.info(f'Tag updated: {tag_to_update.name}')
-            else:
-                logging.info('Tag is up to date')
+    def synchronize_tags(self, entry_name, tags, current_tags=None):
+        if current_tags is None:
+            current_tags = self.__datacatalog.list_tags(parent=entry_name)
 
-    def upsert_entry(self, entry_group_name, entry_id, entry):
-        persisted_entry = entry
-        entry_name = '{}/entries/{}'.format(entry_group_name, entry_id)
-        persisted_entry.name = entry_name
-        try:
-            persisted_entry = self.get_entry(name=entry_name)
-            self.__log_entry_operation('already exists', entry_name=entry_name)
-            if self.__entry_was_updated(persisted_entry, entry):
-                persisted_entry = self.update_entry(entry=entry)
-            else:
-                self.__log_entry_operation('is up-to-date', entry=persisted_entry)
-        except exceptions.PermissionDenied:
-            self.__log_entry_operation('does not exist', entry_name=entry_name)
-            persisted_entry = self.create_entry(entry_group_name=entry_group_name,
-                                                entry_id=entry_id,
-                                                entry=entry)
-        except exceptions.GoogleAPICallError as e:
-            logging.warning('Entry was not updated: %s', entry_name)
-            logging.warning('Error: %s', str(e))
+        operations = self.__plan_tags_operations(tags, current_tags)
+        self.__apply_tags_operations(entry_name, operations)
 
+        if not operations:
+            logging.info('Tag is up to date')
+
+    def upsert_entry(self, entry_group_name, entry_id, entry, entries_index=None):
+        """
+        Create or update an Entry. When an `entries_index`, as returned by
+        load_entries_index, is given, the current Entry is looked up there
+        instead of being fetched with get_entry.
+        """
+        persisted_entry, _, _ = self.__upsert_entry(entry_group_name, entry_id, entry,
+                                                    entries_index)
         return persisted_entry
 
     def create_entry(self, entry_group_name, entry_id, entry):
@@ -208,38 +497,68 @@ class DataCatalogHelper:
         self.__log_entry_operation('updated', entry=entry)
         return entry
 
-    def delete_obsolete_metadata(self, new_entries_name, system, entry_group_name):
+    def list_entries(self, entry_group_name):
+        return [
+            entry
+            for entry in self.__datacatalog.list_entries(parent=entry_group_name,
+                                                         page_size=self.__LIST_ENTRIES_PAGE_SIZE)
+        ]
+
+    def load_entries_index(self, entry_group_name):
+        """
+        Load every Entry of the Entry Group with paged list_entries calls,
+        keyed by Entry id.
+        """
+        logging.info('===> Load the existing Entries')
+        start_time = timeit.default_timer()
+        entries_index = {
+            entry.name.split('/')[-1]: entry
+            for entry in self.list_entries(entry_group_name)
+        }
+        elapsed_time = int(timeit.default_timer() - start_time)
+        logging.info(f'{len(entries_index)} Entries loaded in [{elapsed_time} seconds]')
+        logging.info('')
+        return entries_index
+
+    def delete_obsolete_metadata(self,
+                                 new_entries_name,
+                                 system,
+                                 entry_group_name,
+                                 workers=1,
+                                 current_entries=None,
+                                 shard=None):
+        """
+        Delete the Entries of the Entry Group, created by `system`, that are
+        not in `new_entries_name`. The current Entries are listed from the
+        Entry Group unless already known through `current_entries`, and up to
+        `workers` of them are deleted concurrently. With an
+        ObjectStorageShard, Entries owned by other shards are left alone.
+        """
         logging.info('')
         logging.info('Starting to clean obsolete entries...')
 
-        _, _, entry_group_id = self.extract_resources_from_entry_group(entry_group_name)
-
-        # Delete any pre-existing Entries.
-        old_entries_name = \
-            self.search_catalog_relative_resource_name(f'system={system} {entry_group_id}')
+        if current_entries is None:
+            try:
+                current_entries = self.list_entries(entry_group_name)
+            except (exceptions.NotFound, exceptions.PermissionDenied):
+                # Data Catalog reports missing Entry Groups as PermissionDenied.
+                logging.info('Entry Group %s does not exist, nothing to delete.', entry_group_name)
+                return
+
+        old_entries_name = [
+            entry.name for entry in current_entries if entry.user_specified_system == system
+            and self.__is_owned(entry.linked_resource, shard)
+        ]
 
-        logging.info('%s entries that match the search query'
-                     ' exist in Data Catalog!', len(old_entries_name))
+        logging.info('%s entries from system %s exist in the Entry Group!', len(old_entries_name),
+                     system)
         logging.info('Looking for entries to be deleted...')
 
-        # Filter out entries from same system but different entry_group
-        old_entries_name_same_entry_group = []
-
-        for entry_name in old_entries_name:
-            datacatalog_entry_name_pattern = \
-                '(?P<entry_group_name>.+?)/entries/(.+?)'
-            match = re.match(pattern=datacatalog_entry_name_pattern, string=entry_name)
-            current_entry_group_name = match.group('entry_group_name')
-            if current_entry_group_name == entry_group_name:
-                old_entries_name_same_entry_group.append(entry_name)
-
-        entries_name_pending_deletion = set(old_entries_name_same_entry_group).difference(
-            set(new_entries_name))
+        entries_name_pending_deletion = set(old_entries_name).difference(set(new_entries_name))
 
         logging.info('%s entries will be deleted.', len(entries_name_pending_deletion))
 
-        for entry_name in entries_name_pending_deletion:
-            self.delete_entry(entry_name)
+        self.__delete_entries_concurrently(entries_name_pending_deletion, workers)
 
         try:
             self.delete_entry_group(entry_group_name)
@@ -252,12 +571,17 @@ class DataCatalogHelper:
         try:
             self.__datacatalog.delete_entry(name=name)
             self.__log_entry_operation('deleted', entry_name=name)
+            return True
         except Exception as e:
-            logging.info('An exception ocurred while attempting to' ' delete Entry: %s', name)
+            logging.info('An exception ocurred while attempting to'
+                         ' delete Entry: %s', name)
             logging.debug(str(e))
+            return False
 
     def delete_entry_group(self, name):
         self.__datacatalog.delete_entry_group(name=name)
+        self.__prepared_entry_groups.pop(name, None)
+        self.__loaded_entry_groups.discard(name)
 
     def search_catalog_relative_resource_name(self, query):
         return [result.relative_resource_name for result in self.search_catalog(query=query)]
@@ -271,61 +595,701 @@ class DataCatalogHelper:
                 scope=scope, query=query, order_by='relevance', page_size=1000)
         ]
 
-    def __sync_entries_from_dataframe(self, dataframe, entry_group_name,
-                                      resolved_tag_template_name, execution_time, system):
-        start_time = timeit.default_timer()
-        entries_names = []
-        for row in dataframe.itertuples(index=False):
-            entry_id = self.__normalize_entry_id(row.file_name)
-            entry = datacatalog_entity_factory.DataCatalogEntityFactory.make_entry({
-                'display_name':
-                f'{entry_id}',
-                'description':
-                f'This Entry represents the file {row.file_name} '
-                f'on system {row.system}',
-                'system':
-                row.system,
-                'type':
-                row.file_type,
-                'linked_resource':
-                row.linked_resource,
-                'time_created':
-                row.time_created,
-                'time_updated':
-                row.time_updated
-            })
+    def __prepare_sync(self, entry_group_name, grouped):
+        execution_time = datetime.datetime.now(datetime.timezone.utc)
 
-            tag = datacatalog_v1.types.Tag()
-            tag.template = resolved_tag_template_name
+        project_id, location_id, entry_group_id = \
+            self.extract_resources_from_entry_group(entry_group_name)
 
-            tag.fields['bucket_name'].string_value = row.bucket_name
-            tag.fields['file_url'].string_value = row.public_url
-            tag.fields['file_name'].string_value = row.file_name
-            tag.fields['file_size'].double_value = row.size
-            tag.fields['execution_time'].timestamp_value.FromJsonString(execution_time.isoformat())
+        logging.info(f'[PROJECT: {project_id}]')
+        logging.info(f'[LOCATION: {location_id}]')
+        logging.info(f'[ENTRY_GROUP: {entry_group_id}]')
+        logging.info('')
 
-            entry_name = self.synchronize_entry(entry_group_name, entry_id, entry, [tag])
-            entries_names.append(entry_name)
+        self.__load_entry_group(entry_group_id, entry_group_name, location_id, project_id)
+
+        resolved_tag_template_name = self.__load_tag_templates(grouped)
+
+        logging.info(f'===> Creating Entries on project: {self.__project_id}...')
+        logging.info('')
 
-        self.delete_obsolete_metadata(entries_names, system, entry_group_name)
+        return execution_time, resolved_tag_template_name
+
+    def __sync_entries_from_records(self, records, entry_group_name, resolved_tag_template_name,
+                                    execution_time, system, workers, delete_obsolete, verify_tags,
+                                    state_store, shard):
+        start_time = timeit.default_timer()
+
+        # Only a state left by a completed run knows every synchronized Entry.
+        incremental = state_store is not None and state_store.has_completed_run(entry_group_name)
+        # An incremental run only sends the delta, which is cheaper to look up
+        # with get_entry than by listing the whole Entry Group.
+        entries_index = None if incremental else self.load_entries_index(entry_group_name)
+        entries = self.__make_entries_from_records(records, resolved_tag_template_name,
+                                                   execution_time)
+        entries_names, entries_count = self.__synchronize_entries(
+            entry_group_name,
+            entries,
+            entries_index,
+            workers,
+            skip_unchanged_tags=not verify_tags,
+            state_store=state_store)
+
+        logging.info(f'===> {entries_count} Entries processed...')
+
+        if state_store:
+            # Includes the Entries processed before the run was interrupted.
+            entries_names = set(entries_names).union(
+                state_store.list_run_entries_names(entry_group_name))
+
+        if not entries_names:
+            logging.info('===> Nothing to Synchronize...')
+        else:
+            self.__record_execution_time(entry_group_name, execution_time)
+            if delete_obsolete and incremental:
+                self.__delete_obsolete_state_entries(entries_names, entry_group_name, state_store,
+                                                     workers, shard)
+            elif delete_obsolete:
+                # The index was loaded before any write, so it holds every
+                # Entry that may have become obsolete.
+                self.delete_obsolete_metadata(entries_names,
+                                              system,
+                                              entry_group_name,
+                                              workers,
+                                              current_entries=entries_index.values(),
+                                              shard=shard)
+
+        if state_store:
+            state_store.finish_run(entry_group_name)
 
         stop_time = timeit.default_timer()
         elapsed_time = int(stop_time - start_time)
         logging.info(f'=> Sync Entries took [{elapsed_time} seconds]')
+        return entries_names
 
-    def __load_tag_template(self):
-        logging.info('===> Load the Tag Template')
+    def __synchronize_entries(self, entry_group_name, entries, entries_index, workers,
+                              skip_unchanged_tags, state_store):
+        # Submission is throttled to a small multiple of the pool size, so a
+        # lazy entries iterable is never drained faster than it is synced.
+        max_pending = max(1, workers) * self.__MAX_PENDING_ENTRIES_PER_WORKER
+        entries_names = []
+        entries_count = 0
+        unchanged_count = 0
+        pending = {}
+        # (Entries taken before the cursor, cursor), saved in order once all
+        # of those Entries are processed.
+        listing_cursors = collections.deque()
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for item in entries:
+                if isinstance(item, object_storage_records.ListingCursor):
+                    listing_cursors.append((entries_count, item))
+                    self.__save_listing_cursors(entry_group_name, listing_cursors, pending,
+                                                state_store)
+                    continue
+
+                entry_id, entry, tags = item
+                entries_count += 1
+                entry_name = '{}/entries/{}'.format(entry_group_name, entry_id)
+                fingerprint = None
+                skip_unchanged_entry_tags = skip_unchanged_tags
+                if state_store:
+                    fingerprint = self.__make_fingerprint(entry, tags)
+                    if state_store.get_fingerprint(entry_group_name, entry_name) == fingerprint:
+                        self.__add_processed_entries(entry_group_name, [entry_name], entries_names,
+                                                     state_store)
+                        unchanged_count += 1
+                        continue
+                    # The fingerprint covers the Tags too, so a mismatch means
+                    # they may need to be written even if the Entry did not.
+                    skip_unchanged_entry_tags = False
+
+                if len(pending) >= max_pending:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    self.__add_processed_entries(
+                        entry_group_name, self.__collect_synchronized_entries(done, pending),
+                        entries_names, state_store)
+                    self.__save_listing_cursors(entry_group_name, listing_cursors, pending,
+                                                state_store)
+
+                pending[executor.submit(self.__synchronize_and_record_entry, entry_group_name,
+                                        entry_id, entry, tags, entries_index,
+                                        skip_unchanged_entry_tags, state_store,
+                                        fingerprint)] = (entry_name, entries_count)
+
+            self.__add_processed_entries(
+                entry_group_name, self.__collect_synchronized_entries(list(pending), pending),
+                entries_names, state_store)
+            self.__save_listing_cursors(entry_group_name, listing_cursors, pending, state_store)
+
+        if state_store:
+            logging.info(f'{unchanged_count} Entries unchanged since the last run')
+
+        return entries_names, entries_count
+
+    async def __synchronize_entry_async(self, entry_group_name, entry_id, entry, tags,
+                                        entries_index, skip_unchanged_tags, semaphore,
+                                        entries_names):
+        entry_name = '{}/entries/{}'.format(entry_group_name, entry_id)
+        entry.name = entry_name
+        try:
+            current_entry = entries_index.get(entry_id)
+            entry_changed = True
+            if not current_entry:
+                try:
+                    await self.__call_async(
+                        'create_entry',
+                        datacatalog_v1.types.CreateEntryRequest(parent=entry_group_name,
+                                                                entry_id=entry_id,
+                                                                entry=entry))
+                    self.__log_entry_operation('created', entry=entry)
+                except exceptions.AlreadyExists:
+                    current_entry = await self.__call_async(
+                        'get_entry', datacatalog_v1.types.GetEntryRequest(name=entry_name))
+
+            if current_entry:
+                if self.__entry_was_updated(current_entry, entry):
+                    await self.__call_async('update_entry',
+                                            datacatalog_v1.types.UpdateEntryRequest(entry=entry))
+                    self.__log_entry_operation('updated', entry=entry)
+                else:
+                    entry_changed = False
+
+            if entry_changed or not skip_unchanged_tags:
+                try:
+                    await self.__synchronize_tags_async(entry_name, tags)
+                except exceptions.GoogleAPICallError:
+                    if entry_changed:
+                        await self.__revert_entry_async(entry_name, current_entry)
+                    raise
+        except exceptions.GoogleAPICallError as e:
+            logging.warning('Entry was not synchronized: %s', entry_id)
+            logging.warning('Error: %s', str(e))
+        finally:
+            # Kept even when the sync failed, so the Entry is not mistaken
+            # for an obsolete one.
+            entries_names.append(entry_name)
+            semaphore.release()
+
+    async def __synchronize_tags_async(self, entry_name, tags):
+        response = await self.__call_async('list_tags',
+                                           datacatalog_v1.types.ListTagsRequest(parent=entry_name))
+        for operation, tag in self.__plan_tags_operations(tags, response.tags):
+            if operation == 'create':
+                await self.__call_async(
+                    'create_tag', datacatalog_v1.types.CreateTagRequest(parent=entry_name,
+                                                                        tag=tag))
+            else:
+                await self.__call_async('update_tag',
+                                        datacatalog_v1.types.UpdateTagRequest(tag=tag))
+            logging.info(f'Tag {operation}d: {entry_name}')
+
+    async def __revert_entry_async(self, entry_name, previous_entry):
+        # Same as __revert_entry.
+        try:
+            if previous_entry is None:
+                await self.__call_async('delete_entry',
+                                        datacatalog_v1.types.DeleteEntryRequest(name=entry_name))
+                self.__log_entry_operation('deleted', entry_name=entry_name)
+            else:
+                await self.__call_async(
+                    'update_entry', datacatalog_v1.types.UpdateEntryRequest(entry=previous_entry))
+                self.__log_entry_operation('reverted', entry_name=entry_name)
+        except exceptions.GoogleAPICallError as e:
+            logging.warning('Entry was not reverted: %s', entry_name)
+            logging.warning('Error: %s', str(e))
+
+    async def __delete_obsolete_metadata_async(self, new_entries_name, system, entry_group_name,
+                                               entries_index, semaphore, shard):
         logging.info('')
+        logging.info('Starting to clean obsolete entries...')
+
+        new_entries_name = set(new_entries_name)
+        entries_name_pending_deletion = [
+            entry.name for entry in entries_index.values()
+            if entry.user_specified_system == system and entry.name not in new_entries_name
+            and self.__is_owned(entry.linked_resource, shard)
+        ]
+
+        logging.info('%s entries will be deleted.', len(entries_name_pending_deletion))
+
+        async def delete_entry(entry_name):
+            async with semaphore:
+                try:
+                    await self.__call_async(
+                        'delete_entry', datacatalog_v1.types.DeleteEntryRequest(name=entry_name))
+                    self.__log_entry_operation('deleted', entry_name=entry_name)
+                except exceptions.GoogleAPICallError as e:
+                    logging.info('An exception ocurred while attempting to delete Entry: %s',
+                                 entry_name)
+                    logging.debug(str(e))
+
+        await asyncio.gather(
+            *[delete_entry(entry_name) for entry_name in entries_name_pending_deletion])
+
+    async def __call_async(self, method, request):
+        limiter = self.__datacatalog.get_limiter(method)
+        return await limiter.call_async(
+            self.__metrics.timed_async(self.__METRICS_SERVICE, method, self.__call_grpc_async),
+            method, request)
+
+    async def __call_grpc_async(self, method, request):
+        # Uses the gRPC future of the client transport stub, bridged to the
+        # event loop, instead of the blocking client method.
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        grpc_future = getattr(self.__datacatalog.transport,
+                              method).future(request, timeout=self.__ASYNC_CALL_TIMEOUT)
+        grpc_future.add_done_callback(lambda done_future: loop.call_soon_threadsafe(
+            self.__resolve_async_call, future, done_future))
+        return await future
+
+    @classmethod
+    def __resolve_async_call(cls, future, grpc_future):
+        if future.cancelled():
+            return
+
+        error = grpc_future.exception()
+        if error:
+            future.set_exception(exceptions.from_grpc_error(error))
+        else:
+            future.set_result(grpc_future.result())
+
+    def __synchronize_and_record_entry(self, entry_group_name, entry_id, entry, tags,
+                                       entries_index, skip_unchanged_tags, state_store,
+                                       fingerprint):
+        entry_name = self.synchronize_entry(entry_group_name, entry_id, entry, tags, entries_index,
+                                            skip_unchanged_tags)
+        if entry_name and state_store:
+            state_store.record_entry(entry_group_name, entry_name, entry.linked_resource,
+                                     self.__get_tags_size(tags),
+                                     entry.source_system_timestamps.update_time.seconds,
+                                     fingerprint)
+        return entry_name
+
+    def __delete_obsolete_state_entries(self, new_entries_name, entry_group_name, state_store,
+                                        workers, shard):
+        logging.info('')
+        logging.info('Starting to clean obsolete entries from the sync state...')
+
+        new_entries_name = set(new_entries_name)
+        entries_name_pending_deletion = [
+            entry_name for entry_name, linked_resource in
+            state_store.list_entries_linked_resources(entry_group_name)
+            if entry_name not in new_entries_name and self.__is_owned(linked_resource, shard)
+        ]
+
+        logging.info('%s entries will be deleted.', len(entries_name_pending_deletion))
+
+        deleted_entries_names = self.__delete_entries_concurrently(entries_name_pending_deletion,
+                                                                   workers)
+        state_store.delete_entries(entry_group_name, deleted_entries_names)
+
+    def __delete_entries_concurrently(self, entries_names, workers):
+        # Deletions are submitted in bounded batches, progress is logged as
+        # they complete. Returns the names of the deleted Entries.
+        total = len(entries_names)
+        max_pending = max(1, workers) * self.__MAX_PENDING_ENTRIES_PER_WORKER
+        deleted_entries_names = []
+        processed = 0
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for entry_name in entries_names:
+                if len(pending) >= max_pending:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    processed = self.__collect_deleted_entries(done, pending,
+                                                               deleted_entries_names, processed,
+                                                               total)
+
+                pending[executor.submit(self.delete_entry, entry_name)] = entry_name
+
+            processed = self.__collect_deleted_entries(list(pending), pending,
+                                                       deleted_entries_names, processed, total)
+
+        return deleted_entries_names
+
+    def __upsert_object_entry(self, entry_group_name, record, resolved_tag_template_name,
+                              execution_time):
+        entry_id, entry, tags = self.__make_entry_from_record(record, resolved_tag_template_name,
+                                                              execution_time)
+        return self.synchronize_entry(entry_group_name, entry_id, entry, tags) is not None
+
+    def __delete_object_entry(self, entry_group_name, record):
+        entry_name = '{}/entries/{}'.format(entry_group_name,
+                                            self.__normalize_entry_id(record.file_name))
+        try:
+            entry = self.get_entry(entry_name)
+        except (exceptions.NotFound, exceptions.PermissionDenied):
+            # Data Catalog reports missing Entries as PermissionDenied.
+            return True
+
+        # Entry ids may collide, e.g. for files differing by their extension.
+        if entry.linked_resource == record.linked_resource:
+            self.__datacatalog.delete_entry(name=entry_name)
+            self.__log_entry_operation('deleted', entry_name=entry_name)
+        return True
+
+    def __load_existing_entries_index(self, entry_group_name):
+        try:
+            return self.load_entries_index(entry_group_name)
+        except (exceptions.NotFound, exceptions.PermissionDenied):
+            logging.info(f'Entry Group {entry_group_name} does not exist yet')
+            return {}
+
+    def __plan_entries_operations(self, records, entry_group_name, entries_index,
+                                  resolved_tag_template_name, execution_time, workers, verify_tags,
+                                  entries_names):
+        max_pending = max(1, workers) * self.__MAX_PENDING_ENTRIES_PER_WORKER
+        pending = {}
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for record in records:
+                if isinstance(record, object_storage_records.ListingCursor):
+                    continue
+
+                entry_id, entry, tags = self.__make_entry_from_record(
+                    record, resolved_tag_template_name, execution_time)
+                entry_name = '{}/entries/{}'.format(entry_group_name, entry_id)
+                entries_names.add(entry_name)
+
+                if len(pending) >= max_pending:
+                    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                    yield from self.__collect_planned_operations(done, pending)
+
+                pending[executor.submit(self.__plan_entry_operation, entry_id, entry, tags, record,
+                                        entries_index, verify_tags)] = entry_name
+
+            yield from self.__collect_planned_operations(list(pending), pending)
+
+    def __plan_entry_operation(self, entry_id, entry, tags, record, entries_index, verify_tags):
+        current_entry = entries_index.get(entry_id)
+        if not current_entry:
+            return {
+                'operation': sync_plan.SyncPlan.CREATE_ENTRY,
+                'entry_id': entry_id,
+                'record': record.to_dict()
+            }
+
+        entry_changed = self.__entry_was_updated(current_entry, entry)
+        if not entry_changed and not verify_tags:
+            return None
+
+        current_tags = self.__datacatalog.list_tags(parent=current_entry.name)
+        tags_operations = [{
+            'operation': operation,
+            'template': tag.template,
+            'name': tag.name or None
+        } for operation, tag in self.__plan_tags_operations(tags, current_tags)]
+        if not entry_changed and not tags_operations:
+            return None
+
+        return {
+            'operation':
+            sync_plan.SyncPlan.UPDATE_ENTRY if entry_changed else sync_plan.SyncPlan.UPDATE_TAGS,
+            'entry_id': entry_id,
+            'record': record.to_dict(),
+            'tags_operations': tags_operations
+        }
+
+    def __plan_delete_operations(self, entries_index, entries_names, system, shard):
+        for entry in entries_index.values():
+            if entry.user_specified_system == system and entry.name not in entries_names \
+                    and self.__is_owned(entry.linked_resource, shard):
+                yield {'operation': sync_plan.SyncPlan.DELETE_ENTRY, 'name': entry.name}
+
+    def __apply_operation(self, plan, operation, execution_time):
+        # Returns whether the operation was applied.
+        kind = operation['operation']
+        if kind == sync_plan.SyncPlan.DELETE_ENTRY:
+            return self.delete_entry(operation['name'])
+
+        record_class = object_storage_records.ObjectStorageGroupRecord \
+            if 'prefix' in operation['record'] else object_storage_records.ObjectStorageRecord
+        record = record_class.from_dict(plan.system, operation['record'])
+        entry_id, entry, tags = self.__make_entry_from_record(record, plan.tag_template_name,
+                                                              execution_time)
+        entry_name = '{}/entries/{}'.format(plan.entry_group_name, entry_id)
+        entry.name = entry_name
+        if kind == sync_plan.SyncPlan.CREATE_ENTRY:
+            try:
+                self.__datacatalog.create_entry(parent=plan.entry_group_name,
+                                                entry_id=entry_id,
+                                                entry=entry)
+                self.__log_entry_operation('created', entry=entry)
+            except exceptions.AlreadyExists:
+                # Created since the plan was computed.
+                return self.synchronize_entry(plan.entry_group_name, entry_id, entry,
+                                              tags) is not None
+            self.__apply_entry_tags_operations(entry_name, [('create', tag) for tag in tags], None)
+            return True
+
+        previous_entry = None
+        if kind == sync_plan.SyncPlan.UPDATE_ENTRY:
+            # Read first, to be restored if the Tags fail to be written.
+            previous_entry = self.get_entry(name=entry_name)
+            self.update_entry(entry)
+        elif kind != sync_plan.SyncPlan.UPDATE_TAGS:
+            raise ValueError(f'Unknown sync plan operation: {kind}')
+
+        tags_by_template = {tag.template: tag for tag in tags}
+        tags_operations = []
+        for tag_operation in operation['tags_operations']:
+            tag = tags_by_template[tag_operation['template']]
+            if tag_operation['name']:
+                tag.name = tag_operation['name']
+            tags_operations.append((tag_operation['operation'], tag))
+        if kind == sync_plan.SyncPlan.UPDATE_ENTRY:
+            self.__apply_entry_tags_operations(entry_name, tags_operations, previous_entry)
+        else:
+            self.__apply_tags_operations(entry_name, tags_operations)
+        return True
+
+    def __apply_entry_tags_operations(self, entry_name, operations, previous_entry):
+        # The Entry was just written: it is reverted if its Tags fail to be,
+        # as a later plan would take it as up-to-date, see synchronize_entry.
+        try:
+            self.__apply_tags_operations(entry_name, operations)
+        except exceptions.GoogleAPICallError:
+            self.__revert_entry(entry_name, previous_entry)
+            raise
+
+    def __apply_tags_operations(self, entry_name, operations):
+        for operation, tag in operations:
+            if operation == 'create':
+                tag = self.__datacatalog.create_tag(parent=entry_name, tag=tag)
+                logging.info(f'Tag created: {tag.name}')
+            else:
+                self.__datacatalog.update_tag(tag=tag, update_mask=None)
+                logging.info(f'Tag updated: {tag.name}')
+
+    @classmethod
+    def __collect_planned_operations(cls, done, pending):
+        # Entries that could not be planned are left out of the plan, but
+        # their names are kept so they are not planned for deletion either.
+        operations = []
+        for future in done:
+            entry_name = pending.pop(future)
+            try:
+                operation = future.result()
+            except exceptions.GoogleAPICallError as e:
+                logging.warning('Entry was not planned: %s', entry_name)
+                logging.warning('Error: %s', str(e))
+                continue
+
+            if operation:
+                operations.append(operation)
+
+        return operations
+
+    @classmethod
+    def __collect_applied_operations(cls, done, pending, applied_counts, failed_counts):
+        for future in done:
+            kind = pending.pop(future)
+            try:
+                applied = future.result()
+            except Exception as e:
+                logging.warning('Sync plan operation %s failed: %s', kind, str(e))
+                applied = False
+
+            if applied:
+                applied_counts[kind] += 1
+            else:
+                failed_counts[kind] += 1
+
+    @classmethod
+    def __collect_deleted_entries(cls, done, pending, deleted_entries_names, processed, total):
+        for future in done:
+            entry_name = pending.pop(future)
+            if future.result():
+                deleted_entries_names.append(entry_name)
+
+            processed += 1
+            if processed % cls.__DELETE_PROGRESS_EVERY == 0 or processed == total:
+                logging.info(f'=> {processed}/{total} obsolete entries processed')
+
+        return processed
+
+    @classmethod
+    def __collect_synchronized_entries(cls, done, pending):
+        # Entries that failed, e.g. after running out of retries, are returned
+        # as well: deleting them as obsolete would lose their metadata.
+        entries_names = []
+        for future in done:
+            entry_name, _ = pending.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                logging.warning('Unexpected error while synchronizing entry: %s', str(e))
+
+            entries_names.append(entry_name)
+
+        return entries_names
+
+    @classmethod
+    def __add_processed_entries(cls, entry_group_name, processed_entries_names, entries_names,
+                                state_store):
+        entries_names.extend(processed_entries_names)
+        if state_store:
+            for entry_name in processed_entries_names:
+                state_store.record_run_entry(entry_group_name, entry_name)
+
+    @classmethod
+    def __save_listing_cursors(cls, entry_group_name, listing_cursors, pending, state_store):
+        # A cursor is saved once no Entry taken before it is still pending.
+        lowest_pending = min((sequence for _, sequence in pending.values()), default=math.inf)
+        while listing_cursors and listing_cursors[0][0] < lowest_pending:
+            _, listing_cursor = listing_cursors.popleft()
+            state_store.save_listing_cursor(entry_group_name, listing_cursor.bucket_name,
+                                            listing_cursor.page_token)
+
+    def __make_entries_from_records(self, records, resolved_tag_template_name, execution_time):
+        for record in records:
+            if isinstance(record, object_storage_records.ListingCursor):
+                yield record
+                continue
+
+            yield self.__make_entry_from_record(record, resolved_tag_template_name, execution_time)
+
+    @classmethod
+    def __make_entry_from_record(cls, record, resolved_tag_template_name, execution_time):
+        if isinstance(record, object_storage_records.ObjectStorageGroupRecord):
+            return cls.__make_entry_from_group_record(
+                record, cls.__get_group_tag_template_name(resolved_tag_template_name),
+                execution_time)
+
+        entry_id = cls.__normalize_entry_id(record.file_name)
+        entry = datacatalog_entity_factory.DataCatalogEntityFactory.make_entry({
+            'display_name':
+            f'{entry_id}',
+            'description':
+            f'This Entry represents the file {record.file_name} '
+            f'on system {record.system}',
+            'system':
+            record.system,
+            'type':
+            record.file_type,
+            'linked_resource':
+            record.linked_resource,
+            'time_created':
+            record.time_created,
+            'time_updated':
+            record.time_updated
+        })
+
+        tag = datacatalog_v1.types.Tag()
+        tag.template = resolved_tag_template_name
+
+        tag.fields['bucket_name'].string_value = record.bucket_name
+        tag.fields['file_url'].string_value = record.public_url
+        tag.fields['file_name'].string_value = record.file_name
+        tag.fields['file_size'].double_value = record.size
+        tag.fields['execution_time'].timestamp_value.FromJsonString(execution_time.isoformat())
+
+        return entry_id, entry, [tag]
+
+    @classmethod
+    def __make_entry_from_group_record(cls, group, group_tag_template_name, execution_time):
+        entry_id = cls.__make_group_entry_id(group)
+        entry = datacatalog_entity_factory.DataCatalogEntityFactory.make_entry({
+            'display_name':
+            f'{entry_id}',
+            'description':
+            f'This Entry represents the files under the prefix {group.prefix} '
+            f'on system {group.system} (aggregates: {cls.__make_group_fingerprint(group)})',
+            'system':
+            group.system,
+            'type':
+            cls.__GROUP_ENTRY_TYPE,
+            'linked_resource':
+            group.linked_resource,
+            'time_created':
+            group.time_created,
+            'time_updated':
+            group.time_updated
+        })
+
+        tag = datacatalog_v1.types.Tag()
+        tag.template = group_tag_template_name
+
+        tag.fields['bucket_name'].string_value = group.bucket_name
+        tag.fields['prefix'].string_value = group.prefix
+        tag.fields['files_count'].double_value = group.files_count
+        tag.fields['total_size'].double_value = group.size
+        tag.fields['file_types'].string_value = ','.join(sorted(group.file_types))
+        # Objects may be listed without their update time.
+        if group.min_time_updated:
+            tag.fields['min_time_updated'].timestamp_value.FromJsonString(
+                group.min_time_updated.isoformat())
+        if group.time_updated:
+            tag.fields['max_time_updated'].timestamp_value.FromJsonString(
+                group.time_updated.isoformat())
+        tag.fields['execution_time'].timestamp_value.FromJsonString(execution_time.isoformat())
+
+        return entry_id, entry, [tag]
+
+    @classmethod
+    def __make_group_fingerprint(cls, group):
+        # The aggregates only live in the Tag, which is not diffed when the
+        # Entry is up-to-date: e.g. a deleted file does not change the group
+        # update time. Having them in the description updates the Entry, and
+        # its Tag, whenever they change.
+        values = [
+            group.files_count, group.size,
+            sorted(group.file_types),
+            group.min_time_updated.isoformat() if group.min_time_updated else None,
+            group.time_updated.isoformat() if group.time_updated else None
+        ]
+        fingerprint = hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+        return fingerprint[:cls.__GROUP_FINGERPRINT_LENGTH]
+
+    @classmethod
+    def __get_group_tag_template_name(cls, tag_template_name):
+        project_id, location_id, _ = cls.extract_resources_from_template(tag_template_name)
+        return datacatalog_v1.DataCatalogClient.tag_template_path(project_id, location_id,
+                                                                  cls.__GROUP_TAG_TEMPLATE)
+
+    def __load_tag_templates(self, grouped):
+        # Returns the name of the Tag Template of the files; the one of the
+        # groups is derived from it.
         resolved_tag_template_name = self.get_tag_template_name()
+        self.__load_tag_template(resolved_tag_template_name, self.create_tag_template)
+        if grouped:
+            self.__load_tag_template(
+                self.__get_group_tag_template_name(resolved_tag_template_name),
+                self.create_group_tag_template)
+        return resolved_tag_template_name
+
+    def __load_tag_template(self, resolved_tag_template_name, create_tag_template):
+        if resolved_tag_template_name in self.__loaded_tag_templates:
+            return
+
+        logging.info('===> Load the Tag Template')
+        logging.info('')
         try:
             self.__datacatalog.get_tag_template(resolved_tag_template_name)
         except exceptions.AlreadyExists:
             logging.info(f'Tag Template {resolved_tag_template_name} already exists.')
         except exceptions.PermissionDenied:
-            self.create_tag_template(resolved_tag_template_name)
-        return resolved_tag_template_name
+            create_tag_template(resolved_tag_template_name)
+        self.__loaded_tag_templates.add(resolved_tag_template_name)
+
+    def __record_execution_time(self, entry_group_name, execution_time):
+        # Tags are only rewritten when the file changes, so the time of the
+        # last run is kept once on the Entry Group instead.
+        entry_group = datacatalog_v1.types.EntryGroup()
+        entry_group.name = entry_group_name
+        entry_group.description = f'{DataCatalogHelper.__ENTRY_GROUP_DESCRIPTION}, last' \
+                                  f' synchronized at {execution_time.isoformat()}'
+        try:
+            self.__datacatalog.update_entry_group(entry_group=entry_group,
+                                                  update_mask={'paths': ['description']})
+        except exceptions.GoogleAPICallError as e:
+            logging.info('Unable to record the execution time on Entry Group: %s',
+                         entry_group_name)
+            logging.debug(str(e))
 
     def __load_entry_group(self, entry_group_id, entry_group_name, location_id, project_id):
+        if entry_group_name in self.__loaded_entry_groups:
+            return
+
         try:
             self.get_entry_group(entry_group_name)
         except exceptions.GoogleAPICallError:
@@ -334,10 +1298,77 @@ class DataCatalogHelper:
                 'display_name':
                 'Container for object storage entries',
                 'description':
-                'This Entry Group is used as a container for object storage '
-                'entries'
+                DataCatalogHelper.__ENTRY_GROUP_DESCRIPTION
             })
             self.create_entry_group(project_id, location_id, entry_group_id, entry_group)
+        self.__loaded_entry_groups.add(entry_group_name)
+
+    def __upsert_entry(self, entry_group_name, entry_id, entry, entries_index):
+        # Returns the persisted Entry, whether it was created or updated, and
+        # the Entry it replaced, if any.
+        persisted_entry = entry
+        entry_changed = True
+        current_entry = None
+        entry_name = '{}/entries/{}'.format(entry_group_name, entry_id)
+        persisted_entry.name = entry_name
+        try:
+            current_entry = self.__get_current_entry(entry_name, entry_id, entries_index)
+            if current_entry:
+                persisted_entry = current_entry
+                self.__log_entry_operation('already exists', entry_name=entry_name)
+                if self.__entry_was_updated(persisted_entry, entry):
+                    persisted_entry = self.update_entry(entry=entry)
+                else:
+                    entry_changed = False
+                    self.__log_entry_operation('is up-to-date', entry=persisted_entry)
+            else:
+                self.__log_entry_operation('does not exist', entry_name=entry_name)
+                persisted_entry = self.create_entry(entry_group_name=entry_group_name,
+                                                    entry_id=entry_id,
+                                                    entry=entry)
+        except exceptions.AlreadyExists:
+            # The index is a snapshot, the Entry may have been created since.
+            return self.__upsert_entry(entry_group_name, entry_id, entry, None)
+        except exceptions.GoogleAPICallError as e:
+            logging.warning('Entry was not updated: %s', entry_name)
+            logging.warning('Error: %s', str(e))
+
+        return persisted_entry, entry_changed, current_entry
+
+    def __revert_entry(self, entry_name, previous_entry):
+        # Deletes the Entry when it was just created, restores it otherwise.
+        if previous_entry is None:
+            self.delete_entry(entry_name)
+            return
+
+        try:
+            self.update_entry(previous_entry)
+            self.__log_entry_operation('reverted', entry_name=entry_name)
+        except exceptions.GoogleAPICallError as e:
+            logging.warning('Entry was not reverted: %s', entry_name)
+            logging.warning('Error: %s', str(e))
+
+    def __get_current_entry(self, entry_name, entry_id, entries_index):
+        if entries_index is not None:
+            return entries_index.get(entry_id)
+
+        try:
+            return self.get_entry(name=entry_name)
+        except exceptions.PermissionDenied:
+            return None
+
+    @classmethod
+    def __get_tags_size(cls, tags):
+        # File size, or total size of a group.
+        for tag in tags:
+            for field_id in ('file_size', 'total_size'):
+                if field_id in tag.fields:
+                    return tag.fields[field_id].double_value
+        return None
+
+    @classmethod
+    def __is_owned(cls, linked_resource, shard):
+        return not shard or shard.owns_linked_resource(linked_resource)
 
     @classmethod
     def __entry_was_updated(cls, current_entry, new_entry):
@@ -371,9 +1402,53 @@ class DataCatalogHelper:
 
         return object_1 == object_2
 
+    @classmethod
+    def __plan_tags_operations(cls, tags, current_tags):
+        # Returns the ('create' | 'update', tag) operations needed to bring
+        # the current Tags in line with the given ones.
+        current_tags_by_template = {
+            current_tag.template: current_tag
+            for current_tag in current_tags
+        }
+        operations = []
+        for tag in tags:
+            current_tag = current_tags_by_template.get(tag.template)
+            if not current_tag:
+                operations.append(('create', tag))
+            elif not cls.__tags_fields_are_equal(tag, current_tag):
+                tag.name = current_tag.name
+                operations.append(('update', tag))
+
+        return operations
+
+    @classmethod
+    def __make_fingerprint(cls, entry, tags):
+        values = [
+            entry.user_specified_system, entry.user_specified_type, entry.display_name,
+            entry.description, entry.linked_resource,
+            entry.source_system_timestamps.create_time.seconds,
+            entry.source_system_timestamps.update_time.seconds
+        ]
+        for tag in tags:
+            values.append(tag.template)
+            for field_id in sorted(tag.fields):
+                if field_id in cls.__VOLATILE_TAG_FIELDS:
+                    continue
+
+                field = tag.fields[field_id]
+                values.extend([
+                    field_id, field.bool_value, field.double_value, field.string_value,
+                    field.timestamp_value.seconds, field.enum_value.display_name
+                ])
+
+        return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
     @classmethod
     def __tags_fields_are_equal(cls, tag_1, tag_2):
         for field_id in tag_1.fields:
+            if field_id in cls.__VOLATILE_TAG_FIELDS:
+                continue
+
             tag_1_field = tag_1.fields[field_id]
             tag_2_field = tag_2.fields[field_id]
 
@@ -404,4 +1479,29 @@ class DataCatalogHelper:
 
     @classmethod
     def __normalize_entry_id(cls, file_name):
-        return file_name.split('.')[0].replace('-', '_')
+        entry_id = file_name.split('.')[0].replace('-', '_')
+        if re.fullmatch(r'[a-zA-Z\d_]+', entry_id) and len(entry_id) <= cls.__MAX_ENTRY_ID_LENGTH:
+            return entry_id
+
+        # Data Catalog rejects such ids, e.g. of nested object names, so no
+        # Entry has them yet. Their other characters are replaced as well, and
+        # the hash tells apart e.g. a/b.csv from a_b.csv.
+        return cls.__append_path_hash(re.sub(r'[^a-zA-Z\d_]', '_', entry_id), file_name)
+
+    @classmethod
+    def __make_group_entry_id(cls, group):
+        # Partition layouts are often the same across buckets, so the bucket
+        # name is part of the id.
+        path = f'{group.bucket_name}/{group.prefix.rstrip("/")}'
+        entry_id = re.sub(r'[^a-zA-Z\d_]', '_', path)
+        if len(entry_id) <= cls.__MAX_ENTRY_ID_LENGTH:
+            return entry_id
+
+        return cls.__append_path_hash(entry_id, path)
+
+    @classmethod
+    def __append_path_hash(cls, entry_id, path):
+        # Ids are truncated to Data Catalog's length limit, and suffixed with
+        # a hash of the whole path to remain unique.
+        path_hash = hashlib.sha1(path.encode('utf-8')).hexdigest()[:cls.__ENTRY_ID_HASH_LENGTH]
+        return f'{entry_id[:cls.__MAX_ENTRY_ID_LENGTH - len(path_hash) - 1]}_{path_hash}'
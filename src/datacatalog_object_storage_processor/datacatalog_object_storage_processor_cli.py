@@ -1,12 +1,24 @@
 import argparse
 import logging
+import signal
 import sys
+import threading
 
-from datacatalog_object_storage_processor.object_storage_processor import \
-    ObjectStorageProcessor
+from datacatalog_object_storage_processor import batch_sync_config
+from datacatalog_object_storage_processor import sync_options
+from datacatalog_object_storage_processor import utils
+from datacatalog_object_storage_processor.object_storage import object_change_events
+from datacatalog_object_storage_processor.object_storage import object_storage_filter
 
 
 class DatacatalogObjectStorageProcessorCLI:
+    # sync_entries options whose flag differs from their name.
+    __OPTIONS_FLAGS = {
+        'manifest_path': '--manifest-out',
+        'plan_path': '--plan-out',
+        'snapshot_path': '--snapshot-out',
+        'from_snapshot_path': '--from-snapshot'
+    }
 
     @classmethod
     def run(cls, argv):
@@ -21,11 +33,121 @@ class DatacatalogObjectStorageProcessorCLI:
         sync_entries_parser = object_storage_subparsers.add_parser('sync-entries',
                                                                    help='Synchronize Entries')
         cls.__add_common_args(sync_entries_parser)
+        cls.__add_sync_args(sync_entries_parser)
         sync_entries_parser.set_defaults(func=cls.__sync_entries)
         delete_entries_parser = object_storage_subparsers.add_parser('delete-entries',
                                                                      help='Delete Entries')
         cls.__add_common_args(delete_entries_parser)
+        delete_entries_parser.add_argument('--workers',
+                                           type=int,
+                                           default=1,
+                                           help='Number of Entries deleted concurrently')
         delete_entries_parser.set_defaults(func=cls.__delete_entries)
+        merge_manifests_parser = object_storage_subparsers.add_parser(
+            'merge-shard-manifests',
+            help='Merge the manifests of a sharded sync and delete obsolete Entries')
+        cls.__add_common_args(merge_manifests_parser)
+        merge_manifests_parser.add_argument('--manifest',
+                                            action='append',
+                                            required=True,
+                                            help='Manifest written by one shard, repeat it for'
+                                            ' every shard')
+        merge_manifests_parser.add_argument('--workers',
+                                            type=int,
+                                            default=1,
+                                            help='Number of Entries deleted concurrently')
+        merge_manifests_parser.set_defaults(func=cls.__merge_shard_manifests)
+        apply_plan_parser = object_storage_subparsers.add_parser(
+            'apply-plan',
+            aliases=['apply'],
+            help='Apply a plan written by sync-entries --plan-out')
+        cls.__add_common_args(apply_plan_parser)
+        apply_plan_parser.add_argument('--plan', required=True, help='Sync plan to apply')
+        apply_plan_parser.add_argument('--workers',
+                                       type=int,
+                                       default=1,
+                                       help='Number of operations applied concurrently')
+        apply_plan_parser.set_defaults(func=cls.__apply_plan)
+        watch_parser = object_storage_subparsers.add_parser(
+            'watch',
+            aliases=['apply-events'],
+            help='Synchronize Entries from object change notifications')
+        cls.__add_common_args(watch_parser)
+        events_source_group = watch_parser.add_mutually_exclusive_group(required=True)
+        events_source_group.add_argument('--subscription',
+                                         help='Pub/Sub subscription of the bucket notifications,'
+                                         ' as projects/PROJECT/subscriptions/NAME or NAME')
+        events_source_group.add_argument('--events-file',
+                                         help='JSON lines file of notifications, each with its'
+                                         ' attributes and data')
+        watch_parser.add_argument('--window',
+                                  type=float,
+                                  default=5,
+                                  help='Seconds over which events are coalesced before being'
+                                  ' applied')
+        watch_parser.add_argument('--workers',
+                                  type=int,
+                                  default=1,
+                                  help='Number of changes applied concurrently')
+        cls.__add_filter_args(watch_parser)
+        watch_parser.set_defaults(func=cls.__watch)
+        serve_parser = object_storage_subparsers.add_parser(
+            'serve', help='Run syncs on a schedule or on request in a long-running process')
+        cls.__add_common_args(serve_parser)
+        cls.__add_sync_args(serve_parser)
+        serve_parser.add_argument('--interval',
+                                  type=float,
+                                  help='Synchronize the Entry Group every this many seconds,'
+                                  ' otherwise only on request')
+        serve_parser.add_argument('--host',
+                                  default='127.0.0.1',
+                                  help='Address the jobs HTTP API listens on')
+        serve_parser.add_argument('--port',
+                                  type=int,
+                                  default=8080,
+                                  help='Port the jobs HTTP API listens on')
+        serve_parser.add_argument('--max-concurrent-jobs',
+                                  type=int,
+                                  default=1,
+                                  help='Number of jobs, each syncing an Entry Group, run'
+                                  ' concurrently')
+        serve_parser.set_defaults(func=cls.__serve)
+        sync_batch_parser = object_storage_subparsers.add_parser(
+            'sync-batch',
+            aliases=['batch'],
+            help='Synchronize several Entry Groups, each with its own buckets and objects, from'
+            ' a single listing')
+        cls.__add_common_args(sync_batch_parser, entry_group=False)
+        sync_batch_parser.add_argument('--config',
+                                       required=True,
+                                       help='JSON or YAML file of the routes, each from bucket'
+                                       ' prefixes and object filters to an Entry Group')
+        sync_batch_parser.add_argument('--workers',
+                                       type=int,
+                                       default=1,
+                                       help='Number of Entries synchronized concurrently')
+        sync_batch_parser.add_argument('--bucket-workers',
+                                       type=int,
+                                       default=1,
+                                       help='Number of buckets listed concurrently')
+        sync_batch_parser.add_argument('--bucket-timeout',
+                                       type=float,
+                                       help='Skip buckets whose listing takes longer than this'
+                                       ' many seconds')
+        sync_batch_parser.add_argument('--prefix-workers',
+                                       type=int,
+                                       default=1,
+                                       help='Split each bucket by object prefixes and list up to'
+                                       ' this many prefixes concurrently')
+        sync_batch_parser.add_argument('--verify-tags',
+                                       action='store_true',
+                                       help='Check the Tags of up-to-date Entries as well, at the'
+                                       ' cost of one list_tags call per Entry')
+        sync_batch_parser.add_argument('--state-path',
+                                       help='SQLite file that records what was synchronized in'
+                                       ' every Entry Group, so later runs only send the changed'
+                                       ' Entries')
+        sync_batch_parser.set_defaults(func=cls.__sync_batch)
 
     @classmethod
     def __setup_logging(cls):
@@ -46,32 +168,386 @@ class DatacatalogObjectStorageProcessorCLI:
         args.func(args)
 
     @classmethod
-    def __add_common_args(cls, entries_parser):
+    def __add_common_args(cls, entries_parser, entry_group=True):
         entries_parser.add_argument('--type',
                                     help='Object Storage type, '
                                     'supported values (cloud-storage,)',
                                     required=True)
         entries_parser.add_argument('--project-id', help='Project id', required=True)
-        entries_parser.add_argument('--entry-group-name',
-                                    help='Name of the Entry Group,'
-                                    'used as a container for the object storage enties'
-                                    'i.e: '
-                                    'projects/my-project/locations/us-central1/entryGroups/'
-                                    'my-entry-group',
-                                    required=True)
-        entries_parser.add_argument('--bucket-prefix',
-                                    help='Specify a bucket prefix if you want to avoid scanning'
-                                    ' too many GCS buckets')
+        # Commands handling several Entry Groups take them from elsewhere.
+        if entry_group:
+            entries_parser.add_argument('--entry-group-name',
+                                        help='Name of the Entry Group,'
+                                        'used as a container for the object storage enties'
+                                        'i.e: '
+                                        'projects/my-project/locations/us-central1/entryGroups/'
+                                        'my-entry-group',
+                                        required=True)
+            entries_parser.add_argument('--bucket-prefix',
+                                        help='Specify a bucket prefix if you want to avoid'
+                                        ' scanning too many GCS buckets')
+        entries_parser.add_argument('--read-qps',
+                                    type=float,
+                                    help='Maximum Data Catalog read calls per second')
+        entries_parser.add_argument('--write-qps',
+                                    type=float,
+                                    help='Maximum Data Catalog write calls per second')
+        entries_parser.add_argument('--storage-qps',
+                                    type=float,
+                                    help='Maximum Cloud Storage calls per second')
+        entries_parser.add_argument('--grpc-channels',
+                                    type=int,
+                                    help='Number of gRPC channels Data Catalog calls are spread'
+                                    ' over, each carrying a limited number of concurrent calls')
+        entries_parser.add_argument('--grpc-keepalive',
+                                    type=float,
+                                    help='Seconds between the pings keeping the gRPC'
+                                    ' connections open')
+        entries_parser.add_argument('--http-pool-size',
+                                    type=int,
+                                    help='Number of Cloud Storage HTTP connections kept open,'
+                                    ' at least the number of concurrent listings')
+        entries_parser.add_argument('--metrics-out',
+                                    help='File the API call metrics are written to, in the'
+                                    ' Prometheus text format if it ends with .prom, as JSON'
+                                    ' otherwise')
+        entries_parser.add_argument('--metrics-push-url',
+                                    help='URL the API call metrics are pushed to in the'
+                                    ' Prometheus text format, e.g. a Pushgateway job URL')
+        entries_parser.add_argument('--metrics-interval',
+                                    type=float,
+                                    help='Also export the metrics every this many seconds'
+                                    ' while running')
+
+    @classmethod
+    def __add_sync_args(cls, sync_entries_parser):
+        sync_entries_parser.add_argument('--stream',
+                                         action='store_true',
+                                         help='Stream listed files to Data Catalog page by page,'
+                                         ' keeping memory bounded on large buckets')
+        sync_entries_parser.add_argument('--workers',
+                                         type=int,
+                                         default=1,
+                                         help='Number of Entries synchronized concurrently')
+        sync_entries_parser.add_argument('--bucket-workers',
+                                         type=int,
+                                         default=1,
+                                         help='Number of buckets listed concurrently')
+        sync_entries_parser.add_argument('--bucket-timeout',
+                                         type=float,
+                                         help='Skip buckets whose listing takes longer than'
+                                         ' this many seconds')
+        sync_entries_parser.add_argument('--prefix-workers',
+                                         type=int,
+                                         default=1,
+                                         help='Split each bucket by object prefixes and list up'
+                                         ' to this many prefixes concurrently')
+        sync_entries_parser.add_argument('--verify-tags',
+                                         action='store_true',
+                                         help='Check the Tags of up-to-date Entries as well,'
+                                         ' at the cost of one list_tags call per Entry')
+        sync_entries_parser.add_argument('--engine',
+                                         choices=['threads', 'asyncio'],
+                                         default='threads',
+                                         help='Sync engine; asyncio streams the listing into'
+                                         ' non-blocking Data Catalog calls')
+        sync_entries_parser.add_argument('--max-in-flight',
+                                         type=int,
+                                         default=500,
+                                         help='Entries in progress at once with the asyncio'
+                                         ' engine')
+        sync_entries_parser.add_argument('--state-path',
+                                         help='SQLite file that records what was synchronized,'
+                                         ' so later runs only send the changed Entries')
+        sync_entries_parser.add_argument('--shard-index',
+                                         type=int,
+                                         default=0,
+                                         help='Index of the shard to synchronize, from 0 to'
+                                         ' --shard-count - 1')
+        sync_entries_parser.add_argument('--shard-count',
+                                         type=int,
+                                         default=1,
+                                         help='Number of shards the sync is split into')
+        sync_entries_parser.add_argument('--shard-by',
+                                         choices=['bucket', 'object'],
+                                         default='bucket',
+                                         help='Whether buckets or objects are assigned to shards')
+        sync_entries_parser.add_argument('--manifest-out',
+                                         help='File the names of the synchronized Entries are'
+                                         ' written to, see merge-shard-manifests')
+        sync_entries_parser.add_argument('--resume',
+                                         action='store_true',
+                                         help='Carry on with the run interrupted last, from the'
+                                         ' checkpoint kept in --state-path')
+        sync_entries_parser.add_argument('--plan-out',
+                                         help='Only write the operations the sync would make to'
+                                         ' this file, see apply-plan')
+        sync_entries_parser.add_argument('--group-depth',
+                                         type=int,
+                                         help='Synchronize one Entry per prefix made of this'
+                                         ' number of path segments instead of one per object')
+        sync_entries_parser.add_argument('--group-pattern',
+                                         help='Synchronize one Entry per prefix matched by this'
+                                         ' regular expression instead of one per object')
+        sync_entries_parser.add_argument('--snapshot-out',
+                                         help='File the listed files are written to, while'
+                                         ' listing, see --from-snapshot')
+        sync_entries_parser.add_argument('--from-snapshot',
+                                         help='Synchronize the files of a snapshot written by'
+                                         ' --snapshot-out instead of listing the buckets')
+        cls.__add_filter_args(sync_entries_parser)
+
+    @classmethod
+    def __add_filter_args(cls, parser):
+        parser.add_argument('--include',
+                            action='append',
+                            help='Only synchronize the objects whose name matches this glob,'
+                            ' repeat it to match any of several globs')
+        parser.add_argument('--exclude',
+                            action='append',
+                            help='Do not synchronize the objects whose name matches this glob,'
+                            ' e.g. \'*/_SUCCESS\', repeat it for several globs')
+        parser.add_argument('--include-regex',
+                            action='append',
+                            help='Only synchronize the objects whose name contains a match of'
+                            ' this regular expression')
+        parser.add_argument('--exclude-regex',
+                            action='append',
+                            help='Do not synchronize the objects whose name contains a match'
+                            ' of this regular expression')
+        parser.add_argument('--object-prefix',
+                            action='append',
+                            help='Only list and synchronize the objects whose name starts with'
+                            ' this prefix, repeat it for several prefixes')
+        parser.add_argument('--extension',
+                            action='append',
+                            help='Only synchronize the objects with these comma separated'
+                            ' extensions, e.g. parquet,csv')
+        parser.add_argument('--min-size',
+                            type=int,
+                            help='Only synchronize the objects of at least this many bytes')
+        parser.add_argument('--max-size',
+                            type=int,
+                            help='Only synchronize the objects of at most this many bytes')
+        parser.add_argument('--min-age',
+                            type=object_storage_filter.ObjectStorageFilter.parse_duration,
+                            help='Only synchronize the objects last updated at least this long'
+                            ' ago, in seconds or as a duration such as 15m, 12h or 30d')
+        parser.add_argument('--max-age',
+                            type=object_storage_filter.ObjectStorageFilter.parse_duration,
+                            help='Only synchronize the objects last updated at most this long'
+                            ' ago, in seconds or as a duration such as 15m, 12h or 30d')
+
+    @classmethod
+    def __make_object_filter(cls, args):
+        # Returns None when no filter argument is given.
+        filter_args = {
+            'include':
+            args.include,
+            'exclude':
+            args.exclude,
+            'include_regex':
+            args.include_regex,
+            'exclude_regex':
+            args.exclude_regex,
+            'object_prefixes':
+            args.object_prefix,
+            'extensions': [
+                extension for extensions in args.extension or []
+                for extension in extensions.split(',') if extension.strip()
+            ],
+            'min_size':
+            args.min_size,
+            'max_size':
+            args.max_size,
+            'min_age':
+            args.min_age,
+            'max_age':
+            args.max_age
+        }
+        if all(value is None or value == [] for value in filter_args.values()):
+            return None
+
+        try:
+            return object_storage_filter.ObjectStorageFilter(**filter_args)
+        except ValueError as e:
+            raise SystemExit(str(e))
 
     @classmethod
     def __sync_entries(cls, args):
-        ObjectStorageProcessor(args.type,
-                               args.project_id).sync_entries(args.entry_group_name,
-                                                             args.bucket_prefix)
+        cls.__check_sync_args(args)
+        options = cls.__make_sync_options(args)
+        cls.__run_processor(
+            args, lambda processor: processor.sync_entries(args.entry_group_name, **options))
+
+    @classmethod
+    def __check_sync_args(cls, args):
+        try:
+            sync_options.SyncOptions.check(cls.__make_sync_options(args), cls.__get_option_flag)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+    @classmethod
+    def __get_option_flag(cls, option):
+        return cls.__OPTIONS_FLAGS.get(option) or f'--{option.replace("_", "-")}'
+
+    @classmethod
+    def __make_sync_options(cls, args):
+        return {
+            'bucket_prefix': args.bucket_prefix,
+            'stream': args.stream,
+            'workers': args.workers,
+            'bucket_workers': args.bucket_workers,
+            'bucket_timeout': args.bucket_timeout,
+            'prefix_workers': args.prefix_workers,
+            'verify_tags': args.verify_tags,
+            'state_path': args.state_path,
+            'engine': args.engine,
+            'max_in_flight': args.max_in_flight,
+            'resume': args.resume,
+            'shard_index': args.shard_index,
+            'shard_count': args.shard_count,
+            'shard_by': args.shard_by,
+            'manifest_path': args.manifest_out,
+            'plan_path': args.plan_out,
+            'group_depth': args.group_depth,
+            'group_pattern': args.group_pattern,
+            'snapshot_path': args.snapshot_out,
+            'from_snapshot_path': args.from_snapshot,
+            'object_filter': cls.__make_object_filter(args)
+        }
 
     @classmethod
     def __delete_entries(cls, args):
-        ObjectStorageProcessor(args.type, args.project_id).delete_entries(args.entry_group_name)
+        cls.__run_processor(
+            args, lambda processor: processor.delete_entries(args.entry_group_name,
+                                                             workers=args.workers))
+
+    @classmethod
+    def __merge_shard_manifests(cls, args):
+        cls.__run_processor(
+            args, lambda processor: processor.merge_shard_manifests(
+                args.entry_group_name, args.manifest, workers=args.workers))
+
+    @classmethod
+    def __apply_plan(cls, args):
+        cls.__run_processor(
+            args, lambda processor: processor.apply_sync_plan(
+                args.entry_group_name, args.plan, workers=args.workers))
+
+    @classmethod
+    def __watch(cls, args):
+        if args.events_file:
+            source = object_change_events.JsonLinesEventSource(args.events_file)
+        else:
+            subscription = args.subscription
+            if '/' not in subscription:
+                subscription = f'projects/{args.project_id}/subscriptions/{subscription}'
+            source = object_change_events.PubSubEventSource(subscription)
+
+        try:
+            cls.__run_processor(
+                args, lambda processor: processor.watch_object_changes(
+                    args.entry_group_name,
+                    source,
+                    bucket_prefix=args.bucket_prefix,
+                    window=args.window,
+                    workers=args.workers,
+                    object_filter=cls.__make_object_filter(args)))
+        finally:
+            source.close()
+
+    @classmethod
+    def __serve(cls, args):
+        cls.__check_sync_args(args)
+        if args.interval is not None and args.interval <= 0:
+            raise SystemExit('--interval must be positive')
+
+        from datacatalog_object_storage_processor import sync_service
+
+        rpc_metrics = utils.RpcMetrics()
+        processor = cls.__make_processor(args, rpc_metrics)
+        # The sync options of the command line are the defaults of the jobs
+        # added later through the HTTP API.
+        options = cls.__make_sync_options(args)
+        service = sync_service.SyncService(processor,
+                                           options,
+                                           max_concurrent_jobs=args.max_concurrent_jobs,
+                                           rpc_metrics=rpc_metrics)
+        server = service.make_http_server(args.host, args.port)
+        # Running jobs are finished on SIGTERM, e.g. when a container stops.
+        signal.signal(signal.SIGTERM,
+                      lambda *signal_args: threading.Thread(target=server.shutdown).start())
+
+        with utils.MetricsExporter(rpc_metrics, args.metrics_out, args.metrics_push_url,
+                                   args.metrics_interval):
+            service.add_job(
+                args.entry_group_name.split('/')[-1], args.entry_group_name, args.interval)
+            service.start()
+            logging.info(f'===> Serving sync jobs on http://{args.host}:{args.port}')
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                logging.info('===> Waiting for the running sync jobs...')
+                service.stop()
+
+        logging.info('===> API calls summary')
+        rpc_metrics.log_summary()
+
+    @classmethod
+    def __sync_batch(cls, args):
+        try:
+            config = batch_sync_config.BatchSyncConfig.read(args.config)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f'Invalid batch sync configuration: {e}')
+
+        failed_entry_groups_names = cls.__run_processor(
+            args, lambda processor: processor.sync_batch(config,
+                                                         workers=args.workers,
+                                                         bucket_workers=args.bucket_workers,
+                                                         bucket_timeout=args.bucket_timeout,
+                                                         prefix_workers=args.prefix_workers,
+                                                         verify_tags=args.verify_tags,
+                                                         state_path=args.state_path))
+        if failed_entry_groups_names:
+            raise SystemExit(f'Failed to synchronize {failed_entry_groups_names}')
+
+    @classmethod
+    def __run_processor(cls, args, run):
+        rpc_metrics = utils.RpcMetrics()
+        processor = cls.__make_processor(args, rpc_metrics)
+        # Metrics are exported even when the run fails, to tell where it did.
+        with utils.MetricsExporter(rpc_metrics, args.metrics_out, args.metrics_push_url,
+                                   args.metrics_interval):
+            result = run(processor)
+
+        logging.info('===> API calls summary')
+        rpc_metrics.log_summary()
+        return result
+
+    @classmethod
+    def __make_processor(cls, args, rpc_metrics):
+        # Imported here, along with the client libraries, so the commands
+        # parse and validate their arguments without that cost.
+        from datacatalog_object_storage_processor.object_storage_processor import \
+            ObjectStorageProcessor
+
+        try:
+            transport_options = utils.TransportOptions(args.grpc_channels, args.grpc_keepalive,
+                                                       args.http_pool_size)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+        return ObjectStorageProcessor(args.type,
+                                      args.project_id,
+                                      read_qps=args.read_qps,
+                                      write_qps=args.write_qps,
+                                      storage_qps=args.storage_qps,
+                                      rpc_metrics=rpc_metrics,
+                                      transport_options=transport_options)
 
 
 def main():
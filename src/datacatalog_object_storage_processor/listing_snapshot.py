@@ -0,0 +1,260 @@
+import array
+import datetime
+import json
+import logging
+import struct
+import sys
+
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ListingSnapshot:
+    """
+    ListingSnapshot keeps the files listed by a sync on disk, so they can be
+    synchronized again, e.g. to retry, to plan or to fill other Entry
+    Groups, without listing the buckets again.
+
+    The file is a sequence of blocks, each a JSON document prefixed by its
+    length. The header block holds the scope of the listing, every chunk
+    block is followed by the columns of up to CHUNK_SIZE records, see
+    ObjectStorageRecords.to_columns, and the footer block holds the records
+    count, which tells a complete snapshot from a truncated one, and
+    whether every bucket was fully listed.
+    """
+
+    CHUNK_SIZE = 10000
+
+    __FORMAT = 'object_storage_listing_snapshot'
+    __VERSION = 1
+    __LENGTH = struct.Struct('<I')
+    # Typecodes of the bucket id, size and timestamps columns.
+    __COLUMNS_TYPECODES = ('I', 'q', 'd', 'd')
+    __FILE_NAMES_SEPARATOR = '\n'
+
+    def __init__(self,
+                 path,
+                 system,
+                 created_time,
+                 bucket_prefix,
+                 shard,
+                 records_count,
+                 complete,
+                 object_filter=None):
+        self.path = path
+        self.system = system
+        self.created_time = created_time
+        self.bucket_prefix = bucket_prefix
+        self.shard = shard
+        self.records_count = records_count
+        self.complete = complete
+        self.object_filter = object_filter
+
+    @classmethod
+    def write_through(cls,
+                      path,
+                      system,
+                      records_pages,
+                      bucket_prefix=None,
+                      shard=None,
+                      complete=True,
+                      object_filter=None):
+        """
+        Lazily yield `records_pages`, as ObjectStorageRecords or
+        ListingCursor items, while writing the records to a new snapshot at
+        `path`. The snapshot is only completed once `records_pages` is
+        exhausted. `complete` tells whether every bucket was fully listed,
+        and `object_filter` is the ObjectStorageFilter of the listing.
+        """
+        records_count = 0
+        with open(path, 'wb') as snapshot_file:
+            cls.__write_block(
+                snapshot_file, {
+                    'format': cls.__FORMAT,
+                    'version': cls.__VERSION,
+                    'system': system,
+                    'created_time': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'bucket_prefix': bucket_prefix,
+                    'shard': cls.__shard_to_dict(shard),
+                    'object_filter': cls.__filter_to_dict(object_filter),
+                    'byteorder': sys.byteorder
+                })
+            for records in records_pages:
+                if isinstance(records, object_storage_records.ObjectStorageRecords):
+                    for start in range(0, len(records), cls.CHUNK_SIZE):
+                        records_count += cls.__write_chunk(snapshot_file, records, start,
+                                                           start + cls.CHUNK_SIZE)
+                yield records
+
+            cls.__write_block(snapshot_file, {
+                'records_count': records_count,
+                'complete': complete
+            })
+
+        logging.info(f'{records_count} files written to the listing snapshot: {path}')
+
+    @classmethod
+    def write(cls,
+              path,
+              system,
+              records,
+              bucket_prefix=None,
+              shard=None,
+              complete=True,
+              object_filter=None):
+        for _ in cls.write_through(path, system, [records], bucket_prefix, shard, complete,
+                                   object_filter):
+            pass
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read the header and the footer of the snapshot at `path`. Records
+        are only loaded when iterated, see iterate_records_pages.
+        """
+        records_count = 0
+        footer = None
+        with open(path, 'rb') as snapshot_file:
+            header = cls.__read_block(snapshot_file)
+            if not header or header.get('format') != cls.__FORMAT:
+                raise ValueError(f'Not a listing snapshot: {path}')
+            if header['version'] != cls.__VERSION:
+                raise ValueError(f'Unsupported listing snapshot version: {header["version"]}')
+
+            while True:
+                block = cls.__read_block(snapshot_file)
+                if block is None:
+                    break
+                if footer is not None:
+                    raise ValueError(f'Unexpected content after the snapshot footer: {path}')
+                if 'columns_sizes' in block:
+                    snapshot_file.seek(sum(block['columns_sizes']), 1)
+                    records_count += block['records_count']
+                else:
+                    footer = block
+
+        if not footer or footer['records_count'] != records_count:
+            raise ValueError(f'Truncated listing snapshot: {path}')
+
+        return cls(path, header['system'], header['created_time'], header['bucket_prefix'],
+                   header['shard'], records_count, footer['complete'], header.get('object_filter'))
+
+    def iterate_records_pages(self, bucket_prefix=None, shard=None, object_filter=None):
+        """
+        Yield the records of the snapshot, one ObjectStorageRecords per
+        chunk, keeping only those of the buckets starting with
+        `bucket_prefix`, owned by `shard`, an ObjectStorageShard, and kept
+        by `object_filter`, an ObjectStorageFilter.
+        """
+        self.__check_scope(bucket_prefix, shard, object_filter)
+        return self.__iterate_records_pages(bucket_prefix, shard, object_filter)
+
+    def __iterate_records_pages(self, bucket_prefix, shard, object_filter):
+        with open(self.path, 'rb') as snapshot_file:
+            header = self.__read_block(snapshot_file)
+            swap_bytes = header['byteorder'] != sys.byteorder
+            while True:
+                block = self.__read_block(snapshot_file)
+                if block is None or 'columns_sizes' not in block:
+                    return
+
+                records = self.__read_chunk(snapshot_file, block, swap_bytes)
+                if bucket_prefix or shard:
+                    records = self.__filter_records(records, bucket_prefix, shard)
+                if object_filter:
+                    records = object_filter.filter_records(records)
+                if len(records) > 0:
+                    yield records
+
+    def __check_scope(self, bucket_prefix, shard, object_filter):
+        # Files out of the scope of the snapshot would be taken as deleted.
+        if self.object_filter and self.object_filter != self.__filter_to_dict(object_filter):
+            raise ValueError(f'The listing snapshot only holds the files kept by the filter'
+                             f' {self.object_filter}')
+        if self.bucket_prefix and not (bucket_prefix or '').startswith(self.bucket_prefix):
+            raise ValueError(f'The listing snapshot only holds the buckets starting with'
+                             f' {self.bucket_prefix}')
+        if self.shard and self.shard != self.__shard_to_dict(shard):
+            raise ValueError(f'The listing snapshot only holds shard {self.shard}')
+
+    @classmethod
+    def __write_chunk(cls, snapshot_file, records, start, stop):
+        bucket_names, bucket_column, file_name_column, size_column, time_created_column, \
+            time_updated_column = records.to_columns(start, stop)
+        # Only the buckets of the chunk are kept, renumbered.
+        chunk_bucket_ids = {}
+        chunk_bucket_column = array.array(
+            'I', (chunk_bucket_ids.setdefault(bucket_id, len(chunk_bucket_ids))
+                  for bucket_id in bucket_column))
+        file_names = cls.__FILE_NAMES_SEPARATOR.join(file_name_column).encode('utf-8')
+        columns = [
+            chunk_bucket_column.tobytes(), file_names,
+            size_column.tobytes(),
+            time_created_column.tobytes(),
+            time_updated_column.tobytes()
+        ]
+
+        cls.__write_block(
+            snapshot_file, {
+                'records_count': len(file_name_column),
+                'bucket_names': [bucket_names[bucket_id] for bucket_id in chunk_bucket_ids],
+                'columns_sizes': [len(column) for column in columns]
+            })
+        for column in columns:
+            snapshot_file.write(column)
+        return len(file_name_column)
+
+    def __read_chunk(self, snapshot_file, block, swap_bytes):
+        bucket_column_size, file_names_size, *numeric_columns_sizes = block['columns_sizes']
+        bucket_column = self.__read_array(snapshot_file, 'I', bucket_column_size, swap_bytes)
+        file_names = snapshot_file.read(file_names_size).decode('utf-8')
+        size_column, time_created_column, time_updated_column = [
+            self.__read_array(snapshot_file, typecode, size, swap_bytes)
+            for typecode, size in zip(self.__COLUMNS_TYPECODES[1:], numeric_columns_sizes)
+        ]
+        return object_storage_records.ObjectStorageRecords.from_columns(
+            self.system, block['bucket_names'], bucket_column,
+            file_names.split(self.__FILE_NAMES_SEPARATOR) if block['records_count'] else [],
+            size_column, time_created_column, time_updated_column)
+
+    @classmethod
+    def __read_array(cls, snapshot_file, typecode, size, swap_bytes):
+        column = array.array(typecode)
+        column.frombytes(snapshot_file.read(size))
+        if swap_bytes:
+            column.byteswap()
+        return column
+
+    @classmethod
+    def __filter_records(cls, records, bucket_prefix, shard):
+        filtered_records = object_storage_records.ObjectStorageRecords(records.system)
+        for record in records:
+            if bucket_prefix and not record.bucket_name.startswith(bucket_prefix):
+                continue
+            if shard and not shard.owns_object(record.bucket_name, record.file_name):
+                continue
+            filtered_records.append(record.bucket_name, record.file_name, record.size,
+                                    record.time_created, record.time_updated)
+        return filtered_records
+
+    @classmethod
+    def __filter_to_dict(cls, object_filter):
+        return object_filter.to_dict() if object_filter else None
+
+    @classmethod
+    def __shard_to_dict(cls, shard):
+        if not shard:
+            return None
+        return {'index': shard.index, 'count': shard.count, 'by': shard.by}
+
+    @classmethod
+    def __write_block(cls, snapshot_file, block):
+        content = json.dumps(block).encode('utf-8')
+        snapshot_file.write(cls.__LENGTH.pack(len(content)))
+        snapshot_file.write(content)
+
+    @classmethod
+    def __read_block(cls, snapshot_file):
+        length = snapshot_file.read(cls.__LENGTH.size)
+        if len(length) < cls.__LENGTH.size:
+            return None
+        return json.loads(snapshot_file.read(cls.__LENGTH.unpack(length)[0]))
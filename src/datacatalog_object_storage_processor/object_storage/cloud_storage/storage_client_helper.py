@@ -1,20 +1,41 @@
+import collections
 import logging
-
+import time
+from concurrent import futures
 from functools import lru_cache
 
-from google.cloud import storage
+from google.api_core import datetime_helpers
 from google.api_core import exceptions
 
+from datacatalog_object_storage_processor import utils
+
+# Projection of a listed object, holding the attributes of storage.Blob
+# the sync relies on.
+ListedBlob = collections.namedtuple('ListedBlob', ['name', 'size', 'time_created', 'updated'])
+
 
 class StorageClientHelper:
 
-    def __init__(self, project_id):
-        self.__storage_cloud_client = storage.Client(project=project_id)
+    __DELIMITER = '/'
+    # Objects listings only ask for the fields the sync relies on, with the
+    # largest page size the JSON API allows.
+    __LISTED_FIELDS = 'items(name,size,timeCreated,updated),prefixes,nextPageToken'
+    __LISTING_PAGE_SIZE = 1000
+    __MAX_SPLIT_DEPTH = 3
+    # Characters flat buckets are split on, in lexicographic order.
+    __SPLIT_CHARACTERS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+    __METRICS_SERVICE = 'storage'
+
+    def __init__(self, project_id, rate_limiter=None, metrics=None, transport_options=None):
+        self.__storage_cloud_client = (transport_options
+                                       or utils.TransportOptions()).make_storage_client(project_id)
         self.__project_id = project_id
+        self.__rate_limiter = rate_limiter or utils.AdaptiveRateLimiter('cloud storage')
+        self.__metrics = metrics or utils.RpcMetrics()
 
     def get_bucket(self, name):
         try:
-            return self.__storage_cloud_client.get_bucket(name)
+            return self.__call('get_bucket', self.__storage_cloud_client.get_bucket, name)
         except (exceptions.Forbidden, exceptions.NotFound):
             logging.info(f'Bucket: {name} does not exist')
             return None
@@ -22,17 +43,210 @@ class StorageClientHelper:
     def list_buckets(self, prefix=None):
         return self.__list_buckets(self.__project_id, prefix)
 
-    def list_blobs(self, bucket, prefix=None):
-        results_iterator = self.__storage_cloud_client.list_blobs(bucket, prefix=prefix)
-
+    def list_blobs(self, bucket, prefix=None, timeout=None):
         results = []
-        for page in results_iterator.pages:
+        for page in self.list_blobs_pages(bucket, prefix, timeout):
             results.extend(page)
 
         return results
 
+    def list_blobs_pages(self, bucket, prefix=None, timeout=None):
+        """
+        Lazily yields the blobs of a bucket one page at a time, so callers
+        can process a page before the next one is requested.
+
+        When `timeout` is given, DeadlineExceeded is raised once the listing
+        has taken longer than `timeout` seconds, a page request included.
+        """
+        for blobs, _ in self.list_blobs_pages_from(bucket, prefix=prefix, timeout=timeout):
+            yield blobs
+
+    def list_blobs_pages_from(self, bucket, page_token=None, prefix=None, timeout=None):
+        """
+        Same as list_blobs_pages, starting at `page_token` and yielding each
+        page along with the token of the next one, None after the last page.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            blobs, _, page_token = self.__call('list_blobs',
+                                               self.__fetch_blobs_page,
+                                               bucket,
+                                               page_token,
+                                               deadline,
+                                               prefix=prefix)
+            yield blobs, page_token
+            if not page_token:
+                return
+            if deadline and time.monotonic() > deadline:
+                raise exceptions.DeadlineExceeded(
+                    f'listing bucket {self.__get_bucket_name(bucket)} took longer than'
+                    f' {timeout} seconds')
+
+    def list_blobs_split(self, bucket, workers, prefix=None, timeout=None):
+        """
+        Lists a bucket by splitting its key space into prefixes, discovered
+        with delimiter listings, and listing up to `workers` prefixes
+        concurrently. A flat bucket, without any prefix, is split into
+        ranges of object names instead. Results are de-duplicated by blob
+        name. `timeout` covers the discovery of the prefixes as well.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        blobs, prefixes, flat_listing_end = self.__discover_prefixes(bucket, prefix, workers,
+                                                                     deadline)
+
+        blobs_by_name = {blob.name: blob for blob in blobs}
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            if flat_listing_end is None:
+                logging.info(f'Listing {len(prefixes)} prefixes of bucket:'
+                             f' {self.__get_bucket_name(bucket)}')
+                pending = [
+                    executor.submit(self.list_blobs, bucket, sub_prefix,
+                                    self.__remaining_time(deadline)) for sub_prefix in prefixes
+                ]
+            else:
+                names_ranges = self.__split_names(prefix or '', flat_listing_end, workers)
+                logging.info(f'Listing {len(names_ranges)} name ranges of flat bucket:'
+                             f' {self.__get_bucket_name(bucket)}')
+                pending = [
+                    executor.submit(self.__list_names_range, bucket, prefix, start_offset,
+                                    end_offset, deadline)
+                    for start_offset, end_offset in names_ranges
+                ]
+            for future in futures.as_completed(pending):
+                for blob in future.result():
+                    blobs_by_name[blob.name] = blob
+
+        return list(blobs_by_name.values())
+
+    def __discover_prefixes(self, bucket, prefix, min_prefixes, deadline):
+        # Expands the prefixes level by level until there are enough of them
+        # to keep the workers busy, or the key space cannot be split further.
+        # Returns the blobs listed on the way, the prefixes, and the name the
+        # listing of a flat first level stopped at, if any, see __split_names.
+        blobs = []
+        prefixes = [prefix]
+        for depth in range(self.__MAX_SPLIT_DEPTH):
+            expanded_prefixes = []
+            for current_prefix in prefixes:
+                level_blobs, level_prefixes, flat = self.__list_level(
+                    bucket, current_prefix, deadline, depth == 0)
+                blobs.extend(level_blobs)
+                if flat:
+                    return blobs, [], level_blobs[-1].name
+                expanded_prefixes.extend(level_prefixes)
+
+            prefixes = expanded_prefixes
+            if not prefixes or len(prefixes) >= min_prefixes:
+                break
+
+        return blobs, prefixes, None
+
+    def __list_level(self, bucket, prefix, deadline, stop_if_flat=False):
+        # Returns the blobs and prefixes of the level, and whether its listing
+        # was stopped after a first page without any prefix.
+        blobs = []
+        prefixes = set()
+        page_token = None
+        while True:
+            page_blobs, page_prefixes, page_token = self.__call('list_blobs',
+                                                                self.__fetch_blobs_page,
+                                                                bucket,
+                                                                page_token,
+                                                                deadline,
+                                                                prefix=prefix,
+                                                                delimiter=self.__DELIMITER)
+            blobs.extend(page_blobs)
+            prefixes.update(page_prefixes)
+            if not page_token:
+                return blobs, sorted(prefixes), False
+            if stop_if_flat and not prefixes and blobs:
+                return blobs, [], True
+            self.__remaining_time(deadline)
+
+    def __list_names_range(self, bucket, prefix, start_offset, end_offset, deadline):
+        blobs = []
+        page_token = None
+        while True:
+            page_blobs, _, page_token = self.__call('list_blobs',
+                                                    self.__fetch_blobs_page,
+                                                    bucket,
+                                                    page_token,
+                                                    deadline,
+                                                    prefix=prefix,
+                                                    start_offset=start_offset,
+                                                    end_offset=end_offset)
+            blobs.extend(page_blobs)
+            if not page_token:
+                return blobs
+            self.__remaining_time(deadline)
+
+    @classmethod
+    def __split_names(cls, prefix, start_name, count):
+        # Splits the names from `start_name` on into up to `count` ranges of
+        # start and end offsets, on the character following the prefix, as
+        # names are usually made of those of __SPLIT_CHARACTERS.
+        position = len(prefix)
+        characters = [
+            character for character in cls.__SPLIT_CHARACTERS
+            if character > start_name[position:position + 1]
+        ]
+        boundaries = sorted({
+            prefix + characters[int(index * len(characters) / count)]
+            for index in range(1, count)
+        }) if characters else []
+        return list(zip([start_name] + boundaries, boundaries + [None]))
+
+    def __fetch_blobs_page(self, bucket, page_token, deadline, **kwargs):
+        # Each page is requested on a fresh iterator, starting at the token of
+        # the previous one, so a throttled page can be retried on its own.
+        if deadline:
+            # Otherwise a hung request would block its worker past the
+            # deadline, which is only checked between pages.
+            kwargs['timeout'] = self.__remaining_time(deadline)
+        results_iterator = self.__storage_cloud_client.list_blobs(
+            bucket,
+            page_token=page_token,
+            page_size=self.__LISTING_PAGE_SIZE,
+            fields=self.__LISTED_FIELDS,
+            **kwargs)
+        # Items are turned into ListedBlob tuples rather than storage.Blob
+        # objects, which are much more expensive to build.
+        results_iterator.item_to_value = lambda _, item: self.make_listed_blob(item)
+        page = next(results_iterator.pages, None)
+        blobs = list(page) if page is not None else []
+        return blobs, set(results_iterator.prefixes), results_iterator.next_page_token
+
+    @classmethod
+    def make_listed_blob(cls, resource):
+        """Build a ListedBlob from an object resource of the JSON API."""
+        time_created = resource.get('timeCreated')
+        updated = resource.get('updated')
+        return ListedBlob(resource['name'], int(resource.get('size', 0)),
+                          datetime_helpers.from_rfc3339(time_created) if time_created else None,
+                          datetime_helpers.from_rfc3339(updated) if updated else None)
+
+    @classmethod
+    def __remaining_time(cls, deadline):
+        if not deadline:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise exceptions.DeadlineExceeded('listing took longer than the allowed time')
+        return remaining
+
+    @classmethod
+    def __get_bucket_name(cls, bucket):
+        return bucket if isinstance(bucket, str) else bucket.name
+
     @lru_cache(maxsize=1024)
     def __list_buckets(self, project_id, prefix=None):
+        return self.__call('list_buckets', self.__fetch_buckets, project_id, prefix)
+
+    def __call(self, method, function, *args, **kwargs):
+        return self.__rate_limiter.call(
+            self.__metrics.timed(self.__METRICS_SERVICE, method, function), *args, **kwargs)
+
+    def __fetch_buckets(self, project_id, prefix):
         results_iterator = self.__storage_cloud_client.list_buckets(prefix=prefix,
                                                                     project=project_id)
         results = []
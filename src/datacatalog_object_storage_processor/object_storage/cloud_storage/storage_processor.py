@@ -1,7 +1,10 @@
 import logging
+import time
+from concurrent import futures
 
-import pandas as pd
+from google.api_core import exceptions
 
+from datacatalog_object_storage_processor.object_storage import object_storage_records
 from datacatalog_object_storage_processor.object_storage.cloud_storage.storage_client_helper \
     import StorageClientHelper
 
@@ -10,58 +13,220 @@ class StorageProcessor:
 
     __STORAGE_SYSTEM = 'cloud_storage'
 
-    def __init__(self, project_id):
-        self.__storage_helper = StorageClientHelper(project_id)
+    def __init__(self, project_id, rate_limiter=None, metrics=None, transport_options=None):
+        self.__storage_helper = StorageClientHelper(project_id, rate_limiter, metrics,
+                                                    transport_options)
         self.__project_id = project_id
 
-    def create_object_storage_data(self, bucket_prefix=None):
+    def create_object_storage_data(self,
+                                   bucket_prefix=None,
+                                   workers=1,
+                                   bucket_timeout=None,
+                                   prefix_workers=1,
+                                   shard=None,
+                                   object_filter=None,
+                                   bucket_prefixes=None):
+        """
+        List the files of every bucket into ObjectStorageRecords, scanning up
+        to `workers` buckets concurrently. A bucket whose listing takes longer than
+        `bucket_timeout` seconds is skipped and flagged as `timed_out` in the
+        returned bucket stats. When `prefix_workers` is greater than 1, each
+        bucket is split by prefixes which are listed concurrently.
+
+        When an ObjectStorageShard is given, only the files it owns are
+        returned. When an ObjectStorageFilter is given, only the files it
+        keeps are, and only its listing prefixes are listed. With
+        `bucket_prefixes`, only the buckets starting with one of them are
+        listed.
+        """
+        buckets = self.__list_buckets(bucket_prefix, shard, bucket_prefixes)
+
+        records = object_storage_records.ObjectStorageRecords(self.__STORAGE_SYSTEM)
+        bucket_stats = []
+        with futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            buckets_by_future = {}
+            for bucket in buckets:
+                buckets_by_future[executor.submit(self.__list_bucket_blobs, bucket, bucket_timeout,
+                                                  prefix_workers, shard, object_filter)] = bucket
+            for future in futures.as_completed(buckets_by_future):
+                bucket_name = buckets_by_future[future].name
+                try:
+                    bucket_records = future.result()
+                except exceptions.DeadlineExceeded as e:
+                    logging.warning(f'Skipping bucket: {bucket_name}, {e}')
+                    bucket_stats.append({
+                        'bucket_name': bucket_name,
+                        'files': 0,
+                        'timed_out': True
+                    })
+                    continue
+
+                bucket_stats.append({'bucket_name': bucket_name, 'files': len(bucket_records)})
+                if len(bucket_records) > 0:
+                    records.extend(bucket_records)
+                else:
+                    logging.info(f'No files found on bucket: {bucket_name}')
+
+        return records, bucket_stats
+
+    def iterate_object_storage_data(self,
+                                    bucket_prefix=None,
+                                    listing_cursors=None,
+                                    shard=None,
+                                    object_filter=None):
+        """
+        Streaming counterpart of create_object_storage_data: yields one small
+        ObjectStorageRecords per listed page of blobs instead of materializing
+        every bucket in memory.
+
+        When `listing_cursors`, a dict of page tokens by bucket name, is
+        given, each page is followed by the ListingCursor to resume after it,
+        and the listing starts from those cursors. When an
+        ObjectStorageShard is given, only the files it owns are yielded, and
+        when an ObjectStorageFilter is given, only the files it keeps.
+        """
+        buckets = self.__list_buckets(bucket_prefix, shard)
+        listing_prefixes = object_filter.get_listing_prefixes() if object_filter else [None]
+        if len(listing_prefixes) > 1:
+            yield from self.__iterate_prefixes_data(buckets, listing_prefixes, listing_cursors,
+                                                    shard, object_filter)
+            return
+
+        for bucket in buckets:
+            bucket_name = bucket.name
+            page_token = None
+            if listing_cursors is not None and bucket_name in listing_cursors:
+                page_token = listing_cursors[bucket_name]
+                if not page_token:
+                    logging.info(f'Bucket: {bucket_name} was already listed, skipping it')
+                    continue
+
+            logging.info(f'[BUCKET: {bucket_name}')
+            logging.info('Stream Files information from Cloud Storage...')
+            files = 0
+            for blobs, next_page_token in self.__storage_helper.list_blobs_pages_from(
+                    bucket, page_token, prefix=listing_prefixes[0]):
+                blobs = self.__filter_blobs(bucket_name, blobs, shard, object_filter)
+                if len(blobs) > 0:
+                    files += len(blobs)
+                    yield self.create_records_from_blobs(bucket_name, blobs)
+                if listing_cursors is not None:
+                    yield object_storage_records.ListingCursor(bucket_name, next_page_token)
+
+            if files == 0:
+                logging.info(f'No files found on bucket: {bucket_name}')
+
+    def __list_buckets(self, bucket_prefix, shard, bucket_prefixes=None):
         logging.info('===> Get all Buckets from Cloud Storage...')
         buckets = self.__storage_helper.list_buckets(bucket_prefix)
+        if bucket_prefixes:
+            bucket_prefixes = tuple(bucket_prefixes)
+            buckets = [bucket for bucket in buckets if bucket.name.startswith(bucket_prefixes)]
+        if shard:
+            buckets = [bucket for bucket in buckets if shard.owns_bucket(bucket.name)]
+            logging.info(f'{len(buckets)} Buckets to list for shard {shard}')
         logging.info('==== DONE ==================================================')
         logging.info('')
+        return buckets
 
-        dataframe = None
-        bucket_stats = []
+    def __iterate_prefixes_data(self, buckets, listing_prefixes, listing_cursors, shard,
+                                object_filter):
+        # A page token only resumes the listing of its prefix, so buckets
+        # listed by several prefixes are only checkpointed once fully listed.
         for bucket in buckets:
             bucket_name = bucket.name
+            if listing_cursors is not None and bucket_name in listing_cursors \
+                    and not listing_cursors[bucket_name]:
+                logging.info(f'Bucket: {bucket_name} was already listed, skipping it')
+                continue
+
             logging.info(f'[BUCKET: {bucket_name}')
-            logging.info('Get Files information from Cloud Storage...')
-            blobs = self.__storage_helper.list_blobs(bucket)
-            bucket_stats.append({'bucket_name': bucket_name, 'files': len(blobs)})
-            if len(blobs) > 0:
-                aux_dataframe = self.create_dataframe_from_blobs(bucket_name, blobs)
-                if dataframe is not None:
-                    dataframe = dataframe.append(aux_dataframe)
-                else:
-                    dataframe = aux_dataframe
-            else:
+            logging.info(f'Stream Files information from Cloud Storage, {len(listing_prefixes)}'
+                         f' prefixes...')
+            files = 0
+            for prefix in listing_prefixes:
+                for blobs in self.__storage_helper.list_blobs_pages(bucket, prefix):
+                    blobs = self.__filter_blobs(bucket_name, blobs, shard, object_filter)
+                    if len(blobs) > 0:
+                        files += len(blobs)
+                        yield self.create_records_from_blobs(bucket_name, blobs)
+            if listing_cursors is not None:
+                yield object_storage_records.ListingCursor(bucket_name, None)
+
+            if files == 0:
                 logging.info(f'No files found on bucket: {bucket_name}')
 
-        return dataframe, bucket_stats
+    def __list_bucket_blobs(self, bucket, timeout, prefix_workers, shard, object_filter):
+        logging.info(f'[BUCKET: {bucket.name}')
+        logging.info('Get Files information from Cloud Storage...')
+        # The timeout applies to the whole bucket, whatever its prefixes.
+        deadline = time.monotonic() + timeout if timeout else None
+        listing_prefixes = object_filter.get_listing_prefixes() if object_filter else [None]
+        if prefix_workers > 1:
+            blobs = []
+            for prefix in listing_prefixes:
+                blobs.extend(
+                    self.__storage_helper.list_blobs_split(bucket, prefix_workers, prefix,
+                                                           self.__get_remaining_time(deadline)))
+            return self.create_records_from_blobs(
+                bucket.name, self.__filter_blobs(bucket.name, blobs, shard, object_filter))
+
+        # Pages are converted as they arrive, so Blob objects never outlive
+        # their page.
+        records = object_storage_records.ObjectStorageRecords(self.__STORAGE_SYSTEM)
+        for prefix in listing_prefixes:
+            for blobs in self.__storage_helper.list_blobs_pages(
+                    bucket, prefix, self.__get_remaining_time(deadline)):
+                records.append_blobs(bucket.name,
+                                     self.__filter_blobs(bucket.name, blobs, shard, object_filter))
+        return records
+
+    @classmethod
+    def __filter_blobs(cls, bucket_name, blobs, shard, object_filter=None):
+        if object_filter:
+            blobs = object_filter.filter_blobs(blobs)
+        if not shard or shard.by == shard.BY_BUCKET:
+            return blobs
+        return [blob for blob in blobs if shard.owns_object(bucket_name, blob.name)]
+
+    @classmethod
+    def __get_remaining_time(cls, deadline):
+        if not deadline:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise exceptions.DeadlineExceeded('listing took longer than the allowed time')
+        return remaining
+
+    @classmethod
+    def create_records_from_blobs(cls, bucket_name, blobs):
+        records = object_storage_records.ObjectStorageRecords(cls.__STORAGE_SYSTEM)
+        records.append_blobs(bucket_name, blobs)
+        return records
+
+    @classmethod
+    def create_records_from_resources(cls, bucket_name, resources):
+        """
+        Same as create_records_from_blobs, from object resources of the JSON
+        API, e.g. the payload of object change notifications.
+        """
+        blobs = [StorageClientHelper.make_listed_blob(resource) for resource in resources]
+        return cls.create_records_from_blobs(bucket_name, blobs)
 
     @classmethod
     def create_dataframe_from_blobs(cls, bucket_name, blobs):
+        # pandas is slow to import and not needed by syncs, which use records.
+        import pandas as pd
+
+        # Listed blobs have no public_url, the one of the records is used.
         dataframe = pd.DataFrame([[
-            cls.__build_linked_resource(bucket_name,
-                                        blob.name), bucket_name, cls.__STORAGE_SYSTEM, blob.name,
-            cls.__extract_file_type(blob.name), blob.public_url, blob.size, blob.time_created,
-            blob.updated
-        ] for blob in blobs],
+            record.linked_resource, bucket_name, cls.__STORAGE_SYSTEM, record.file_name,
+            record.file_type, record.public_url, record.size, record.time_created,
+            record.time_updated
+        ] for record in cls.create_records_from_blobs(bucket_name, blobs)],
                                  columns=[
                                      'linked_resource', 'bucket_name', 'system', 'file_name',
                                      'file_type', 'public_url', 'size', 'time_created',
                                      'time_updated'
                                  ])
         return dataframe
-
-    @classmethod
-    def __build_linked_resource(cls, bucket_name, blob_name):
-        return f'gs://{bucket_name}/{blob_name}'
-
-    @classmethod
-    def __extract_file_type(cls, file_name):
-        file_type_at = file_name.rfind('.')
-        if file_type_at != -1:
-            return file_name[file_type_at + 1:]
-        else:
-            return 'unknown_file_type'
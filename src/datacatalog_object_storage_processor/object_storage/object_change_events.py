@@ -0,0 +1,200 @@
+import json
+import logging
+import time
+
+from google.api_core import exceptions
+
+
+class ObjectChangeEvent:
+    """
+    One Cloud Storage object change notification, see
+    https://cloud.google.com/storage/docs/pubsub-notifications. `resource`
+    is the object resource carried by JSON_API_V1 notifications.
+    """
+
+    OBJECT_FINALIZE = 'OBJECT_FINALIZE'
+    OBJECT_METADATA_UPDATE = 'OBJECT_METADATA_UPDATE'
+    OBJECT_DELETE = 'OBJECT_DELETE'
+    OBJECT_ARCHIVE = 'OBJECT_ARCHIVE'
+
+    __slots__ = ('event_type', 'bucket_name', 'object_name', 'resource', 'overwritten', 'ack_id')
+
+    def __init__(self,
+                 event_type,
+                 bucket_name,
+                 object_name,
+                 resource,
+                 overwritten=False,
+                 ack_id=None):
+        self.event_type = event_type
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.resource = resource
+        self.overwritten = overwritten
+        self.ack_id = ack_id
+
+    @classmethod
+    def from_message(cls, attributes, data, ack_id=None):
+        """
+        Build an event from the attributes and the data, as bytes, str or an
+        already decoded dict, of a notification message.
+        """
+        if isinstance(data, (bytes, str)):
+            data = json.loads(data) if data else {}
+        return cls(attributes['eventType'],
+                   attributes.get('bucketId') or data.get('bucket'),
+                   attributes.get('objectId') or data.get('name'), data, 'overwrittenByGeneration'
+                   in attributes, ack_id)
+
+    @property
+    def key(self):
+        return self.bucket_name, self.object_name
+
+    @property
+    def is_deletion(self):
+        # Deleting or archiving the live version on overwrite is followed by
+        # the OBJECT_FINALIZE of the new version.
+        return self.event_type in (self.OBJECT_DELETE, self.OBJECT_ARCHIVE) \
+            and not self.overwritten
+
+    @property
+    def is_upsert(self):
+        return self.event_type in (self.OBJECT_FINALIZE, self.OBJECT_METADATA_UPDATE)
+
+    @classmethod
+    def coalesce(cls, events):
+        """
+        Keep the latest event of every object, in the order their objects
+        first appear. Notifications may be delivered out of order, so events
+        are ordered by object generation, then deletions after the other
+        events of the same generation, then by metageneration, then by
+        arrival. Events that neither upsert nor delete an object are dropped.
+        """
+        latest_events = {}
+        for arrival, event in enumerate(events):
+            if not event.is_upsert and not event.is_deletion:
+                continue
+
+            version = cls.__get_version(event, arrival)
+            latest = latest_events.get(event.key)
+            if not latest or version >= latest[0]:
+                latest_events[event.key] = (version, event)
+
+        return [event for _, event in latest_events.values()]
+
+    @classmethod
+    def __get_version(cls, event, arrival):
+        return (int(event.resource.get('generation')
+                    or 0), event.is_deletion, int(event.resource.get('metageneration')
+                                                  or 0), arrival)
+
+
+class JsonLinesEventSource:
+    """
+    Reads notifications from a JSON lines file, one message per line with
+    its `attributes` and its `data`, e.g. for local testing.
+    """
+
+    def __init__(self, path, max_events=1000):
+        self.__path = path
+        self.__max_events = max_events
+        self.__file = None
+        self.__line_number = 0
+
+    def pull(self, window):
+        """
+        Return the next `max_events` events of the file, or None once it is
+        fully read. `window` is only meaningful for live sources.
+        """
+        if self.__file is None:
+            self.__file = open(self.__path)
+        elif self.__file.closed:
+            return None
+
+        events = []
+        for line in self.__file:
+            self.__line_number += 1
+            if line.strip():
+                try:
+                    message = json.loads(line)
+                    events.append(
+                        ObjectChangeEvent.from_message(message['attributes'], message.get('data')))
+                except (KeyError, TypeError, ValueError) as e:
+                    logging.warning('Skipping invalid notification at line %s: %s',
+                                    self.__line_number, str(e))
+            if len(events) >= self.__max_events:
+                return events
+
+        self.close()
+        return events or None
+
+    def ack(self, events):
+        pass
+
+    def close(self):
+        if self.__file is not None and not self.__file.closed:
+            self.__file.close()
+
+
+class PubSubEventSource:
+    """
+    Pulls notifications from a Pub/Sub subscription. Messages are only
+    acknowledged once applied, the others are delivered again after their
+    acknowledgement deadline.
+    """
+
+    __MAX_MESSAGES_PER_PULL = 1000
+
+    def __init__(self, subscription_path):
+        # Only imported when needed, as it is optional and slow to import.
+        try:
+            from google.cloud import pubsub_v1
+        except ImportError:
+            raise ImportError('google-cloud-pubsub is required to read notifications from'
+                              ' Pub/Sub, install it with the pubsub extra')
+
+        self.__subscription_path = subscription_path
+        self.__subscriber = pubsub_v1.SubscriberClient()
+
+    def pull(self, window):
+        """Return the events received over `window` seconds, never None."""
+        deadline = time.monotonic() + window
+        request = {
+            'subscription': self.__subscription_path,
+            'max_messages': self.__MAX_MESSAGES_PER_PULL
+        }
+        events = []
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.__subscriber.pull(request=request, timeout=max(1.0, remaining))
+            except exceptions.DeadlineExceeded:
+                response = None
+
+            for received_message in response.received_messages if response else []:
+                message = received_message.message
+                try:
+                    events.append(
+                        ObjectChangeEvent.from_message(dict(message.attributes), message.data,
+                                                       received_message.ack_id))
+                except (KeyError, ValueError) as e:
+                    logging.warning('Skipping invalid notification %s: %s', message.message_id,
+                                    str(e))
+                    self.__acknowledge([received_message.ack_id])
+
+            if time.monotonic() >= deadline:
+                return events
+
+    def ack(self, events):
+        self.__acknowledge([event.ack_id for event in events if event.ack_id])
+
+    def close(self):
+        self.__subscriber.close()
+
+    def __acknowledge(self, ack_ids):
+        for start in range(0, len(ack_ids), self.__MAX_MESSAGES_PER_PULL):
+            self.__subscriber.acknowledge(
+                request={
+                    'subscription': self.__subscription_path,
+                    'ack_ids': ack_ids[start:start + self.__MAX_MESSAGES_PER_PULL]
+                })
@@ -0,0 +1,181 @@
+import datetime
+import fnmatch
+import re
+
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ObjectStorageFilter:
+    """
+    Scope of the objects synchronized from each bucket: an object is kept
+    when its name starts with one of `object_prefixes`, ends with one of
+    `extensions`, matches one of the `include` globs or `include_regex`
+    regular expressions and none of the `exclude` ones, when its size in
+    bytes is within `min_size` and `max_size`, and when the time since its
+    last update, in seconds, is within `min_age` and `max_age`. Criteria
+    left to None keep every object.
+
+    Globs match the whole object name, their `*` matching `/` too, while
+    regular expressions match anywhere in it. Patterns are compiled once,
+    and the prefixes are pushed down into the listing, see
+    get_listing_prefixes. Entries of objects out of the scope are obsolete.
+    """
+
+    __DURATION_REGEX = re.compile(r'^(\d+(?:\.\d*)?)([smhd]?)$')
+    __DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    __GLOB_WILDCARDS_REGEX = re.compile(r'[*?\[]')
+
+    def __init__(self,
+                 include=None,
+                 exclude=None,
+                 include_regex=None,
+                 exclude_regex=None,
+                 object_prefixes=None,
+                 extensions=None,
+                 min_size=None,
+                 max_size=None,
+                 min_age=None,
+                 max_age=None):
+        if min_size is not None and max_size is not None and min_size > max_size:
+            raise ValueError(f'Invalid size bounds: {min_size} to {max_size}')
+        if min_age is not None and max_age is not None and min_age > max_age:
+            raise ValueError(f'Invalid age bounds: {min_age} to {max_age}')
+
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.include_regex = list(include_regex or [])
+        self.exclude_regex = list(exclude_regex or [])
+        self.object_prefixes = sorted(set(object_prefixes or []))
+        self.extensions = sorted(
+            {extension.strip().lower().lstrip('.')
+             for extension in extensions or []})
+        self.min_size = min_size
+        self.max_size = max_size
+        self.min_age = min_age
+        self.max_age = max_age
+
+        try:
+            self.__include_pattern = self.__compile_patterns(self.include, self.include_regex)
+            self.__exclude_pattern = self.__compile_patterns(self.exclude, self.exclude_regex)
+        except re.error as e:
+            raise ValueError(f'Invalid pattern: {e}')
+        self.__object_prefixes = tuple(self.object_prefixes)
+        self.__extensions_suffixes = tuple(f'.{extension}' for extension in self.extensions)
+
+    def __str__(self):
+        return ', '.join(f'{name} {value}' for name, value in self.to_dict().items() if value)
+
+    def to_dict(self):
+        return {
+            'include': self.include,
+            'exclude': self.exclude,
+            'include_regex': self.include_regex,
+            'exclude_regex': self.exclude_regex,
+            'object_prefixes': self.object_prefixes,
+            'extensions': self.extensions,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'min_age': self.min_age,
+            'max_age': self.max_age
+        }
+
+    @classmethod
+    def parse_duration(cls, value):
+        """Parse seconds, or a duration such as 90s, 15m, 12h or 30d."""
+        re_match = cls.__DURATION_REGEX.match(str(value).strip().lower())
+        if not re_match:
+            raise ValueError(f'Invalid duration: {value}')
+        return float(re_match.group(1)) * cls.__DURATION_UNITS[re_match.group(2)]
+
+    def get_listing_prefixes(self):
+        """
+        Returns the object prefixes each bucket can be listed with instead
+        of being listed whole, [None] when it must be. Without explicit
+        object prefixes, the literal heads of the include globs are used.
+        Prefixes covered by a shorter one are dropped, so no object is
+        listed twice.
+        """
+        prefixes = self.object_prefixes
+        if not prefixes and self.include and not self.include_regex:
+            prefixes = [self.__GLOB_WILDCARDS_REGEX.split(glob, 1)[0] for glob in self.include]
+        if not prefixes or '' in prefixes:
+            return [None]
+
+        listing_prefixes = []
+        for prefix in sorted(set(prefixes)):
+            if not listing_prefixes or not prefix.startswith(listing_prefixes[-1]):
+                listing_prefixes.append(prefix)
+        return listing_prefixes
+
+    def matches_name(self, file_name):
+        """Whether an object may be kept, judging by its name only."""
+        if self.__object_prefixes and not file_name.startswith(self.__object_prefixes):
+            return False
+        if self.__extensions_suffixes \
+                and not file_name.lower().endswith(self.__extensions_suffixes):
+            return False
+        if self.__exclude_pattern and self.__exclude_pattern.search(file_name):
+            return False
+        if self.__include_pattern and not self.__include_pattern.search(file_name):
+            return False
+        return True
+
+    def matches(self, file_name, size, time_updated, now=None):
+        """
+        Whether an object is kept. `time_updated` is a timezone aware
+        datetime, and ages are computed at `now`, the current time by
+        default.
+        """
+        min_time_updated, max_time_updated = self.__get_time_updated_bounds(now)
+        return self.__matches(file_name, size, time_updated, min_time_updated, max_time_updated)
+
+    def filter_blobs(self, blobs):
+        """Returns the blobs, such as ListedBlob tuples, which are kept."""
+        min_time_updated, max_time_updated = self.__get_time_updated_bounds()
+        return [
+            blob for blob in blobs if self.__matches(blob.name, blob.size, blob.updated,
+                                                     min_time_updated, max_time_updated)
+        ]
+
+    def filter_records(self, records):
+        """Returns new ObjectStorageRecords holding the kept records."""
+        min_time_updated, max_time_updated = self.__get_time_updated_bounds()
+        filtered_records = object_storage_records.ObjectStorageRecords(records.system)
+        for record in records:
+            if self.__matches(record.file_name, record.size, record.time_updated, min_time_updated,
+                              max_time_updated):
+                filtered_records.append(record.bucket_name, record.file_name, record.size,
+                                        record.time_created, record.time_updated)
+        return filtered_records
+
+    def __matches(self, file_name, size, time_updated, min_time_updated, max_time_updated):
+        if self.min_size is not None and (size or 0) < self.min_size:
+            return False
+        if self.max_size is not None and (size or 0) > self.max_size:
+            return False
+        if time_updated is not None:
+            if min_time_updated and time_updated < min_time_updated:
+                return False
+            if max_time_updated and time_updated > max_time_updated:
+                return False
+        return self.matches_name(file_name)
+
+    def __get_time_updated_bounds(self, now=None):
+        # Ages are turned into update times once per batch of objects.
+        if self.min_age is None and self.max_age is None:
+            return None, None
+
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        min_time_updated = now - datetime.timedelta(
+            seconds=self.max_age) if self.max_age is not None else None
+        max_time_updated = now - datetime.timedelta(
+            seconds=self.min_age) if self.min_age is not None else None
+        return min_time_updated, max_time_updated
+
+    @classmethod
+    def __compile_patterns(cls, globs, regexes):
+        # All the patterns of a kind are matched at once by a single regular
+        # expression.
+        patterns = [r'\A' + fnmatch.translate(glob) for glob in globs]
+        patterns.extend(f'(?:{regex})' for regex in regexes)
+        return re.compile('|'.join(patterns)) if patterns else None
@@ -0,0 +1,83 @@
+import collections
+import re
+
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ObjectStorageGrouping:
+    """
+    Collapses the objects of a bucket sharing a prefix into a single
+    ObjectStorageGroupRecord, e.g. the files of a Hive style partition. The
+    prefix is made of the first `depth` path segments of the object name,
+    or is the leading match of `pattern`. Objects without such a prefix are
+    kept as they are.
+    """
+
+    __DELIMITER = '/'
+
+    def __init__(self, depth=None, pattern=None):
+        if (depth is None) == (pattern is None):
+            raise ValueError('Either a grouping depth or a grouping pattern is required')
+        if depth is not None and depth < 1:
+            raise ValueError(f'Invalid grouping depth: {depth}')
+
+        self.depth = depth
+        self.pattern = re.compile(pattern) if pattern is not None else None
+
+    def __str__(self):
+        if self.depth is not None:
+            return f'depth {self.depth}'
+        return f'pattern {self.pattern.pattern}'
+
+    def get_prefix(self, file_name):
+        """Returns the group prefix of an object name, or None."""
+        if self.depth is not None:
+            segments = file_name.split(self.__DELIMITER)
+            if len(segments) <= self.depth:
+                return None
+            return self.__DELIMITER.join(segments[:self.depth]) + self.__DELIMITER
+
+        re_match = self.pattern.match(file_name)
+        return re_match.group(0) if re_match and re_match.group(0) else None
+
+    def group(self, records):
+        """
+        Lazily aggregate `records` into groups. The records of a bucket are
+        expected to be consecutive: the groups of a bucket are yielded once
+        the next bucket starts, so memory is bounded by the groups of one
+        bucket.
+
+        ListingCursor items are only passed through once their bucket is
+        fully listed, as resuming halfway through would yield partial groups.
+        """
+        groups = collections.OrderedDict()
+        bucket_name = None
+        for record in records:
+            if isinstance(record, object_storage_records.ListingCursor):
+                if not record.page_token:
+                    yield from self.__flush(groups)
+                    yield record
+                continue
+
+            if record.bucket_name != bucket_name:
+                yield from self.__flush(groups)
+                bucket_name = record.bucket_name
+
+            prefix = self.get_prefix(record.file_name)
+            if prefix is None:
+                yield record
+                continue
+
+            group = groups.get(prefix)
+            if not group:
+                group = groups[prefix] = object_storage_records.ObjectStorageGroupRecord(
+                    record.bucket_name, record.system, prefix)
+            group.add(record)
+
+        yield from self.__flush(groups)
+
+    @classmethod
+    def __flush(cls, groups):
+        while groups:
+            _, group = groups.popitem(last=False)
+            yield group
@@ -0,0 +1,259 @@
+import array
+import collections
+import datetime
+import math
+import sys
+from urllib import parse
+
+# Where the listing of a bucket resumes; a None page token means the bucket
+# was fully listed.
+ListingCursor = collections.namedtuple('ListingCursor', ['bucket_name', 'page_token'])
+
+
+class ObjectStorageRecord:
+    """
+    Lightweight view of one listed object. Only the listed attributes are
+    stored, everything else is derived from them on access.
+    """
+
+    __slots__ = ('bucket_name', 'system', 'file_name', 'size', '__time_created', '__time_updated')
+
+    __PUBLIC_URL_BASE = 'https://storage.googleapis.com'
+
+    def __init__(self, bucket_name, system, file_name, size, time_created, time_updated):
+        self.bucket_name = bucket_name
+        self.system = system
+        self.file_name = file_name
+        self.size = size
+        self.__time_created = time_created
+        self.__time_updated = time_updated
+
+    @property
+    def linked_resource(self):
+        return f'gs://{self.bucket_name}/{self.file_name}'
+
+    @property
+    def public_url(self):
+        quoted_name = parse.quote(self.file_name.encode('utf-8'), safe=b'/~')
+        return f'{self.__PUBLIC_URL_BASE}/{self.bucket_name}/{quoted_name}'
+
+    @property
+    def file_type(self):
+        file_type_at = self.file_name.rfind('.')
+        if file_type_at != -1:
+            return self.file_name[file_type_at + 1:]
+        else:
+            return 'unknown_file_type'
+
+    @property
+    def time_created(self):
+        return self.__to_datetime(self.__time_created)
+
+    @property
+    def time_updated(self):
+        return self.__to_datetime(self.__time_updated)
+
+    def to_dict(self):
+        """JSON serializable form of the record, see from_dict."""
+        return {
+            'bucket_name': self.bucket_name,
+            'file_name': self.file_name,
+            'size': self.size,
+            'time_created': None if math.isnan(self.__time_created) else self.__time_created,
+            'time_updated': None if math.isnan(self.__time_updated) else self.__time_updated
+        }
+
+    @classmethod
+    def from_dict(cls, system, record_dict):
+        return cls(record_dict['bucket_name'], system, record_dict['file_name'],
+                   record_dict['size'], cls.__to_timestamp(record_dict['time_created']),
+                   cls.__to_timestamp(record_dict['time_updated']))
+
+    @classmethod
+    def __to_timestamp(cls, value):
+        return math.nan if value is None else value
+
+    @classmethod
+    def __to_datetime(cls, timestamp):
+        if math.isnan(timestamp):
+            return None
+        return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+class ObjectStorageGroupRecord:
+    """
+    Aggregate of the objects of a bucket sharing a prefix, synchronized as
+    a single Entry: number of files, total size, bounds of their creation
+    and update times, and their file types.
+    """
+
+    __slots__ = ('bucket_name', 'system', 'prefix', 'files_count', 'size', 'file_types',
+                 'time_created', 'min_time_updated', 'time_updated')
+
+    __PUBLIC_URL_BASE = 'https://console.cloud.google.com/storage/browser'
+
+    def __init__(self,
+                 bucket_name,
+                 system,
+                 prefix,
+                 files_count=0,
+                 size=0,
+                 file_types=None,
+                 time_created=None,
+                 min_time_updated=None,
+                 time_updated=None):
+        self.bucket_name = bucket_name
+        self.system = system
+        self.prefix = prefix
+        self.files_count = files_count
+        self.size = size
+        self.file_types = set(file_types or [])
+        self.time_created = time_created
+        self.min_time_updated = min_time_updated
+        self.time_updated = time_updated
+
+    @property
+    def linked_resource(self):
+        return f'gs://{self.bucket_name}/{self.prefix}'
+
+    @property
+    def public_url(self):
+        quoted_prefix = parse.quote(self.prefix.encode('utf-8'), safe=b'/~')
+        return f'{self.__PUBLIC_URL_BASE}/{self.bucket_name}/{quoted_prefix}'
+
+    def add(self, record):
+        self.files_count += 1
+        self.size += record.size or 0
+        self.file_types.add(record.file_type)
+        self.time_created = self.__min(self.time_created, record.time_created)
+        self.min_time_updated = self.__min(self.min_time_updated, record.time_updated)
+        self.time_updated = self.__max(self.time_updated, record.time_updated)
+
+    def to_dict(self):
+        """JSON serializable form of the group, see from_dict."""
+        return {
+            'bucket_name': self.bucket_name,
+            'prefix': self.prefix,
+            'files_count': self.files_count,
+            'size': self.size,
+            'file_types': sorted(self.file_types),
+            'time_created': self.__to_timestamp(self.time_created),
+            'min_time_updated': self.__to_timestamp(self.min_time_updated),
+            'time_updated': self.__to_timestamp(self.time_updated)
+        }
+
+    @classmethod
+    def from_dict(cls, system, group_dict):
+        return cls(group_dict['bucket_name'], system, group_dict['prefix'],
+                   group_dict['files_count'], group_dict['size'], group_dict['file_types'],
+                   cls.__to_datetime(group_dict['time_created']),
+                   cls.__to_datetime(group_dict['min_time_updated']),
+                   cls.__to_datetime(group_dict['time_updated']))
+
+    @classmethod
+    def __min(cls, value_1, value_2):
+        return min(value_1, value_2) if value_1 and value_2 else value_1 or value_2
+
+    @classmethod
+    def __max(cls, value_1, value_2):
+        return max(value_1, value_2) if value_1 and value_2 else value_1 or value_2
+
+    @classmethod
+    def __to_timestamp(cls, value):
+        return value.timestamp() if value else None
+
+    @classmethod
+    def __to_datetime(cls, timestamp):
+        if timestamp is None:
+            return None
+        return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+class ObjectStorageRecords:
+    """
+    Column-backed store of listed objects. Bucket names and systems are
+    interned and kept once, sizes and timestamps live in typed arrays, so
+    memory per object is roughly the size of its name. Extending a store
+    with another one is linear in the size of the other store.
+    """
+
+    def __init__(self, system):
+        self.__system = sys.intern(system)
+        self.__bucket_names = []
+        self.__bucket_ids = {}
+        self.__bucket_column = array.array('I')
+        self.__file_name_column = []
+        self.__size_column = array.array('q')
+        self.__time_created_column = array.array('d')
+        self.__time_updated_column = array.array('d')
+
+    def __len__(self):
+        return len(self.__file_name_column)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        return ObjectStorageRecord(self.__bucket_names[self.__bucket_column[index]], self.__system,
+                                   self.__file_name_column[index], self.__size_column[index],
+                                   self.__time_created_column[index],
+                                   self.__time_updated_column[index])
+
+    @property
+    def system(self):
+        return self.__system
+
+    def append(self, bucket_name, file_name, size, time_created, time_updated):
+        self.__bucket_column.append(self.__get_bucket_id(bucket_name))
+        self.__file_name_column.append(file_name)
+        self.__size_column.append(size or 0)
+        self.__time_created_column.append(self.__to_timestamp(time_created))
+        self.__time_updated_column.append(self.__to_timestamp(time_updated))
+
+    def append_blobs(self, bucket_name, blobs):
+        for blob in blobs:
+            self.append(bucket_name, blob.name, blob.size, blob.time_created, blob.updated)
+
+    def extend(self, other):
+        bucket_ids = [self.__get_bucket_id(bucket_name) for bucket_name in other.__bucket_names]
+        self.__bucket_column.extend(bucket_ids[bucket_id] for bucket_id in other.__bucket_column)
+        self.__file_name_column.extend(other.__file_name_column)
+        self.__size_column.extend(other.__size_column)
+        self.__time_created_column.extend(other.__time_created_column)
+        self.__time_updated_column.extend(other.__time_updated_column)
+
+    def to_columns(self, start=0, stop=None):
+        """
+        Return the columns of the records from `start` to `stop`: the bucket
+        names, then arrays of bucket ids, into the bucket names, file names,
+        sizes, and creation and update timestamps, NaN when unknown.
+        """
+        return (list(self.__bucket_names), self.__bucket_column[start:stop],
+                self.__file_name_column[start:stop], self.__size_column[start:stop],
+                self.__time_created_column[start:stop], self.__time_updated_column[start:stop])
+
+    @classmethod
+    def from_columns(cls, system, bucket_names, bucket_column, file_name_column, size_column,
+                     time_created_column, time_updated_column):
+        """Build records from columns as returned by to_columns."""
+        records = cls(system)
+        bucket_ids = [records.__get_bucket_id(bucket_name) for bucket_name in bucket_names]
+        records.__bucket_column.extend(bucket_ids[bucket_id] for bucket_id in bucket_column)
+        records.__file_name_column.extend(file_name_column)
+        records.__size_column.extend(size_column)
+        records.__time_created_column.extend(time_created_column)
+        records.__time_updated_column.extend(time_updated_column)
+        return records
+
+    def __get_bucket_id(self, bucket_name):
+        bucket_id = self.__bucket_ids.get(bucket_name)
+        if bucket_id is None:
+            bucket_id = len(self.__bucket_names)
+            self.__bucket_names.append(sys.intern(bucket_name))
+            self.__bucket_ids[bucket_name] = bucket_id
+        return bucket_id
+
+    @classmethod
+    def __to_timestamp(cls, value):
+        return value.timestamp() if value else math.nan
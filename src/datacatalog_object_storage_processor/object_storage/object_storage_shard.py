@@ -0,0 +1,46 @@
+import re
+import zlib
+
+
+class ObjectStorageShard:
+    """
+    Deterministic slice of the objects of a project, so several processes
+    can each synchronize a part of the same Entry Group. Buckets, or objects
+    when `by` is 'object', are assigned by a stable hash of their name.
+    """
+
+    BY_BUCKET = 'bucket'
+    BY_OBJECT = 'object'
+    __LINKED_RESOURCE_REGEX = r'^gs://([^/]+)/(.*)$'
+
+    def __init__(self, index, count, by=BY_BUCKET):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f'Invalid shard: {index} of {count}')
+        if by not in (self.BY_BUCKET, self.BY_OBJECT):
+            raise ValueError(f'Invalid shard key: {by}')
+
+        self.index = index
+        self.count = count
+        self.by = by
+
+    def __str__(self):
+        return f'{self.index + 1}/{self.count} by {self.by}'
+
+    def owns_bucket(self, bucket_name):
+        """
+        Whether any object of the bucket may belong to the shard, i.e.
+        whether the bucket has to be listed at all.
+        """
+        return self.by == self.BY_OBJECT or self.__owns(bucket_name)
+
+    def owns_object(self, bucket_name, file_name):
+        if self.by == self.BY_BUCKET:
+            return self.__owns(bucket_name)
+        return self.__owns(f'{bucket_name}/{file_name}')
+
+    def owns_linked_resource(self, linked_resource):
+        re_match = re.match(self.__LINKED_RESOURCE_REGEX, linked_resource or '')
+        return bool(re_match) and self.owns_object(*re_match.groups())
+
+    def __owns(self, key):
+        return zlib.crc32(key.encode('utf-8')) % self.count == self.index
@@ -1,6 +1,17 @@
+import asyncio
+import itertools
 import logging
 
+from datacatalog_object_storage_processor import listing_snapshot
+from datacatalog_object_storage_processor import shard_manifest
+from datacatalog_object_storage_processor import sync_plan
+from datacatalog_object_storage_processor import sync_state_store
+from datacatalog_object_storage_processor import utils
 from datacatalog_object_storage_processor.datacatalog_helper import DataCatalogHelper
+from datacatalog_object_storage_processor.object_storage import object_change_events
+from datacatalog_object_storage_processor.object_storage import object_storage_grouping
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+from datacatalog_object_storage_processor.object_storage import object_storage_shard
 from datacatalog_object_storage_processor.object_storage.cloud_storage.storage_processor import \
     StorageProcessor
 
@@ -10,38 +21,605 @@ class ObjectStorageProcessor:
     __LOCATION = 'us-central1'
     __FILE_PATTERN_REGEX = r'^gs:[\/][\/]([a-zA-Z-_\d*]+)[\/](.*)$'
     __ALLOWED_OBJECT_STORAGE_TYPES = ['cloud_storage']
+    # Listed pages kept ahead of the sync step while streaming.
+    __STREAM_MAX_BUFFERED_PAGES = 4
+    # Groups handed at once to the asyncio engine.
+    __GROUPS_PAGE_SIZE = 1000
 
-    def __init__(self, object_storage_type, project_id):
+    def __init__(self,
+                 object_storage_type,
+                 project_id,
+                 read_qps=None,
+                 write_qps=None,
+                 storage_qps=None,
+                 rpc_metrics=None,
+                 transport_options=None):
         if object_storage_type not in self.__ALLOWED_OBJECT_STORAGE_TYPES:
             raise Exception('Invalid object storage type: {}'.format(object_storage_type))
 
-        self.__storage_processor = StorageProcessor(project_id)
-        self.__dacatalog_helper = DataCatalogHelper(project_id)
+        rpc_metrics = rpc_metrics or utils.RpcMetrics()
+        self.__storage_processor = StorageProcessor(
+            project_id, utils.AdaptiveRateLimiter('cloud storage', storage_qps), rpc_metrics,
+            transport_options)
+        self.__dacatalog_helper = DataCatalogHelper(
+            project_id, utils.AdaptiveRateLimiter('datacatalog read', read_qps),
+            utils.AdaptiveRateLimiter('datacatalog write', write_qps), rpc_metrics,
+            transport_options)
         self.__object_storage_type = object_storage_type
         self.__project_id = project_id
 
-    def sync_entries(self, entry_group_name, bucket_prefix=None):
+    def sync_entries(self,
+                     entry_group_name,
+                     bucket_prefix=None,
+                     stream=False,
+                     workers=1,
+                     bucket_workers=1,
+                     bucket_timeout=None,
+                     prefix_workers=1,
+                     verify_tags=False,
+                     state_path=None,
+                     engine='threads',
+                     max_in_flight=500,
+                     resume=False,
+                     shard_index=0,
+                     shard_count=1,
+                     shard_by=object_storage_shard.ObjectStorageShard.BY_BUCKET,
+                     manifest_path=None,
+                     plan_path=None,
+                     group_depth=None,
+                     group_pattern=None,
+                     snapshot_path=None,
+                     from_snapshot_path=None,
+                     object_filter=None):
+        """
+        Synchronize the Entry Group with the files of the project. With a
+        `shard_count` greater than 1, only the slice of shard `shard_index`
+        is synchronized, and the names of its Entries are written to
+        `manifest_path` when given, see merge_shard_manifests.
+
+        With a `group_depth` or a `group_pattern`, the files sharing a
+        prefix, see ObjectStorageGrouping, are synchronized as a single
+        Entry whose Tag holds their aggregates.
+
+        When `plan_path` is given, nothing is written to Data Catalog: the
+        operations the sync would make are written to a plan at that path
+        instead, see apply_sync_plan.
+
+        The listed files are written to a ListingSnapshot at `snapshot_path`
+        when given. With a `from_snapshot_path`, the files are read from that
+        snapshot instead of being listed.
+
+        With an `object_filter`, an ObjectStorageFilter, only the files it
+        keeps are synchronized, and the Entries of the others are obsolete.
+        """
+        shard = None
+        if shard_count > 1:
+            shard = object_storage_shard.ObjectStorageShard(shard_index, shard_count, shard_by)
+            logging.info(f'===> Synchronizing shard {shard}')
+
+        grouping = None
+        if group_depth is not None or group_pattern is not None:
+            grouping = object_storage_grouping.ObjectStorageGrouping(group_depth, group_pattern)
+            logging.info(f'===> Grouping files by {grouping}')
+
+        if object_filter:
+            logging.info(f'===> Filtering files by {object_filter}')
+
+        if plan_path:
+            self.__plan_entries(entry_group_name, bucket_prefix, stream, workers, bucket_workers,
+                                bucket_timeout, prefix_workers, verify_tags, shard,
+                                grouping, plan_path, snapshot_path,
+                                self.__read_snapshot(from_snapshot_path), object_filter)
+            return
+
+        if engine == 'asyncio':
+            loop = asyncio.new_event_loop()
+            try:
+                entries_names, complete = loop.run_until_complete(
+                    self.__sync_entries_async(entry_group_name, bucket_prefix, max_in_flight,
+                                              verify_tags, shard, grouping, snapshot_path,
+                                              from_snapshot_path, object_filter))
+            finally:
+                loop.close()
+            self.__write_manifest(manifest_path, entry_group_name, shard, entries_names, complete)
+            return
+
         logging.info(
             f'===> Starting Object Storage processor, type [{self.__object_storage_type}]')
 
-        dataframe, _ = self.__storage_processor.create_object_storage_data(bucket_prefix)
+        from_snapshot = self.__read_snapshot(from_snapshot_path)
+
+        # Shards sharing a state file must not overwrite each other's runs.
+        state_store = sync_state_store.SyncStateStore(
+            state_path, self.__get_state_scope(shard)) if state_path else None
+        try:
+            if state_store:
+                resume = state_store.start_run(entry_group_name, resume)
+            if stream:
+                entries_names, complete = self.__sync_entries_streaming(
+                    entry_group_name, bucket_prefix, workers, verify_tags, state_store, resume,
+                    shard, grouping, snapshot_path, from_snapshot, object_filter)
+            else:
+                entries_names, complete = self.__sync_entries_listing(
+                    entry_group_name, bucket_prefix, workers, bucket_workers, bucket_timeout,
+                    prefix_workers, verify_tags, state_store, shard, grouping, snapshot_path,
+                    from_snapshot, object_filter)
+        finally:
+            if state_store:
+                state_store.close()
 
-        logging.info(f'===> {len(dataframe) if dataframe is not None else 0} Entries found...')
+        self.__write_manifest(manifest_path, entry_group_name, shard, entries_names, complete)
+
+        logging.info('==== DONE ==================================================')
         logging.info('')
 
-        if dataframe is not None:
-            logging.info('===> Synchronize Entries on DataCatalog from Object Storage files...')
-            self.__dacatalog_helper.sync_entries_from_dataframe(dataframe, entry_group_name,
-                                                                self.__object_storage_type)
+    async def sync_entries_async(self,
+                                 entry_group_name,
+                                 bucket_prefix=None,
+                                 max_in_flight=500,
+                                 verify_tags=False,
+                                 shard=None,
+                                 grouping=None,
+                                 snapshot_path=None,
+                                 from_snapshot_path=None,
+                                 object_filter=None):
+        """
+        Synchronize Entries with the asyncio engine: listed pages are fed
+        straight into non-blocking Data Catalog calls, keeping up to
+        `max_in_flight` Entries in progress.
+        """
+        entries_names, _ = await self.__sync_entries_async(entry_group_name, bucket_prefix,
+                                                           max_in_flight, verify_tags, shard,
+                                                           grouping, snapshot_path,
+                                                           from_snapshot_path, object_filter)
+        return entries_names
+
+    async def __sync_entries_async(self, entry_group_name, bucket_prefix, max_in_flight,
+                                   verify_tags, shard, grouping, snapshot_path, from_snapshot_path,
+                                   object_filter):
+        # Returns the synchronized Entries names and whether every bucket was
+        # fully listed.
+        logging.info(f'===> Starting Object Storage processor, type'
+                     f' [{self.__object_storage_type}], asyncio engine')
+
+        records_pages, complete = self.__iterate_records_pages(
+            bucket_prefix, None, shard, snapshot_path, self.__read_snapshot(from_snapshot_path),
+            object_filter)
+        records_pages = utils.BoundedPrefetchIterator(
+            self.__group_records_pages(records_pages, grouping), self.__STREAM_MAX_BUFFERED_PAGES)
+        try:
+            entries_names = await self.__dacatalog_helper.sync_entries_from_records_async(
+                records_pages,
+                entry_group_name,
+                self.__object_storage_type,
+                max_in_flight,
+                delete_obsolete=complete,
+                verify_tags=verify_tags,
+                shard=shard,
+                grouped=grouping is not None)
+        finally:
+            # Stops the listing when the sync failed before consuming it.
+            records_pages.close()
+
+        logging.info('==== DONE ==================================================')
+        logging.info('')
+        return entries_names, complete
+
+    def sync_batch(self,
+                   config,
+                   workers=1,
+                   bucket_workers=1,
+                   bucket_timeout=None,
+                   prefix_workers=1,
+                   verify_tags=False,
+                   state_path=None):
+        """
+        Synchronize the Entry Groups of the routes of a BatchSyncConfig from
+        a single listing of the project: each listed file is routed to
+        every route selecting it, then the Entry Groups are synchronized in
+        turn, with the same clients, as sync_entries would. The obsolete
+        Entries of a route are kept when one of its buckets timed out.
+
+        Returns the names of the Entry Groups whose sync failed, the other
+        routes being synchronized regardless.
+        """
+        logging.info(f'===> Starting Object Storage processor, type'
+                     f' [{self.__object_storage_type}], {len(config.routes)} routes')
+
+        records, bucket_stats = self.__storage_processor.create_object_storage_data(
+            config.get_bucket_prefix(),
+            bucket_workers,
+            bucket_timeout,
+            prefix_workers,
+            object_filter=config.get_listing_filter(),
+            bucket_prefixes=config.get_bucket_prefixes())
+        timed_out_buckets_names = [
+            stats['bucket_name'] for stats in bucket_stats if stats.get('timed_out')
+        ]
+
+        logging.info(f'===> {len(records)} files found...')
+        logging.info('')
+
+        failed_entry_groups_names = []
+        state_store = sync_state_store.SyncStateStore(state_path) if state_path else None
+        try:
+            for route in config.routes:
+                logging.info(f'===> Route to {route.entry_group_name}: {route}')
+                route_records = route.select_records(records)
+                if len(route_records) == 0:
+                    logging.info('===> Nothing to Synchronize...')
+                    continue
+
+                # Entries of a skipped bucket would look obsolete.
+                complete = not any(
+                    route.selects_bucket(bucket_name) for bucket_name in timed_out_buckets_names)
+                if not complete:
+                    logging.warning('Some buckets of the route timed out,'
+                                    ' obsolete Entries will not be deleted')
+                try:
+                    if state_store:
+                        state_store.start_run(route.entry_group_name)
+                    grouped = route.grouping is not None
+                    route_records = self.__group_records(route_records, route.grouping)
+                    self.__dacatalog_helper.sync_entries_from_records(route_records,
+                                                                      route.entry_group_name,
+                                                                      self.__object_storage_type,
+                                                                      workers,
+                                                                      delete_obsolete=complete,
+                                                                      verify_tags=verify_tags,
+                                                                      state_store=state_store,
+                                                                      grouped=grouped)
+                except Exception as e:
+                    logging.warning(f'Sync of {route.entry_group_name} failed: {e}')
+                    failed_entry_groups_names.append(route.entry_group_name)
+        finally:
+            if state_store:
+                state_store.close()
+
+        logging.info(f'===> {len(config.routes) - len(failed_entry_groups_names)} of'
+                     f' {len(config.routes)} routes synchronized')
+        logging.info('==== DONE ==================================================')
+        logging.info('')
+        return failed_entry_groups_names
+
+    def merge_shard_manifests(self, entry_group_name, manifest_paths, workers=1):
+        """
+        Coordinator step of a sharded sync: merge the manifests written by
+        every shard and delete the Entries none of them synchronized, such
+        as those left behind by a change of the shard count.
+        """
+        logging.info(f'===> Merge {len(manifest_paths)} shard manifests...')
+        manifests = [shard_manifest.ShardManifest.read(path) for path in manifest_paths]
+        entries_names = shard_manifest.ShardManifest.merge(manifests, entry_group_name)
+        logging.info(f'{len(entries_names)} Entries synchronized by the shards')
+
+        incomplete_shards = [
+            manifest.shard_index for manifest in manifests if not manifest.complete
+        ]
+        if incomplete_shards:
+            # Their skipped buckets have Entries which are not in the manifests.
+            logging.warning(f'Shards {incomplete_shards} did not fully list their buckets,'
+                            ' obsolete Entries will not be deleted')
+            return
+
+        self.__dacatalog_helper.delete_obsolete_metadata(entries_names, self.__object_storage_type,
+                                                         entry_group_name, workers)
+
+        logging.info('==== DONE ==================================================')
+        logging.info('')
+
+    def apply_sync_plan(self, entry_group_name, plan_path, workers=1):
+        """
+        Apply a plan written by sync_entries, with up to `workers`
+        concurrent operations.
+        """
+        logging.info(f'===> Apply the sync plan: {plan_path}')
+        plan = sync_plan.SyncPlan.read(plan_path)
+        if plan.entry_group_name != entry_group_name:
+            raise ValueError(f'The sync plan is for Entry Group {plan.entry_group_name}')
+        if plan.system != self.__object_storage_type:
+            raise ValueError(f'The sync plan is for object storage type {plan.system}')
+        logging.info(f'{sum(plan.operations_counts.values())} operations to apply'
+                     f' {plan.operations_counts}')
+
+        self.__dacatalog_helper.apply_sync_plan(plan, workers)
+
+        logging.info('==== DONE ==================================================')
+        logging.info('')
+
+    def watch_object_changes(self,
+                             entry_group_name,
+                             source,
+                             bucket_prefix=None,
+                             window=5,
+                             workers=1,
+                             object_filter=None):
+        """
+        Synchronize the Entries of the objects reported by an event source,
+        see object_change_events, until it is exhausted. The events received
+        over `window` seconds are coalesced by object then applied, with up
+        to `workers` concurrent changes, as upserts and deletions of single
+        Entries. Events are acknowledged once applied, so those whose change
+        failed are delivered again. With an `object_filter`, objects whose
+        name it does not keep are ignored, and Entries of the other objects
+        it does not keep are deleted.
+
+        Returns the counts of applied and of failed changes.
+        """
+        logging.info(f'===> Watch object changes, {window} seconds windows')
+        applied_count = failed_count = 0
+        while True:
+            events = source.pull(window)
+            if events is None:
+                break
+            if not events:
+                continue
+
+            changes = [
+                event for event in object_change_events.ObjectChangeEvent.coalesce(events)
+                if (not bucket_prefix or event.bucket_name.startswith(bucket_prefix)) and (
+                    not object_filter or object_filter.matches_name(event.object_name))
+            ]
+            records = []
+            deleted_records = []
+            for event in changes:
+                record = self.__make_change_record(event)
+                if not record:
+                    continue
+                # Objects updated out of the filter bounds lose their Entry.
+                deleted = event.is_deletion or object_filter and not object_filter.matches(
+                    record.file_name, record.size, record.time_updated)
+                (deleted_records if deleted else records).append(record)
+
+            try:
+                failed_records = self.__dacatalog_helper.apply_object_changes(
+                    records, deleted_records, entry_group_name, workers)
+            except Exception as e:
+                # Nothing is acknowledged, so the window is delivered again.
+                logging.exception(f'Failed to apply a window of {len(events)} events: {e}')
+                failed_count += len(records) + len(deleted_records)
+                continue
+
+            failed_keys = {(record.bucket_name, record.file_name) for record in failed_records}
+            source.ack([event for event in events if event.key not in failed_keys])
+
+            applied_count += len(records) + len(deleted_records) - len(failed_keys)
+            failed_count += len(failed_keys)
+            logging.info(f'{len(events)} events, {len(records)} upserts and'
+                         f' {len(deleted_records)} deletions, {len(failed_keys)} failed')
+
+        logging.info('==== DONE ==================================================')
+        logging.info('')
+        return applied_count, failed_count
+
+    @classmethod
+    def __make_change_record(cls, event):
+        """
+        Returns the record of the object changed by an event, or None when
+        it cannot be made, e.g. for upserts notified without their JSON_API_V1
+        payload. Those events are dropped and acknowledged, as they would not
+        be applied on redelivery either.
+        """
+        resource = event.resource
+        if not resource.get('name'):
+            if not event.is_deletion:
+                logging.warning(f'Ignored {event.event_type} event of'
+                                f' gs://{event.bucket_name}/{event.object_name}:'
+                                f' no JSON_API_V1 payload')
+                return None
+            # Deletions only need the name of the object.
+            resource = {'name': event.object_name}
+
+        try:
+            return StorageProcessor.create_records_from_resources(event.bucket_name, [resource])[0]
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f'Ignored {event.event_type} event of'
+                            f' gs://{event.bucket_name}/{event.object_name}: {e}')
+            return None
+
+    def __plan_entries(self, entry_group_name, bucket_prefix, stream, workers, bucket_workers,
+                       bucket_timeout, prefix_workers, verify_tags, shard, grouping, plan_path,
+                       snapshot_path, from_snapshot, object_filter):
+        logging.info('===> Plan the sync of Entries on DataCatalog from Object Storage files...')
+        records_pages = None
+        if stream:
+            records_pages, delete_obsolete = self.__iterate_records_pages(
+                bucket_prefix, None, shard, snapshot_path, from_snapshot, object_filter)
+            records_pages = utils.BoundedPrefetchIterator(records_pages,
+                                                          self.__STREAM_MAX_BUFFERED_PAGES)
+            records = self.__flatten_records_pages(records_pages)
         else:
-            logging.info('===> Nothing to Synchronize...')
+            records, delete_obsolete = self.__list_records(bucket_prefix, bucket_workers,
+                                                           bucket_timeout, prefix_workers, shard,
+                                                           snapshot_path, from_snapshot,
+                                                           object_filter)
+
+        try:
+            self.__dacatalog_helper.plan_sync_from_records(self.__group_records(records, grouping),
+                                                           entry_group_name,
+                                                           self.__object_storage_type,
+                                                           plan_path,
+                                                           workers,
+                                                           delete_obsolete=delete_obsolete,
+                                                           verify_tags=verify_tags,
+                                                           shard=shard,
+                                                           grouped=grouping is not None)
+        finally:
+            if records_pages:
+                records_pages.close()
 
         logging.info('==== DONE ==================================================')
         logging.info('')
 
-    def delete_entries(self, entry_group_name):
+    def __sync_entries_listing(self, entry_group_name, bucket_prefix, workers, bucket_workers,
+                               bucket_timeout, prefix_workers, verify_tags, state_store, shard,
+                               grouping, snapshot_path, from_snapshot, object_filter):
+        records, complete = self.__list_records(bucket_prefix, bucket_workers, bucket_timeout,
+                                                prefix_workers, shard, snapshot_path,
+                                                from_snapshot, object_filter)
+
+        logging.info(f'===> {len(records)} files found...')
+        logging.info('')
+
+        if len(records) > 0:
+            logging.info('===> Synchronize Entries on DataCatalog from Object Storage files...')
+            entries_names = self.__dacatalog_helper.sync_entries_from_records(
+                self.__group_records(records, grouping),
+                entry_group_name,
+                self.__object_storage_type,
+                workers,
+                delete_obsolete=complete,
+                verify_tags=verify_tags,
+                state_store=state_store,
+                shard=shard,
+                grouped=grouping is not None)
+            return entries_names, complete
+
+        logging.info('===> Nothing to Synchronize...')
+        return [], complete
+
+    def __sync_entries_streaming(self, entry_group_name, bucket_prefix, workers, verify_tags,
+                                 state_store, resume, shard, grouping, snapshot_path,
+                                 from_snapshot, object_filter):
+        logging.info('===> Stream Entries to DataCatalog from Object Storage files...')
+        # With a state store, listing cursors are checkpointed after each
+        # page, and a resumed run starts listing from them.
+        listing_cursors = None
+        if state_store:
+            listing_cursors = state_store.get_listing_cursors(entry_group_name) if resume else {}
+
+        records_pages, complete = self.__iterate_records_pages(bucket_prefix, listing_cursors,
+                                                               shard, snapshot_path, from_snapshot,
+                                                               object_filter)
+        records_pages = utils.BoundedPrefetchIterator(records_pages,
+                                                      self.__STREAM_MAX_BUFFERED_PAGES)
+        try:
+            entries_names = self.__dacatalog_helper.sync_entries_from_records(
+                self.__group_records(self.__flatten_records_pages(records_pages), grouping),
+                entry_group_name,
+                self.__object_storage_type,
+                workers,
+                delete_obsolete=complete,
+                verify_tags=verify_tags,
+                state_store=state_store,
+                shard=shard,
+                grouped=grouping is not None)
+            return entries_names, complete
+        finally:
+            # Stops the listing when the sync failed before consuming it.
+            records_pages.close()
+
+    def __list_records(self, bucket_prefix, bucket_workers, bucket_timeout, prefix_workers, shard,
+                       snapshot_path, from_snapshot, object_filter):
+        # Returns the records and whether every bucket was fully listed.
+        if from_snapshot:
+            records = object_storage_records.ObjectStorageRecords(self.__object_storage_type)
+            for snapshot_records in from_snapshot.iterate_records_pages(
+                    bucket_prefix, shard, object_filter):
+                records.extend(snapshot_records)
+            return records, from_snapshot.complete
+
+        records, bucket_stats = self.__storage_processor.create_object_storage_data(
+            bucket_prefix, bucket_workers, bucket_timeout, prefix_workers, shard, object_filter)
+        complete = not self.__has_timed_out_buckets(bucket_stats)
+        if snapshot_path:
+            listing_snapshot.ListingSnapshot.write(snapshot_path, self.__object_storage_type,
+                                                   records, bucket_prefix, shard, complete,
+                                                   object_filter)
+        return records, complete
+
+    def __iterate_records_pages(self, bucket_prefix, listing_cursors, shard, snapshot_path,
+                                from_snapshot, object_filter):
+        # Returns the records pages and whether every bucket is fully listed.
+        if from_snapshot:
+            return from_snapshot.iterate_records_pages(bucket_prefix, shard,
+                                                       object_filter), from_snapshot.complete
+
+        records_pages = self.__storage_processor.iterate_object_storage_data(
+            bucket_prefix, listing_cursors, shard, object_filter)
+        if snapshot_path:
+            records_pages = listing_snapshot.ListingSnapshot.write_through(
+                snapshot_path,
+                self.__object_storage_type,
+                records_pages,
+                bucket_prefix,
+                shard,
+                object_filter=object_filter)
+        return records_pages, True
+
+    def __read_snapshot(self, snapshot_path):
+        if not snapshot_path:
+            return None
+
+        snapshot = listing_snapshot.ListingSnapshot.read(snapshot_path)
+        if snapshot.system != self.__object_storage_type:
+            raise ValueError(f'The listing snapshot is for object storage type {snapshot.system}')
+        logging.info(f'===> Reading {snapshot.records_count} files from the listing snapshot'
+                     f' {snapshot_path}, taken at {snapshot.created_time}')
+        if not snapshot.complete:
+            logging.warning('Some buckets were not fully listed in the snapshot,'
+                            ' obsolete Entries will not be deleted')
+        return snapshot
+
+    @classmethod
+    def __has_timed_out_buckets(cls, bucket_stats):
+        # Entries of a skipped bucket would look obsolete, so cleanup is only
+        # safe when every bucket was fully listed.
+        timed_out_buckets = [stats for stats in bucket_stats if stats.get('timed_out')]
+        if timed_out_buckets:
+            logging.warning(f'{len(timed_out_buckets)} buckets timed out,'
+                            ' obsolete Entries will not be deleted')
+        return bool(timed_out_buckets)
+
+    @classmethod
+    def __write_manifest(cls, manifest_path, entry_group_name, shard, entries_names, complete):
+        if not manifest_path:
+            return
+
+        shard_index, shard_count = (shard.index, shard.count) if shard else (0, 1)
+        shard_manifest.ShardManifest(entry_group_name, shard_index, shard_count,
+                                     sorted(entries_names), complete).write(manifest_path)
+
+    @classmethod
+    def __get_state_scope(cls, shard):
+        return f'shard-{shard.index}-of-{shard.count}-by-{shard.by}' if shard else None
+
+    @classmethod
+    def __flatten_records_pages(cls, records_pages):
+        for records in records_pages:
+            if isinstance(records, object_storage_records.ListingCursor):
+                yield records
+            else:
+                yield from records
+
+    @classmethod
+    def __group_records(cls, records, grouping):
+        return grouping.group(records) if grouping else records
+
+    @classmethod
+    def __group_records_pages(cls, records_pages, grouping):
+        if not grouping:
+            yield from records_pages
+            return
+
+        groups = grouping.group(cls.__flatten_records_pages(records_pages))
+        while True:
+            groups_page = list(itertools.islice(groups, cls.__GROUPS_PAGE_SIZE))
+            if not groups_page:
+                return
+            yield groups_page
+
+    def clear_metadata_cache(self):
+        """
+        Forget the Entry Groups and Tag Templates loaded by previous syncs of
+        this processor, see DataCatalogHelper.clear_metadata_cache.
+        """
+        self.__dacatalog_helper.clear_metadata_cache()
+
+    def delete_entries(self, entry_group_name, workers=1):
         logging.info('===> Delete Entries on DataCatalog from Object Storage files...')
-        self.__dacatalog_helper.delete_entries(entry_group_name, self.__object_storage_type)
+        self.__dacatalog_helper.delete_entries(entry_group_name, self.__object_storage_type,
+                                               workers)
 
         logging.info('==== DONE ==================================================')
         logging.info('')
@@ -0,0 +1,73 @@
+import json
+import logging
+
+
+class ShardManifest:
+    """
+    ShardManifest lists the Entries synchronized by one shard of a sharded
+    sync. It is stored as JSON lines: a header with the shard details,
+    followed by one Entry name per line.
+
+    A shard that skipped some of its buckets is not `complete`: the Entries
+    of those buckets are missing from its manifest, and must not be taken
+    as obsolete.
+    """
+
+    def __init__(self, entry_group_name, shard_index, shard_count, entries_names, complete=True):
+        self.entry_group_name = entry_group_name
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.entries_names = entries_names
+        self.complete = complete
+
+    def write(self, path):
+        with open(path, 'w') as manifest_file:
+            manifest_file.write(
+                json.dumps({
+                    'entry_group_name': self.entry_group_name,
+                    'shard_index': self.shard_index,
+                    'shard_count': self.shard_count,
+                    'entries_count': len(self.entries_names),
+                    'complete': self.complete
+                }) + '\n')
+            for entry_name in self.entries_names:
+                manifest_file.write(entry_name + '\n')
+
+        logging.info(f'{len(self.entries_names)} Entries written to the shard manifest: {path}')
+
+    @classmethod
+    def read(cls, path):
+        with open(path) as manifest_file:
+            header = json.loads(manifest_file.readline())
+            entries_names = [line.rstrip('\n') for line in manifest_file if line.strip()]
+
+        if len(entries_names) != header['entries_count']:
+            raise ValueError(f'Truncated shard manifest: {path}')
+
+        return cls(header['entry_group_name'], header['shard_index'], header['shard_count'],
+                   entries_names, header.get('complete', True))
+
+    @classmethod
+    def merge(cls, manifests, entry_group_name):
+        """
+        Returns the names of the Entries synchronized by all the shards,
+        after checking that the manifests cover every shard exactly once.
+        """
+        shard_counts = {manifest.shard_count for manifest in manifests}
+        if len(shard_counts) != 1:
+            raise ValueError(f'Manifests of different shard counts: {sorted(shard_counts)}')
+
+        for manifest in manifests:
+            if manifest.entry_group_name != entry_group_name:
+                raise ValueError(f'Manifest of shard {manifest.shard_index} is for Entry Group'
+                                 f' {manifest.entry_group_name}')
+
+        shard_count = shard_counts.pop()
+        shard_indexes = sorted(manifest.shard_index for manifest in manifests)
+        if shard_indexes != list(range(shard_count)):
+            raise ValueError(f'Manifests cover shards {shard_indexes} out of {shard_count}')
+
+        entries_names = set()
+        for manifest in manifests:
+            entries_names.update(manifest.entries_names)
+        return entries_names
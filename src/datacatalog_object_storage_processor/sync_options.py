@@ -0,0 +1,75 @@
+class SyncOptions:
+    """
+    Checks of the options of ObjectStorageProcessor.sync_entries, shared by
+    the sync-entries and serve commands and by the jobs of a SyncService.
+    """
+
+    # Options naming local files, see SyncServiceRequestHandler.
+    PATH_OPTIONS = ('state_path', 'manifest_path', 'plan_path', 'snapshot_path',
+                    'from_snapshot_path')
+
+    @classmethod
+    def check(cls, options, format_option=None):
+        """
+        Raise ValueError when `options`, holding every option of
+        sync_entries, cannot be combined. The options are named in the
+        messages by `format_option`, e.g. as command line flags.
+        """
+        name = format_option or str
+        if options['resume'] and not options['state_path']:
+            raise ValueError(f'{name("resume")} requires {name("state_path")}')
+        if not 0 <= options['shard_index'] < options['shard_count']:
+            raise ValueError(f'{name("shard_index")} must be between 0 and'
+                             f' {name("shard_count")} - 1')
+        if options['plan_path'] and (options['state_path'] or options['manifest_path']
+                                     or options['engine'] == 'asyncio'):
+            raise ValueError(f'{name("plan_path")} cannot be combined with'
+                             f' {name("state_path")}, {name("manifest_path")} or'
+                             f' {name("engine")} asyncio')
+        if options['engine'] == 'asyncio':
+            cls.__check_asyncio_options(options, name)
+        elif options['stream']:
+            cls.__check_stream_options(options, name)
+        if options['group_depth'] is not None and options['group_pattern'] is not None:
+            raise ValueError(f'{name("group_depth")} cannot be combined with'
+                             f' {name("group_pattern")}')
+        if (options['group_depth'] is not None or options['group_pattern'] is not None) \
+                and options['shard_count'] > 1 and options['shard_by'] == 'object':
+            raise ValueError(f'Grouping requires {name("shard_by")} bucket, as the objects of'
+                             f' a group must be synchronized by the same shard')
+        if options['group_depth'] is not None and options['group_depth'] < 1:
+            raise ValueError(f'{name("group_depth")} must be at least 1')
+        if options['from_snapshot_path'] and (options['snapshot_path'] or options['resume']):
+            raise ValueError(f'{name("from_snapshot_path")} cannot be combined with'
+                             f' {name("snapshot_path")} or {name("resume")}')
+        if options['snapshot_path'] and options['resume']:
+            raise ValueError(f'{name("snapshot_path")} cannot be combined with'
+                             f' {name("resume")}, as a resumed run does not list every file')
+
+    @classmethod
+    def __check_asyncio_options(cls, options, name):
+        # The asyncio engine is only scaled by max_in_flight, and keeps no
+        # sync state.
+        ignored_options = [
+            option
+            for option, default in (('state_path', None), ('resume', False), ('stream', False),
+                                    ('workers', 1), ('bucket_workers', 1),
+                                    ('bucket_timeout', None), ('prefix_workers', 1))
+            if options[option] != default
+        ]
+        if ignored_options:
+            raise ValueError(f'{name("engine")} asyncio cannot be combined with'
+                             f' {", ".join(name(option) for option in ignored_options)};'
+                             f' use {name("max_in_flight")} to scale it')
+
+    @classmethod
+    def __check_stream_options(cls, options, name):
+        # Streamed buckets are listed one after the other, page by page.
+        ignored_options = [
+            option for option, default in (('bucket_workers', 1), ('bucket_timeout', None),
+                                           ('prefix_workers', 1)) if options[option] != default
+        ]
+        if ignored_options:
+            raise ValueError(f'{name("stream")} cannot be combined with'
+                             f' {", ".join(name(option) for option in ignored_options)};'
+                             f' use {name("workers")} to scale it')
@@ -0,0 +1,105 @@
+import collections
+import json
+import logging
+
+
+class SyncPlan:
+    """
+    SyncPlan holds the Data Catalog operations a sync would make, computed
+    offline so they can be reviewed, sized against quota or split before
+    being applied. It is stored as JSON lines: a header with the plan
+    details, one operation per line and a footer with the operations count,
+    which tells a complete plan from a truncated one.
+
+    Entry operations carry the listed file record rather than the Entry, so
+    the Entry and its Tags are built again when the plan is applied.
+    """
+
+    CREATE_ENTRY = 'create_entry'
+    UPDATE_ENTRY = 'update_entry'
+    UPDATE_TAGS = 'update_tags'
+    DELETE_ENTRY = 'delete_entry'
+
+    def __init__(self,
+                 path,
+                 entry_group_name,
+                 system,
+                 tag_template_name,
+                 execution_time,
+                 operations_counts,
+                 grouped=False):
+        self.path = path
+        self.entry_group_name = entry_group_name
+        self.system = system
+        self.tag_template_name = tag_template_name
+        self.execution_time = execution_time
+        self.operations_counts = operations_counts
+        self.grouped = grouped
+
+    @classmethod
+    def write(cls,
+              path,
+              entry_group_name,
+              system,
+              tag_template_name,
+              execution_time,
+              operations,
+              grouped=False):
+        """
+        Write the `operations` dicts, which may be lazily produced, to a new
+        plan at `path`, and return it. `grouped` tells whether operations may
+        be about groups of objects.
+        """
+        operations_counts = collections.Counter()
+        with open(path, 'w') as plan_file:
+            plan_file.write(
+                json.dumps({
+                    'entry_group_name': entry_group_name,
+                    'system': system,
+                    'tag_template_name': tag_template_name,
+                    'execution_time': execution_time,
+                    'grouped': grouped
+                }) + '\n')
+            for operation in operations:
+                plan_file.write(json.dumps(operation) + '\n')
+                operations_counts[operation['operation']] += 1
+            plan_file.write(
+                json.dumps({'operations_count': sum(operations_counts.values())}) + '\n')
+
+        logging.info(f'{sum(operations_counts.values())} operations written to the sync plan:'
+                     f' {path} {dict(operations_counts)}')
+        return cls(path, entry_group_name, system, tag_template_name, execution_time,
+                   dict(operations_counts), grouped)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Read the header of the plan at `path` and count its operations,
+        which are only loaded when iterated, see iterate_operations.
+        """
+        operations_counts = collections.Counter()
+        footer = None
+        with open(path) as plan_file:
+            header = json.loads(plan_file.readline())
+            for line in plan_file:
+                if footer is not None:
+                    raise ValueError(f'Unexpected content after the sync plan footer: {path}')
+                operation = json.loads(line)
+                if 'operation' in operation:
+                    operations_counts[operation['operation']] += 1
+                else:
+                    footer = operation
+
+        if not footer or footer['operations_count'] != sum(operations_counts.values()):
+            raise ValueError(f'Truncated sync plan: {path}')
+
+        return cls(path, header['entry_group_name'], header['system'], header['tag_template_name'],
+                   header['execution_time'], dict(operations_counts), header.get('grouped', False))
+
+    def iterate_operations(self):
+        with open(self.path) as plan_file:
+            plan_file.readline()
+            for line in plan_file:
+                operation = json.loads(line)
+                if 'operation' in operation:
+                    yield operation
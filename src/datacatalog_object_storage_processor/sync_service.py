@@ -0,0 +1,336 @@
+import datetime
+import http.server
+import inspect
+import json
+import logging
+import socketserver
+import threading
+import time
+from concurrent import futures
+
+from datacatalog_object_storage_processor import sync_options
+from datacatalog_object_storage_processor.object_storage import object_storage_filter
+
+
+class SyncJob:
+    """
+    SyncJob is a sync of an Entry Group run by a SyncService, every
+    `interval` seconds or only on request when `interval` is None, with the
+    `options` of ObjectStorageProcessor.sync_entries.
+    """
+
+    IDLE = 'idle'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    def __init__(self, job_id, entry_group_name, options, interval=None):
+        self.job_id = job_id
+        self.entry_group_name = entry_group_name
+        self.options = options
+        self.interval = interval
+        self.state = self.IDLE
+        self.runs_count = 0
+        self.failures_count = 0
+        self.last_start_time = None
+        self.last_end_time = None
+        self.last_duration_seconds = None
+        self.last_error = None
+        # Monotonic time of the next run, None when only run on request.
+        self.next_run = None
+        # Whether a run was requested while the job was running.
+        self.run_requested = False
+
+    @property
+    def is_active(self):
+        return self.state in (self.QUEUED, self.RUNNING)
+
+    def to_dict(self):
+        next_run_time = None
+        if self.next_run is not None:
+            next_run_time = self.__to_isoformat(
+                datetime.datetime.now(datetime.timezone.utc) +
+                datetime.timedelta(seconds=max(0.0, self.next_run - time.monotonic())))
+
+        return {
+            'id': self.job_id,
+            'entry_group_name': self.entry_group_name,
+            'interval': self.interval,
+            'state': self.state,
+            'runs_count': self.runs_count,
+            'failures_count': self.failures_count,
+            'last_start_time': self.__to_isoformat(self.last_start_time),
+            'last_end_time': self.__to_isoformat(self.last_end_time),
+            'last_duration_seconds': self.last_duration_seconds,
+            'last_error': self.last_error,
+            'next_run_time': next_run_time
+        }
+
+    @classmethod
+    def __to_isoformat(cls, value):
+        return value.isoformat() if value else None
+
+
+class SyncService:
+    """
+    SyncService runs the SyncJobs of a long-running process, see the serve
+    command. Every job uses the same ObjectStorageProcessor, so its clients,
+    their connections and the Entry Groups and Tag Templates loaded by
+    previous runs are reused, instead of being set up again by every run.
+
+    Up to `max_concurrent_jobs` jobs run at once, never two of the same
+    Entry Group. The `default_options` of sync_entries apply to every job
+    unless overridden.
+    """
+
+    __MAX_WAIT_SECONDS = 60
+
+    def __init__(self, processor, default_options=None, max_concurrent_jobs=1, rpc_metrics=None):
+        self.__processor = processor
+        self.__default_options = default_options or {}
+        self.__max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.__rpc_metrics = rpc_metrics
+        self.__jobs = {}
+        self.__condition = threading.Condition()
+        self.__executor = None
+        self.__scheduler = None
+        self.__stopped = False
+
+    def add_job(self, job_id, entry_group_name, interval=None, run_now=True, **options):
+        """
+        Add a job syncing `entry_group_name` every `interval` seconds, or
+        only on request when `interval` is None. The first run starts right
+        away when `run_now`. The options are checked as those of the
+        sync-entries command are.
+        """
+        if interval is not None and interval <= 0:
+            raise ValueError(f'Invalid interval: {interval}')
+
+        job_options = dict(self.__default_options, **options)
+        try:
+            arguments = inspect.signature(self.__processor.sync_entries).bind(
+                entry_group_name, **job_options)
+        except TypeError as e:
+            raise ValueError(f'Invalid sync options: {e}')
+        arguments.apply_defaults()
+        sync_options.SyncOptions.check(arguments.arguments)
+
+        job = SyncJob(job_id, entry_group_name, job_options, interval)
+        with self.__condition:
+            if job_id in self.__jobs:
+                raise ValueError(f'Job {job_id} already exists')
+            if run_now:
+                job.next_run = time.monotonic()
+            elif interval is not None:
+                job.next_run = time.monotonic() + interval
+            self.__jobs[job_id] = job
+            self.__condition.notify()
+
+        logging.info(f'Sync job {job_id} added, Entry Group {entry_group_name}, interval'
+                     f' {interval}')
+        return job.to_dict()
+
+    def run_job(self, job_id):
+        """
+        Run a job as soon as possible, or once its current run is done.
+        Raises KeyError for an unknown job.
+        """
+        with self.__condition:
+            job = self.__jobs[job_id]
+            if job.is_active:
+                job.run_requested = True
+            else:
+                job.next_run = time.monotonic()
+            self.__condition.notify()
+            return job.to_dict()
+
+    def get_job(self, job_id):
+        """Raises KeyError for an unknown job."""
+        with self.__condition:
+            return self.__jobs[job_id].to_dict()
+
+    def get_jobs(self):
+        with self.__condition:
+            return [job.to_dict() for job in self.__jobs.values()]
+
+    def get_metrics(self):
+        """Returns the API call metrics in the Prometheus text format, or None."""
+        return self.__rpc_metrics.to_prometheus() if self.__rpc_metrics else None
+
+    def start(self):
+        self.__executor = futures.ThreadPoolExecutor(max_workers=self.__max_concurrent_jobs)
+        self.__scheduler = threading.Thread(target=self.__schedule_jobs, daemon=True)
+        self.__scheduler.start()
+
+    def stop(self):
+        """Stop scheduling jobs and wait for the running ones to finish."""
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify()
+        if self.__scheduler:
+            self.__scheduler.join()
+        if self.__executor:
+            self.__executor.shutdown(wait=True)
+
+    def make_http_server(self, host, port):
+        """
+        Make an HTTP server exposing the jobs of the service:
+
+        - GET /jobs and GET /jobs/ID return the status of the jobs;
+        - POST /jobs adds a job from a JSON object with its `entry_group_name`
+          and optionally its `id`, `interval` and sync_entries options, the
+          `object_filter` as an object of ObjectStorageFilter arguments. The
+          options naming local files are only taken from `default_options`;
+        - POST /jobs/ID/run runs a job;
+        - GET /metrics returns the API call metrics.
+        """
+        handler = type('BoundSyncServiceRequestHandler', (SyncServiceRequestHandler, ),
+                       {'service': self})
+        return SyncServiceHTTPServer((host, port), handler)
+
+    def __schedule_jobs(self):
+        with self.__condition:
+            while not self.__stopped:
+                now = time.monotonic()
+                active_entry_groups = {
+                    job.entry_group_name
+                    for job in self.__jobs.values() if job.is_active
+                }
+                active_count = sum(1 for job in self.__jobs.values() if job.is_active)
+                for job in sorted(self.__jobs.values(), key=self.__get_next_run):
+                    if active_count >= self.__max_concurrent_jobs:
+                        break
+                    if job.next_run is None or job.next_run > now or job.is_active \
+                            or job.entry_group_name in active_entry_groups:
+                        continue
+
+                    job.state = SyncJob.QUEUED
+                    job.next_run = None
+                    active_entry_groups.add(job.entry_group_name)
+                    active_count += 1
+                    self.__executor.submit(self.__run_job, job)
+
+                # Due jobs held back by running ones are scheduled once a run
+                # finishes, which notifies the condition.
+                future_runs = [
+                    job.next_run for job in self.__jobs.values()
+                    if job.next_run is not None and job.next_run > now
+                ]
+                timeout = self.__MAX_WAIT_SECONDS
+                if future_runs:
+                    timeout = min(timeout, min(future_runs) - now)
+                self.__condition.wait(timeout)
+
+    def __run_job(self, job):
+        with self.__condition:
+            job.state = SyncJob.RUNNING
+            job.last_start_time = datetime.datetime.now(datetime.timezone.utc)
+        start_time = time.monotonic()
+
+        logging.info(f'===> Sync job {job.job_id} started')
+        error = None
+        try:
+            self.__processor.sync_entries(job.entry_group_name, **job.options)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logging.warning(f'Sync job {job.job_id} failed: {error}')
+            # The Entry Group or the Tag Template may have been deleted in
+            # between, they are looked up again by the next run.
+            self.__processor.clear_metadata_cache()
+
+        elapsed_time = time.monotonic() - start_time
+        logging.info(f'===> Sync job {job.job_id} took [{int(elapsed_time)} seconds]')
+        with self.__condition:
+            job.state = SyncJob.FAILED if error else SyncJob.SUCCEEDED
+            job.runs_count += 1
+            job.failures_count += 1 if error else 0
+            job.last_end_time = datetime.datetime.now(datetime.timezone.utc)
+            job.last_duration_seconds = round(elapsed_time, 3)
+            job.last_error = error
+            if job.run_requested:
+                job.run_requested = False
+                job.next_run = time.monotonic()
+            elif job.interval is not None:
+                # Runs longer than the interval are followed by the next one
+                # right away, rather than piling up.
+                job.next_run = max(start_time + job.interval, time.monotonic())
+            self.__condition.notify()
+
+    @classmethod
+    def __get_next_run(cls, job):
+        return job.next_run if job.next_run is not None else float('inf')
+
+
+class SyncServiceHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class SyncServiceRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Requests handler of SyncService.make_http_server."""
+
+    service = None
+
+    def do_GET(self):
+        path = self.path.rstrip('/')
+        if path == '/metrics':
+            metrics = self.service.get_metrics()
+            if metrics is None:
+                self.__send_json(404, {'error': 'Metrics are not collected'})
+            else:
+                self.__send(200, metrics.encode('utf-8'), 'text/plain; version=0.0.4')
+        elif path == '/jobs':
+            self.__send_json(200, {'jobs': self.service.get_jobs()})
+        elif path.startswith('/jobs/'):
+            self.__handle_job(self.service.get_job, path[len('/jobs/'):])
+        else:
+            self.__send_json(404, {'error': f'Not found: {self.path}'})
+
+    def do_POST(self):
+        path = self.path.rstrip('/')
+        if path == '/jobs':
+            self.__add_job()
+        elif path.startswith('/jobs/') and path.endswith('/run'):
+            self.__handle_job(self.service.run_job, path[len('/jobs/'):-len('/run')], 202)
+        else:
+            self.__send_json(404, {'error': f'Not found: {self.path}'})
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+    def __add_job(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            options = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(options, dict) or 'entry_group_name' not in options:
+                raise ValueError('A JSON object with an entry_group_name is required')
+            entry_group_name = options.pop('entry_group_name')
+            job_id = options.pop('id', None) or entry_group_name.split('/')[-1]
+            interval = options.pop('interval', None)
+            path_options = sorted(set(options).intersection(sync_options.SyncOptions.PATH_OPTIONS))
+            if path_options:
+                raise ValueError(f'Options naming local files cannot be set over HTTP:'
+                                 f' {path_options}')
+            if isinstance(options.get('object_filter'), dict):
+                options['object_filter'] = object_storage_filter.ObjectStorageFilter(
+                    **options['object_filter'])
+            self.__send_json(201,
+                             self.service.add_job(job_id, entry_group_name, interval, **options))
+        except (TypeError, ValueError) as e:
+            self.__send_json(400, {'error': str(e)})
+
+    def __handle_job(self, function, job_id, status=200):
+        try:
+            self.__send_json(status, function(job_id))
+        except KeyError:
+            self.__send_json(404, {'error': f'Unknown job: {job_id}'})
+
+    def __send_json(self, status, content):
+        self.__send(status, json.dumps(content).encode('utf-8'), 'application/json')
+
+    def __send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
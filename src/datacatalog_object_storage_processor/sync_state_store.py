@@ -0,0 +1,207 @@
+import logging
+import sqlite3
+import threading
+
+
+class SyncStateStore:
+    """
+    SyncStateStore keeps, in a local SQLite file, the fingerprint of every
+    Entry and Tags written to Data Catalog, so later runs only send what
+    changed since then.
+
+    It also checkpoints the run in progress: the listing cursor of each
+    bucket and the Entries processed so far, so an interrupted run can be
+    resumed instead of started over.
+
+    Runs with a `scope`, such as the shards of a sharded sync, keep their
+    own state in the file, apart from the runs of other scopes.
+    """
+
+    __COMMIT_EVERY = 1000
+
+    def __init__(self, path, scope=None):
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.Lock()
+        self.__pending_writes = 0
+        self.__path = path
+        self.__scope = scope
+        self.__create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.commit()
+            self.__connection.close()
+
+    def has_entries(self, entry_group_name):
+        with self.__lock:
+            count, = self.__connection.execute(
+                'SELECT COUNT(*) FROM synced_entries WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), )).fetchone()
+
+        logging.info(f'{count} Entries recorded in the sync state: {self.__path}')
+        return count > 0
+
+    def has_completed_run(self, entry_group_name):
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT completed_at FROM sync_runs WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), )).fetchone()
+
+        return bool(row and row[0])
+
+    def start_run(self, entry_group_name, resume=False):
+        """
+        Start a run, or carry on with the unfinished one when `resume` is
+        True. Returns whether a run was resumed.
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT in_progress FROM sync_runs WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), )).fetchone()
+            resumed = bool(resume and row and row[0])
+            if not resumed:
+                self.__clear_checkpoint(entry_group_name)
+            self.__connection.execute(
+                'INSERT OR IGNORE INTO sync_runs (entry_group_name, in_progress) VALUES (?, 1)',
+                (self.__key(entry_group_name), ))
+            self.__connection.execute(
+                'UPDATE sync_runs SET in_progress = 1 WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), ))
+            self.__connection.commit()
+
+        if resumed:
+            logging.info(f'Resuming the unfinished run from the sync state: {self.__path}')
+        return resumed
+
+    def finish_run(self, entry_group_name):
+        with self.__lock:
+            self.__clear_checkpoint(entry_group_name)
+            self.__connection.execute(
+                "UPDATE sync_runs SET in_progress = 0, completed_at = datetime('now')"
+                ' WHERE entry_group_name = ?', (self.__key(entry_group_name), ))
+            self.__connection.commit()
+
+    def get_listing_cursors(self, entry_group_name):
+        """
+        Returns the page token to resume each checkpointed bucket from, None
+        for the buckets that were fully listed.
+        """
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT bucket_name, page_token FROM listing_cursors'
+                ' WHERE entry_group_name = ?', (self.__key(entry_group_name), )).fetchall()
+
+        return dict(rows)
+
+    def save_listing_cursor(self, entry_group_name, bucket_name, page_token):
+        with self.__lock:
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO listing_cursors (entry_group_name, bucket_name,'
+                ' page_token) VALUES (?, ?, ?)',
+                (self.__key(entry_group_name), bucket_name, page_token))
+            # Every Entry before the cursor is recorded by now, commit them
+            # together so a crash never leaves the cursor ahead of them.
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+    def record_run_entry(self, entry_group_name, entry_name):
+        with self.__lock:
+            self.__connection.execute(
+                'INSERT OR IGNORE INTO run_entries (entry_group_name, entry_name) VALUES (?, ?)',
+                (self.__key(entry_group_name), entry_name))
+            self.__commit_periodically()
+
+    def list_run_entries_names(self, entry_group_name):
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT entry_name FROM run_entries WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), )).fetchall()
+
+        return [entry_name for entry_name, in rows]
+
+    def get_fingerprint(self, entry_group_name, entry_name):
+        with self.__lock:
+            row = self.__connection.execute(
+                'SELECT fingerprint FROM synced_entries'
+                ' WHERE entry_group_name = ? AND entry_name = ?',
+                (self.__key(entry_group_name), entry_name)).fetchone()
+
+        return row[0] if row else None
+
+    def list_entries_names(self, entry_group_name):
+        with self.__lock:
+            rows = self.__connection.execute(
+                'SELECT entry_name FROM synced_entries WHERE entry_group_name = ?',
+                (self.__key(entry_group_name), )).fetchall()
+
+        return [entry_name for entry_name, in rows]
+
+    def list_entries_linked_resources(self, entry_group_name):
+        with self.__lock:
+            return self.__connection.execute(
+                'SELECT entry_name, linked_resource FROM synced_entries'
+                ' WHERE entry_group_name = ?', (self.__key(entry_group_name), )).fetchall()
+
+    def record_entry(self, entry_group_name, entry_name, linked_resource, size, time_updated,
+                     fingerprint):
+        with self.__lock:
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO synced_entries (entry_group_name, entry_name,'
+                ' linked_resource, size, time_updated, fingerprint)'
+                ' VALUES (?, ?, ?, ?, ?, ?)', (self.__key(entry_group_name), entry_name,
+                                               linked_resource, size, time_updated, fingerprint))
+            self.__commit_periodically()
+
+    def delete_entries(self, entry_group_name, entries_names):
+        with self.__lock:
+            self.__connection.executemany(
+                'DELETE FROM synced_entries WHERE entry_group_name = ? AND entry_name = ?',
+                [(self.__key(entry_group_name), entry_name) for entry_name in entries_names])
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+    def __clear_checkpoint(self, entry_group_name):
+        self.__connection.execute('DELETE FROM listing_cursors WHERE entry_group_name = ?',
+                                  (self.__key(entry_group_name), ))
+        self.__connection.execute('DELETE FROM run_entries WHERE entry_group_name = ?',
+                                  (self.__key(entry_group_name), ))
+
+    def __key(self, entry_group_name):
+        return f'{entry_group_name}#{self.__scope}' if self.__scope else entry_group_name
+
+    def __commit_periodically(self):
+        self.__pending_writes += 1
+        if self.__pending_writes >= self.__COMMIT_EVERY:
+            self.__connection.commit()
+            self.__pending_writes = 0
+
+    def __create_tables(self):
+        with self.__lock:
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS synced_entries ('
+                                      ' entry_group_name TEXT NOT NULL,'
+                                      ' entry_name TEXT NOT NULL,'
+                                      ' linked_resource TEXT,'
+                                      ' size REAL,'
+                                      ' time_updated INTEGER,'
+                                      ' fingerprint TEXT NOT NULL,'
+                                      ' PRIMARY KEY (entry_group_name, entry_name))')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS sync_runs ('
+                                      ' entry_group_name TEXT PRIMARY KEY,'
+                                      ' in_progress INTEGER NOT NULL DEFAULT 0,'
+                                      ' completed_at TEXT)')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS listing_cursors ('
+                                      ' entry_group_name TEXT NOT NULL,'
+                                      ' bucket_name TEXT NOT NULL,'
+                                      ' page_token TEXT,'
+                                      ' PRIMARY KEY (entry_group_name, bucket_name))')
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS run_entries ('
+                                      ' entry_group_name TEXT NOT NULL,'
+                                      ' entry_name TEXT NOT NULL,'
+                                      ' PRIMARY KEY (entry_group_name, entry_name))')
+            self.__connection.commit()
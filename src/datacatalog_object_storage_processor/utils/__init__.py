@@ -1 +1,8 @@
+from .adaptive_rate_limiter import AdaptiveRateLimiter  # noqa
+from .bounded_prefetch_iterator import BoundedPrefetchIterator  # noqa
+from .metrics_exporter import MetricsExporter  # noqa
+from .rate_limited_client import RateLimitedClient  # noqa
+from .round_robin_client_pool import RoundRobinClientPool  # noqa
+from .rpc_metrics import RpcMetrics  # noqa
+from .transport_options import TransportOptions  # noqa
 from .values_comparable_object import ValuesComparableObject  # noqa
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from google.api_core import exceptions
+
+
+class AdaptiveRateLimiter:
+    """
+    Client-side limiter shared by every thread calling the same API.
+
+    Calls are paced by a token bucket of `rate` calls per second, and the
+    number of concurrent calls follows AIMD: it grows by one for every
+    window of successful calls and is halved whenever the API reports
+    throttling. Throttled calls are retried with full-jitter exponential
+    backoff instead of being dropped.
+    """
+
+    RETRYABLE_ERRORS = (exceptions.TooManyRequests, exceptions.ServiceUnavailable)
+
+    def __init__(self,
+                 name,
+                 rate=None,
+                 burst=None,
+                 max_concurrency=256,
+                 min_concurrency=1,
+                 max_retries=8,
+                 base_delay=0.5,
+                 max_delay=32.0):
+        self.__name = name
+        self.__rate = rate
+        self.__burst = burst or (rate if rate else 1)
+        self.__tokens = self.__burst
+        self.__last_refill = time.monotonic()
+        self.__max_concurrency = max_concurrency
+        self.__min_concurrency = min_concurrency
+        self.__concurrency_limit = float(max_concurrency)
+        self.__in_flight = 0
+        self.__max_retries = max_retries
+        self.__base_delay = base_delay
+        self.__max_delay = max_delay
+        self.__condition = threading.Condition()
+
+    @property
+    def concurrency_limit(self):
+        return int(self.__concurrency_limit)
+
+    def call(self, function, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.__acquire_slot()
+            time.sleep(self.reserve())
+            try:
+                result = function(*args, **kwargs)
+            except self.RETRYABLE_ERRORS as e:
+                self.__release_slot()
+                attempt += 1
+                if attempt > self.__max_retries:
+                    raise
+                time.sleep(self.on_throttled(attempt, e))
+                continue
+            except Exception:
+                self.__release_slot()
+                raise
+
+            self.__release_slot()
+            self.on_success()
+            return result
+
+    async def call_async(self, coroutine_function, *args, **kwargs):
+        """
+        asyncio counterpart of call. Concurrency is left to the caller, which
+        already bounds the calls in flight; only pacing and retries apply.
+        """
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.reserve())
+            try:
+                result = await coroutine_function(*args, **kwargs)
+            except self.RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt > self.__max_retries:
+                    raise
+                await asyncio.sleep(self.on_throttled(attempt, e))
+                continue
+
+            self.on_success()
+            return result
+
+    def reserve(self):
+        """
+        Take a token from the bucket and return how many seconds the caller
+        must wait before using it.
+        """
+        if not self.__rate:
+            return 0
+
+        with self.__condition:
+            now = time.monotonic()
+            self.__tokens = min(self.__burst,
+                                self.__tokens + (now - self.__last_refill) * self.__rate)
+            self.__last_refill = now
+            self.__tokens -= 1
+            return max(0.0, -self.__tokens / self.__rate)
+
+    def on_success(self):
+        with self.__condition:
+            self.__concurrency_limit = min(
+                self.__max_concurrency,
+                self.__concurrency_limit + 1 / max(1.0, self.__concurrency_limit))
+            self.__condition.notify()
+
+    def on_throttled(self, attempt, error):
+        """
+        Record a throttled call and return the backoff delay, in seconds,
+        before retry number `attempt`.
+        """
+        with self.__condition:
+            self.__concurrency_limit = max(self.__min_concurrency, self.__concurrency_limit / 2)
+            concurrency_limit = self.concurrency_limit
+
+        delay = random.uniform(0, min(self.__max_delay, self.__base_delay * 2**attempt))
+        logging.info(f'[{self.__name}] throttled: {error}, concurrency limit'
+                     f' {concurrency_limit}, retry {attempt} in {delay:.2f} seconds')
+        return delay
+
+    def __acquire_slot(self):
+        with self.__condition:
+            while self.__in_flight >= max(self.__min_concurrency, self.concurrency_limit):
+                self.__condition.wait()
+            self.__in_flight += 1
+
+    def __release_slot(self):
+        with self.__condition:
+            self.__in_flight -= 1
+            self.__condition.notify()
@@ -0,0 +1,83 @@
+import queue
+import threading
+
+
+class BoundedPrefetchIterator:
+    """
+    Consumes an iterable on a background thread, keeping at most max_buffered
+    items ready for the caller. The producer blocks once the buffer is full,
+    so memory stays bounded while producing and consuming overlap. Callers
+    that may stop consuming early must close the iterator, so the producer
+    does not block forever.
+    """
+
+    __DONE = object()
+    # Seconds the blocked producer, or consumer, waits before checking
+    # whether the iterator was closed.
+    __POLL_TIMEOUT = 0.5
+
+    def __init__(self, iterable, max_buffered=2):
+        self.__iterable = iterable
+        self.__queue = queue.Queue(maxsize=max(1, max_buffered))
+        self.__error = None
+        self.__finished = False
+        self.__closed = threading.Event()
+        self.__thread = threading.Thread(target=self.__produce, daemon=True)
+        self.__thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.__finished:
+            raise StopIteration
+
+        item = self.__get()
+        if item is self.__DONE:
+            self.__finished = True
+            if self.__error:
+                raise self.__error
+            raise StopIteration
+
+        return item
+
+    def close(self):
+        """
+        Stop consuming the iterable: the producer stops once done with its
+        current item, and the buffered items are dropped.
+        """
+        self.__closed.set()
+        self.__finished = True
+        while True:
+            try:
+                self.__queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def __produce(self):
+        try:
+            for item in self.__iterable:
+                if not self.__put(item):
+                    return
+        except Exception as e:
+            self.__error = e
+        finally:
+            self.__put(self.__DONE)
+
+    def __get(self):
+        while True:
+            try:
+                return self.__queue.get(timeout=self.__POLL_TIMEOUT)
+            except queue.Empty:
+                if self.__closed.is_set():
+                    return self.__DONE
+
+    def __put(self, item):
+        # Returns whether the item was queued before the iterator was closed.
+        while not self.__closed.is_set():
+            try:
+                self.__queue.put(item, timeout=self.__POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                pass
+        return False
@@ -0,0 +1,67 @@
+import logging
+import threading
+import urllib.request
+
+
+class MetricsExporter:
+    """
+    Exports an RpcMetrics to a file, see RpcMetrics.write, and/or pushes it
+    in the Prometheus text format to `push_url`, e.g. a Pushgateway job
+    URL. Once started, it exports every `interval` seconds, when given, on
+    a background thread; stopping it always exports the final values.
+    """
+
+    __PUSH_TIMEOUT = 10
+
+    def __init__(self, metrics, path=None, push_url=None, interval=None):
+        self.__metrics = metrics
+        self.__path = path
+        self.__push_url = push_url
+        self.__interval = interval
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        if self.__interval and (self.__path or self.__push_url):
+            self.__thread = threading.Thread(target=self.__export_periodically, daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        self.export()
+
+    def export(self):
+        # Metrics are a side product of the run, so failing to export them
+        # is logged rather than raised.
+        if self.__path:
+            try:
+                self.__metrics.write(self.__path)
+            except OSError as e:
+                logging.warning(f'Unable to write metrics to {self.__path}: {e}')
+        if self.__push_url:
+            try:
+                self.__push()
+            except OSError as e:
+                logging.warning(f'Unable to push metrics to {self.__push_url}: {e}')
+
+    def __export_periodically(self):
+        while not self.__stopped.wait(self.__interval):
+            self.export()
+
+    def __push(self):
+        request = urllib.request.Request(self.__push_url,
+                                         data=self.__metrics.to_prometheus().encode('utf-8'),
+                                         headers={'Content-Type': 'text/plain; version=0.0.4'},
+                                         method='PUT')
+        with urllib.request.urlopen(request, timeout=self.__PUSH_TIMEOUT):
+            pass
@@ -0,0 +1,72 @@
+import functools
+
+
+class RateLimitedClient:
+    """
+    Proxy that routes every method call of an API client through an
+    AdaptiveRateLimiter: read methods through `read_limiter`, any other
+    method through `write_limiter`. Non callable attributes are returned
+    unchanged. Every call, and every page request of a paged method, is
+    recorded in `metrics`, an RpcMetrics, as a call of `service`.
+
+    Paged methods return lazy iterators, whose page calls are only made
+    while iterating: they are consumed page by page, each page being a
+    limited and timed call of its own, and return a list. A throttled page
+    is retried on its own, resuming at its page token.
+    """
+
+    __READ_METHODS_PREFIXES = ('get_', 'list_', 'search_', 'lookup_')
+    __PAGED_METHODS_PREFIXES = ('list_', 'search_')
+
+    def __init__(self, client, read_limiter, write_limiter, metrics, service):
+        self.__client = client
+        self.__read_limiter = read_limiter
+        self.__write_limiter = write_limiter
+        self.__metrics = metrics
+        self.__service = service
+
+    def __getattr__(self, name):
+        attribute = getattr(self.__client, name)
+        if not callable(attribute):
+            return attribute
+
+        limiter = self.get_limiter(name)
+        if name.startswith(self.__PAGED_METHODS_PREFIXES):
+            return self.__make_paged_method(name, attribute, limiter)
+
+        timed_attribute = self.__metrics.timed(self.__service, name, attribute)
+
+        def rate_limited_method(*args, **kwargs):
+            return limiter.call(timed_attribute, *args, **kwargs)
+
+        return rate_limited_method
+
+    def get_limiter(self, method_name):
+        if method_name.startswith(self.__READ_METHODS_PREFIXES):
+            return self.__read_limiter
+        return self.__write_limiter
+
+    def __make_paged_method(self, name, method, limiter):
+        timed_fetch_page = self.__metrics.timed(self.__service, name, self.__fetch_page)
+
+        @functools.wraps(method)
+        def paged_method(*args, **kwargs):
+            items = []
+            page_token = None
+            while True:
+                page_items, page_token = limiter.call(timed_fetch_page, method, page_token, *args,
+                                                      **kwargs)
+                items.extend(page_items)
+                if not page_token:
+                    return items
+
+        return paged_method
+
+    @classmethod
+    def __fetch_page(cls, method, page_token, *args, **kwargs):
+        # Each page is requested on a fresh iterator, starting at the token of
+        # the previous one, so a throttled page can be retried on its own.
+        results_iterator = method(*args, **kwargs)
+        results_iterator.next_page_token = page_token
+        page = next(results_iterator.pages, None)
+        return list(page) if page is not None else [], results_iterator.next_page_token
@@ -0,0 +1,21 @@
+import itertools
+
+
+class RoundRobinClientPool:
+    """
+    Proxy that spreads the attribute lookups, hence the method calls, of an
+    API client over `clients`, one after the other, e.g. clients holding
+    their own connection, so concurrent calls do not all queue on one.
+    """
+
+    def __init__(self, clients):
+        if not clients:
+            raise ValueError('At least one client is required')
+
+        self.clients = list(clients)
+        # next() of itertools.cycle is atomic, so the pool can be shared by
+        # threads without a lock.
+        self.__clients_cycle = itertools.cycle(self.clients)
+
+    def __getattr__(self, name):
+        return getattr(next(self.__clients_cycle), name)
@@ -0,0 +1,195 @@
+import bisect
+import collections
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+
+class RpcMetrics:
+    """
+    Thread-safe registry of the calls made to the storage and Data Catalog
+    APIs: call counts by status code and latency histograms, by service and
+    method. Each attempt counts as one call, so retried calls show up with
+    the status code of every failed attempt.
+    """
+
+    OK_CODE = 'OK'
+    # Upper bounds, in seconds, of the latency histogram buckets.
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    __PROMETHEUS_PREFIX = 'datacatalog_object_storage_rpc'
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__methods = collections.OrderedDict()
+
+    def timed(self, service, method, function):
+        """Wrap `function` so every call of it is recorded as `method`."""
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            start_time = time.monotonic()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                self.record(service, method, time.monotonic() - start_time, self.get_error_code(e))
+                raise
+            self.record(service, method, time.monotonic() - start_time)
+            return result
+
+        return timed_function
+
+    def timed_async(self, service, method, coroutine_function):
+        """asyncio counterpart of timed."""
+
+        @functools.wraps(coroutine_function)
+        async def timed_coroutine_function(*args, **kwargs):
+            start_time = time.monotonic()
+            try:
+                result = await coroutine_function(*args, **kwargs)
+            except Exception as e:
+                self.record(service, method, time.monotonic() - start_time, self.get_error_code(e))
+                raise
+            self.record(service, method, time.monotonic() - start_time)
+            return result
+
+        return timed_coroutine_function
+
+    def record(self, service, method, seconds, code=OK_CODE):
+        bucket_index = bisect.bisect_left(self.LATENCY_BUCKETS, seconds)
+        with self.__lock:
+            stats = self.__methods.get((service, method))
+            if not stats:
+                stats = self.__methods[(service, method)] = {
+                    'codes': collections.Counter(),
+                    'buckets': [0] * (len(self.LATENCY_BUCKETS) + 1),
+                    'sum_seconds': 0.0,
+                    'max_seconds': 0.0
+                }
+            stats['codes'][code] += 1
+            stats['buckets'][bucket_index] += 1
+            stats['sum_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def summarize(self):
+        """
+        Return a list with one dict per service and method: call and error
+        counts, error counts by status code and latency statistics, the
+        percentiles being upper bounds taken from the histogram.
+        """
+        with self.__lock:
+            methods = [(key, {
+                'codes': dict(stats['codes']),
+                'buckets': list(stats['buckets']),
+                'sum_seconds': stats['sum_seconds'],
+                'max_seconds': stats['max_seconds']
+            }) for key, stats in self.__methods.items()]
+
+        summaries = []
+        for (service, method), stats in methods:
+            count = sum(stats['codes'].values())
+            errors = {code: n for code, n in stats['codes'].items() if code != self.OK_CODE}
+            summaries.append({
+                'service': service,
+                'method': method,
+                'count': count,
+                'errors': sum(errors.values()),
+                'errors_by_code': errors,
+                'sum_seconds': round(stats['sum_seconds'], 6),
+                'mean_seconds': round(stats['sum_seconds'] / count, 6),
+                'max_seconds': round(stats['max_seconds'], 6),
+                'p50_seconds': self.__estimate_percentile(stats, count, 0.5),
+                'p90_seconds': self.__estimate_percentile(stats, count, 0.9),
+                'p99_seconds': self.__estimate_percentile(stats, count, 0.99),
+                'latency_buckets': {
+                    str(upper_bound): n
+                    for upper_bound, n in zip(self.LATENCY_BUCKETS + ('+Inf', ), stats['buckets'])
+                }
+            })
+
+        return summaries
+
+    def log_summary(self):
+        for summary in self.summarize():
+            logging.info(f'[{summary["service"]}.{summary["method"]}] {summary["count"]} calls,'
+                         f' {summary["errors"]} errors {summary["errors_by_code"]},'
+                         f' mean {summary["mean_seconds"]:.3f}s, p99 {summary["p99_seconds"]}s,'
+                         f' total {summary["sum_seconds"]:.1f}s')
+
+    def to_json(self):
+        return json.dumps({'rpcs': self.summarize()}, indent=2)
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format."""
+        prefix = self.__PROMETHEUS_PREFIX
+        lines = [
+            f'# HELP {prefix}_calls_total Calls by service, method and status code.',
+            f'# TYPE {prefix}_calls_total counter'
+        ]
+        summaries = self.summarize()
+        for summary in summaries:
+            labels = self.__format_labels(summary)
+            for code, count in sorted(self.__codes_of(summary).items()):
+                lines.append(f'{prefix}_calls_total{{{labels},code="{code}"}} {count}')
+
+        lines.extend([
+            f'# HELP {prefix}_latency_seconds Call latency by service and method.',
+            f'# TYPE {prefix}_latency_seconds histogram'
+        ])
+        for summary in summaries:
+            labels = self.__format_labels(summary)
+            cumulative_count = 0
+            for upper_bound, count in summary['latency_buckets'].items():
+                cumulative_count += count
+                lines.append(f'{prefix}_latency_seconds_bucket{{{labels},le="{upper_bound}"}}'
+                             f' {cumulative_count}')
+            lines.append(f'{prefix}_latency_seconds_sum{{{labels}}} {summary["sum_seconds"]}')
+            lines.append(f'{prefix}_latency_seconds_count{{{labels}}} {summary["count"]}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write the metrics to `path`, in the Prometheus text format when it
+        ends with .prom, e.g. for the node exporter textfile collector, as
+        JSON otherwise. The file is replaced atomically.
+        """
+        content = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as metrics_file:
+            metrics_file.write(content)
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def get_error_code(cls, error):
+        grpc_status_code = getattr(error, 'grpc_status_code', None)
+        if grpc_status_code is not None:
+            return grpc_status_code.name
+        code = getattr(error, 'code', None)
+        if isinstance(code, int):
+            return str(code)
+        return type(error).__name__
+
+    @classmethod
+    def __estimate_percentile(cls, stats, count, percentile):
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(cls.LATENCY_BUCKETS, stats['buckets']):
+            cumulative_count += bucket_count
+            if cumulative_count >= count * percentile:
+                return upper_bound
+        return round(stats['max_seconds'], 6)
+
+    @classmethod
+    def __codes_of(cls, summary):
+        codes = dict(summary['errors_by_code'])
+        ok_count = summary['count'] - summary['errors']
+        if ok_count:
+            codes[cls.OK_CODE] = ok_count
+        return codes
+
+    @classmethod
+    def __format_labels(cls, summary):
+        return f'service="{summary["service"]}",method="{summary["method"]}"'
@@ -0,0 +1,86 @@
+from .round_robin_client_pool import RoundRobinClientPool
+
+
+class TransportOptions:
+    """
+    Connection settings of the API clients, shared by all the threads using
+    them:
+
+    - `grpc_channels` Data Catalog clients, each with its own gRPC channel,
+      hence HTTP/2 connection, whose concurrent streams the server caps;
+      calls are spread over them round robin;
+    - `keepalive_seconds` between the pings keeping the gRPC connections,
+      idle ones included, open;
+    - `http_pool_size` connections kept by the Cloud Storage HTTP session,
+      which should be at least the number of concurrent listings.
+
+    The client libraries defaults are used for the settings left to None,
+    and the clients are only built as usual when all of them are.
+    """
+
+    # Pings are only acknowledged within this delay by live connections.
+    __KEEPALIVE_TIMEOUT_MS = 20000
+
+    def __init__(self, grpc_channels=None, keepalive_seconds=None, http_pool_size=None):
+        if grpc_channels is not None and grpc_channels < 1:
+            raise ValueError(f'Invalid gRPC channels count: {grpc_channels}')
+        if keepalive_seconds is not None and keepalive_seconds <= 0:
+            raise ValueError(f'Invalid keepalive: {keepalive_seconds}')
+        if http_pool_size is not None and http_pool_size < 1:
+            raise ValueError(f'Invalid HTTP pool size: {http_pool_size}')
+
+        self.grpc_channels = grpc_channels
+        self.keepalive_seconds = keepalive_seconds
+        self.http_pool_size = http_pool_size
+
+    def make_datacatalog_client(self):
+        # The client libraries are only imported once a client is needed.
+        from google.cloud import datacatalog_v1
+
+        if self.grpc_channels is None and self.keepalive_seconds is None:
+            return datacatalog_v1.DataCatalogClient()
+
+        from google.cloud.datacatalog_v1.gapic.transports import data_catalog_grpc_transport
+
+        transport_class = data_catalog_grpc_transport.DataCatalogGrpcTransport
+        clients = []
+        for index in range(self.grpc_channels or 1):
+            channel = transport_class.create_channel(options=self.make_grpc_channel_options(index))
+            clients.append(
+                datacatalog_v1.DataCatalogClient(transport=transport_class(channel=channel)))
+        return clients[0] if len(clients) == 1 else RoundRobinClientPool(clients)
+
+    def make_grpc_channel_options(self, index):
+        options = [
+            # Defaults of the client library.
+            ('grpc.max_send_message_length', -1),
+            ('grpc.max_receive_message_length', -1),
+            # Channels with the same arguments would otherwise share their
+            # connection.
+            ('grpc.use_local_subchannel_pool', 1),
+            ('grpc.channel_pool_index', index)
+        ]
+        if self.keepalive_seconds is not None:
+            options.extend([('grpc.keepalive_time_ms', int(self.keepalive_seconds * 1000)),
+                            ('grpc.keepalive_timeout_ms', self.__KEEPALIVE_TIMEOUT_MS),
+                            ('grpc.keepalive_permit_without_calls', 1),
+                            ('grpc.http2.max_pings_without_data', 0)])
+        return options
+
+    def make_storage_client(self, project_id):
+        from google.cloud import storage
+
+        if self.http_pool_size is None:
+            return storage.Client(project=project_id)
+
+        import google.auth
+        from google.auth.transport import requests as auth_requests
+        from requests import adapters
+
+        credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+        session = auth_requests.AuthorizedSession(credentials)
+        session.mount(
+            'https://',
+            adapters.HTTPAdapter(pool_connections=self.http_pool_size,
+                                 pool_maxsize=self.http_pool_size))
+        return storage.Client(project=project_id, credentials=credentials, _http=session)
@@ -0,0 +1,121 @@
+import datetime
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor import batch_sync_config
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class BatchSyncConfigTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/{}'
+
+    def test_read_should_make_routes(self):
+        config_dict = {
+            'routes': [{
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('logs'),
+                'bucket_prefix': 'logs-',
+                'object_filter': {
+                    'exclude': ['*/_SUCCESS']
+                }
+            }, {
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('sales'),
+                'bucket_prefix': ['sales-', 'orders-'],
+                'group_depth': 2
+            }]
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'routes.json')
+            with open(path, 'w') as config_file:
+                json.dump(config_dict, config_file)
+            config = batch_sync_config.BatchSyncConfig.read(path)
+
+        logs_route, sales_route = config.routes
+        self.assertEqual(['logs-'], logs_route.bucket_prefixes)
+        self.assertEqual(['*/_SUCCESS'], logs_route.object_filter.exclude)
+        self.assertIsNone(logs_route.grouping)
+        self.assertEqual(['orders-', 'sales-'], sales_route.bucket_prefixes)
+        self.assertEqual(2, sales_route.grouping.depth)
+
+    def test_from_dict_should_validate_routes(self):
+        entry_group_name = self.__ENTRY_GROUP_NAME.format('logs')
+        self.assertRaises(ValueError, batch_sync_config.BatchSyncConfig.from_dict, {})
+        self.assertRaises(ValueError, batch_sync_config.BatchSyncConfig.from_dict, {'routes': []})
+        self.assertRaises(ValueError, batch_sync_config.BatchSyncConfig.from_dict,
+                          {'routes': [{
+                              'bucket_prefix': 'logs-'
+                          }]})
+        self.assertRaises(ValueError, batch_sync_config.BatchSyncConfig.from_dict,
+                          {'routes': [{
+                              'entry_group_name': entry_group_name,
+                              'prefix': 'logs-'
+                          }]})
+        self.assertRaises(ValueError, batch_sync_config.BatchSyncConfig.from_dict, {
+            'routes': [{
+                'entry_group_name': entry_group_name,
+                'object_filter': {
+                    'unknown': True
+                }
+            }]
+        })
+        self.assertRaises(
+            ValueError, batch_sync_config.BatchSyncConfig.from_dict, {
+                'routes': [{
+                    'entry_group_name': entry_group_name
+                }, {
+                    'entry_group_name': entry_group_name,
+                    'bucket_prefix': 'logs-'
+                }]
+            })
+
+    def test_listing_scope_should_cover_every_route(self):
+        config = batch_sync_config.BatchSyncConfig.from_dict({
+            'routes': [{
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('logs'),
+                'bucket_prefix': 'data-logs',
+                'object_filter': {
+                    'object_prefixes': ['2020/']
+                }
+            }, {
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('sales'),
+                'bucket_prefix': 'data-sales',
+                'object_filter': {
+                    'include': ['2020/*.csv', 'archive/*']
+                }
+            }]
+        })
+
+        self.assertEqual('data-', config.get_bucket_prefix())
+        self.assertEqual(['data-logs', 'data-sales'], config.get_bucket_prefixes())
+        self.assertEqual(['2020/', 'archive/'], config.get_listing_filter().get_listing_prefixes())
+
+        config.routes.append(
+            batch_sync_config.SyncRoute(self.__ENTRY_GROUP_NAME.format('all'), ['other']))
+        self.assertIsNone(config.get_bucket_prefix())
+        self.assertIsNone(config.get_listing_filter())
+
+    def test_select_records_should_apply_bucket_prefixes_and_filter(self):
+        time_updated = datetime.datetime.now(datetime.timezone.utc)
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append('logs-1', 'a.csv', 1, None, time_updated)
+        records.append('logs-1', 'b.json', 1, None, time_updated)
+        records.append('sales-1', 'c.csv', 1, None, time_updated)
+
+        config = batch_sync_config.BatchSyncConfig.from_dict({
+            'routes': [{
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('logs'),
+                'bucket_prefix': 'logs-',
+                'object_filter': {
+                    'extensions': ['csv']
+                }
+            }, {
+                'entry_group_name': self.__ENTRY_GROUP_NAME.format('all')
+            }]
+        })
+
+        logs_route, all_route = config.routes
+        self.assertEqual([('logs-1', 'a.csv')], [(record.bucket_name, record.file_name)
+                                                 for record in logs_route.select_records(records)])
+        self.assertIs(records, all_route.select_records(records))
+        self.assertFalse(logs_route.selects_bucket('sales-1'))
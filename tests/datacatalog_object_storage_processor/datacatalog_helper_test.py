@@ -0,0 +1,346 @@
+import asyncio
+import datetime
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from google.api_core import exceptions
+from google.cloud import datacatalog_v1
+
+from datacatalog_object_storage_processor import datacatalog_helper
+from datacatalog_object_storage_processor import sync_plan
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class DataCatalogHelperTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my-group'
+    __ENTRY_NAME = f'{__ENTRY_GROUP_NAME}/entries/a_csv'
+    __TAG_TEMPLATE_NAME = 'projects/my-project/locations/us-central1/tagTemplates/' \
+                          'object_storage_entries_sync_details'
+    __RECORD = {
+        'bucket_name': 'my-bucket',
+        'file_name': 'a.csv',
+        'size': 10,
+        'time_created': 1588291200.0,
+        'time_updated': 1588291200.0
+    }
+
+    def setUp(self):
+        transport_options = mock.MagicMock()
+        self.__client = transport_options.make_datacatalog_client.return_value
+        self.__client.list_tags.side_effect = self.__make_results([])
+        self.__helper = datacatalog_helper.DataCatalogHelper('my-project',
+                                                             transport_options=transport_options)
+
+    def test_synchronize_entry_failed_tags_should_delete_the_created_entry(self):
+        self.__client.create_tag.side_effect = exceptions.InternalServerError('failed')
+        entry = self.__make_entry(1)
+        self.__client.create_entry.return_value = entry
+
+        entry_name = self.__helper.synchronize_entry(self.__ENTRY_GROUP_NAME,
+                                                     'a_csv',
+                                                     entry, [self.__make_tag()], {},
+                                                     skip_unchanged_tags=True)
+
+        self.assertIsNone(entry_name)
+        self.__client.create_entry.assert_called_once()
+        self.__client.delete_entry.assert_called_once_with(name=self.__ENTRY_NAME)
+
+    def test_synchronize_entry_failed_tags_should_restore_the_updated_entry(self):
+        self.__client.create_tag.side_effect = exceptions.InternalServerError('failed')
+        current_entry = self.__make_entry(1)
+        current_entry.name = self.__ENTRY_NAME
+
+        entry_name = self.__helper.synchronize_entry(self.__ENTRY_GROUP_NAME,
+                                                     'a_csv',
+                                                     self.__make_entry(2), [self.__make_tag()],
+                                                     {'a_csv': current_entry},
+                                                     skip_unchanged_tags=True)
+
+        self.assertIsNone(entry_name)
+        self.assertEqual(2, self.__client.update_entry.call_count)
+        self.assertIs(current_entry, self.__client.update_entry.call_args[1]['entry'])
+        self.__client.delete_entry.assert_not_called()
+
+    def test_apply_sync_plan_failed_tags_should_delete_the_created_entry(self):
+        self.__client.create_tag.side_effect = exceptions.InternalServerError('failed')
+
+        applied_counts, failed_counts = self.__apply_sync_plan({
+            'operation': sync_plan.SyncPlan.CREATE_ENTRY,
+            'entry_id': 'a',
+            'record': self.__RECORD
+        })
+
+        self.assertEqual(({}, {
+            sync_plan.SyncPlan.CREATE_ENTRY: 1
+        }), (applied_counts, failed_counts))
+        self.__client.delete_entry.assert_called_once_with(name=f'{self.__ENTRY_GROUP_NAME}'
+                                                           f'/entries/a')
+
+    def test_apply_sync_plan_failed_tags_should_restore_the_updated_entry(self):
+        self.__client.update_tag.side_effect = exceptions.InternalServerError('failed')
+        current_entry = self.__make_entry(1)
+        self.__client.get_entry.return_value = current_entry
+
+        applied_counts, failed_counts = self.__apply_sync_plan({
+            'operation':
+            sync_plan.SyncPlan.UPDATE_ENTRY,
+            'entry_id':
+            'a',
+            'record':
+            self.__RECORD,
+            'tags_operations': [{
+                'operation': 'update',
+                'template': self.__TAG_TEMPLATE_NAME,
+                'name': f'{self.__ENTRY_GROUP_NAME}/entries/a/tags/my-tag'
+            }]
+        })
+
+        self.assertEqual(({}, {
+            sync_plan.SyncPlan.UPDATE_ENTRY: 1
+        }), (applied_counts, failed_counts))
+        self.assertEqual(2, self.__client.update_entry.call_count)
+        self.assertIs(current_entry, self.__client.update_entry.call_args[1]['entry'])
+        self.__client.delete_entry.assert_not_called()
+
+    def test_sync_entries_from_records_failed_entry_should_not_stop_the_workers(self):
+        current_entry = self.__make_entry(1)
+        current_entry.name = f'{self.__ENTRY_GROUP_NAME}/entries/c'
+        current_entry.user_specified_system = 'cloud_storage'
+        obsolete_entry = self.__make_entry(1)
+        obsolete_entry.name = f'{self.__ENTRY_GROUP_NAME}/entries/obsolete'
+        obsolete_entry.user_specified_system = 'cloud_storage'
+        self.__client.list_entries.side_effect = self.__make_results(
+            [current_entry, obsolete_entry])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        self.__client.update_entry.side_effect = RuntimeError('unexpected')
+        records = [
+            object_storage_records.ObjectStorageRecord('my-bucket', 'cloud_storage', file_name, 10,
+                                                       1588291200.0, 1588291200.0)
+            for file_name in ('a.csv', 'b.csv', 'c.csv', 'd.csv')
+        ]
+
+        entries_names = self.__helper.sync_entries_from_records(records,
+                                                                self.__ENTRY_GROUP_NAME,
+                                                                'cloud_storage',
+                                                                workers=4)
+
+        self.assertEqual(3, self.__client.create_entry.call_count)
+        # The Entry that failed is kept, only the obsolete one is deleted.
+        self.assertEqual({f'{self.__ENTRY_GROUP_NAME}/entries/{entry_id}'
+                          for entry_id in 'abcd'}, set(entries_names))
+        self.__client.delete_entry.assert_called_once_with(name=obsolete_entry.name)
+
+    def test_sync_entries_from_records_should_diff_against_the_listed_entries(self):
+        self.__client.list_entries.side_effect = self.__make_results([])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        self.__sync_files(['a.csv'])
+        current_entry = self.__client.create_entry.call_args[1]['entry']
+        self.__client.list_entries.side_effect = self.__make_results([current_entry])
+        self.__client.create_entry.reset_mock()
+
+        self.__sync_files(['a.csv', 'b.csv'])
+
+        self.__client.get_entry.assert_not_called()
+        self.__client.update_entry.assert_not_called()
+        self.assertEqual(
+            ['b'], [call[1]['entry_id'] for call in self.__client.create_entry.call_args_list])
+
+    def test_sync_entries_from_records_should_not_write_tags_only_run_time_changed(self):
+        self.__client.list_entries.side_effect = self.__make_results([])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        self.__sync_files(['a.csv'])
+        current_entry = self.__client.create_entry.call_args[1]['entry']
+        current_tag = self.__client.create_tag.call_args[1]['tag']
+        current_tag.name = f'{current_entry.name}/tags/my-tag'
+        current_tag.fields['execution_time'].timestamp_value.seconds = 0
+        self.__client.list_entries.side_effect = self.__make_results([current_entry])
+        self.__client.list_tags.reset_mock()
+        self.__client.list_tags.side_effect = self.__make_results([current_tag])
+        self.__client.create_tag.reset_mock()
+
+        self.__sync_files(['a.csv'], verify_tags=True)
+
+        self.__client.list_tags.assert_called_once()
+        self.__client.create_tag.assert_not_called()
+        self.__client.update_tag.assert_not_called()
+
+    def test_sync_entries_from_records_async_should_call_the_transport_futures(self):
+        obsolete_entry = self.__make_entry(1)
+        obsolete_entry.name = f'{self.__ENTRY_GROUP_NAME}/entries/obsolete'
+        obsolete_entry.user_specified_system = 'cloud_storage'
+        self.__client.list_entries.side_effect = self.__make_results([obsolete_entry])
+        transport = self.__client.transport = mock.NonCallableMagicMock()
+        transport.create_entry.future.side_effect = \
+            lambda request, timeout: self.__GrpcFuture(request.entry)
+        transport.list_tags.future.side_effect = \
+            lambda request, timeout: self.__GrpcFuture(mock.MagicMock(tags=[]))
+        transport.create_tag.future.side_effect = \
+            lambda request, timeout: self.__GrpcFuture(request.tag)
+        transport.delete_entry.future.side_effect = \
+            lambda request, timeout: self.__GrpcFuture(None)
+        records = [
+            object_storage_records.ObjectStorageRecord('my-bucket', 'cloud_storage', file_name, 10,
+                                                       1588291200.0, 1588291200.0)
+            for file_name in ('a.csv', 'b.csv')
+        ]
+
+        loop = asyncio.new_event_loop()
+        try:
+            entries_names = loop.run_until_complete(
+                self.__helper.sync_entries_from_records_async([records], self.__ENTRY_GROUP_NAME,
+                                                              'cloud_storage'))
+        finally:
+            loop.close()
+
+        self.assertEqual({f'{self.__ENTRY_GROUP_NAME}/entries/{entry_id}'
+                          for entry_id in 'ab'}, set(entries_names))
+        self.assertEqual(2, transport.create_tag.future.call_count)
+        self.assertEqual(obsolete_entry.name, transport.delete_entry.future.call_args[0][0].name)
+        # Entries and Tags are not written through the blocking client methods.
+        self.__client.create_entry.assert_not_called()
+        self.__client.create_tag.assert_not_called()
+
+    def test_sync_entries_from_records_should_shorten_long_group_entry_ids(self):
+        self.__client.list_entries.side_effect = self.__make_results([])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        time_updated = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+        groups = [
+            object_storage_records.ObjectStorageGroupRecord('my-bucket', 'cloud_storage',
+                                                            'v1.2/logs/', 1, 10, ['csv'],
+                                                            time_updated, time_updated,
+                                                            time_updated),
+            object_storage_records.ObjectStorageGroupRecord('my-bucket', 'cloud_storage',
+                                                            f'{"a" * 60}/1/', 1, 10, ['csv']),
+            object_storage_records.ObjectStorageGroupRecord('my-bucket', 'cloud_storage',
+                                                            f'{"a" * 60}/2/', 1, 10, ['csv'])
+        ]
+
+        self.__helper.sync_entries_from_records(groups,
+                                                self.__ENTRY_GROUP_NAME,
+                                                'cloud_storage',
+                                                delete_obsolete=False,
+                                                grouped=True)
+
+        short_id, long_id_1, long_id_2 = [
+            call[1]['entry_id'] for call in self.__client.create_entry.call_args_list
+        ]
+        self.assertEqual('my_bucket_v1_2_logs', short_id)
+        self.assertEqual(64, len(long_id_1))
+        self.assertEqual(long_id_1[:55], long_id_2[:55])
+        self.assertNotEqual(long_id_1, long_id_2)
+
+    def test_sync_entries_from_records_should_keep_valid_entry_ids(self):
+        self.__client.list_entries.side_effect = self.__make_results([])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        records = [
+            object_storage_records.ObjectStorageRecord('my-bucket', 'cloud_storage', file_name, 10,
+                                                       1588291200.0, 1588291200.0)
+            for file_name in ('my-file.csv', 'logs/a.csv', 'logs_a.csv', f'{"a" * 70}.csv')
+        ]
+
+        self.__helper.sync_entries_from_records(records,
+                                                self.__ENTRY_GROUP_NAME,
+                                                'cloud_storage',
+                                                delete_obsolete=False)
+
+        file_id, nested_id, flat_id, long_id = [
+            call[1]['entry_id'] for call in self.__client.create_entry.call_args_list
+        ]
+        self.assertEqual('my_file', file_id)
+        self.assertRegex(nested_id, r'^logs_a_[\da-f]{8}$')
+        self.assertEqual('logs_a', flat_id)
+        self.assertEqual(64, len(long_id))
+        self.assertEqual('a' * 55, long_id[:55])
+
+    def test_sync_entries_from_records_should_update_the_tag_of_a_shrunk_group(self):
+        self.__client.list_entries.side_effect = self.__make_results([])
+        self.__client.create_entry.side_effect = lambda parent, entry_id, entry: entry
+        self.__sync_group(files_count=2, size=20)
+        current_entry = self.__client.create_entry.call_args[1]['entry']
+        current_tag = self.__client.create_tag.call_args[1]['tag']
+        current_tag.name = f'{current_entry.name}/tags/my-tag'
+        self.__client.list_entries.side_effect = self.__make_results([current_entry])
+        self.__client.list_tags.side_effect = self.__make_results([current_tag])
+
+        # One of the files was deleted, which leaves the group times as is.
+        self.__sync_group(files_count=1, size=10)
+
+        self.__client.update_entry.assert_called_once()
+        updated_tag = self.__client.update_tag.call_args[1]['tag']
+        self.assertEqual(current_tag.name, updated_tag.name)
+        self.assertEqual(1, updated_tag.fields['files_count'].double_value)
+
+    def test_delete_entries_missing_entry_group_should_delete_nothing(self):
+        self.__client.list_entries.side_effect = exceptions.PermissionDenied('not found')
+
+        self.__helper.delete_entries(self.__ENTRY_GROUP_NAME, 'cloud_storage')
+
+        self.__client.delete_entry.assert_not_called()
+        self.__client.delete_entry_group.assert_not_called()
+
+    def __sync_files(self, files_names, verify_tags=False):
+        records = [
+            object_storage_records.ObjectStorageRecord('my-bucket', 'cloud_storage', file_name, 10,
+                                                       1588291200.0, 1588291200.0)
+            for file_name in files_names
+        ]
+        self.__helper.sync_entries_from_records(records,
+                                                self.__ENTRY_GROUP_NAME,
+                                                'cloud_storage',
+                                                delete_obsolete=False,
+                                                verify_tags=verify_tags)
+
+    def __sync_group(self, files_count, size):
+        time_updated = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+        group = object_storage_records.ObjectStorageGroupRecord('my-bucket', 'cloud_storage',
+                                                                'logs/', files_count, size,
+                                                                ['csv'], time_updated,
+                                                                time_updated, time_updated)
+        self.__helper.sync_entries_from_records([group],
+                                                self.__ENTRY_GROUP_NAME,
+                                                'cloud_storage',
+                                                delete_obsolete=False,
+                                                grouped=True)
+
+    def __apply_sync_plan(self, operation):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plan.jsonl')
+            sync_plan.SyncPlan.write(path, self.__ENTRY_GROUP_NAME, 'cloud_storage',
+                                     self.__TAG_TEMPLATE_NAME, '2020-05-01T00:00:00+00:00',
+                                     [operation])
+            return self.__helper.apply_sync_plan(sync_plan.SyncPlan.read(path))
+
+    @classmethod
+    def __make_results(cls, items):
+        # Paged methods return a page iterator for every page requested.
+        return lambda **kwargs: mock.MagicMock(pages=iter([items]), next_page_token=None)
+
+    @classmethod
+    def __make_entry(cls, update_time):
+        entry = datacatalog_v1.types.Entry()
+        entry.linked_resource = 'https://www.googleapis.com/storage/v1/b/my-bucket/o/a.csv'
+        entry.source_system_timestamps.update_time.seconds = update_time
+        return entry
+
+    @classmethod
+    def __make_tag(cls):
+        tag = datacatalog_v1.types.Tag()
+        tag.template = 'projects/my-project/locations/us-central1/tagTemplates/my-template'
+        tag.fields['file_size'].double_value = 10
+        return tag
+
+    class __GrpcFuture:
+        # Completed future, as returned by the gRPC stubs of the transport.
+
+        def __init__(self, result):
+            self.__result = result
+
+        def result(self):
+            return self.__result
+
+        def exception(self):
+            return None
+
+        def add_done_callback(self, callback):
+            callback(self)
@@ -2,6 +2,7 @@ from unittest import TestCase
 from unittest import mock
 
 from datacatalog_object_storage_processor import datacatalog_object_storage_processor_cli
+from datacatalog_object_storage_processor.object_storage import object_change_events
 
 
 class TagManagerCLITest(TestCase):
@@ -21,7 +22,7 @@ class TagManagerCLITest(TestCase):
     def test_run_no_args_should_not_raise_system_exit(self):
         datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run({})
 
-    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda self, *args: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
     @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
     def test_run_sync_entries_with_args_should_not_raise_exception(self, sync_entries):
         datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
@@ -30,7 +31,7 @@ class TagManagerCLITest(TestCase):
         ])
         sync_entries.assert_called_once()
 
-    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda self, *args: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
     @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.delete_entries')
     def test_run_delete_entries_with_args_should_not_raise_exception(self, delete_entries):
         datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
@@ -38,3 +39,263 @@ class TagManagerCLITest(TestCase):
             'my-project', '--entry-group-name', 'my-entry-group'
         ])
         delete_entries.assert_called_once()
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_stream_should_enable_streaming(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--stream'
+        ])
+        self.assertTrue(sync_entries.call_args[1]['stream'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_workers_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--workers', '8'
+        ])
+        self.assertEqual(8, sync_entries.call_args[1]['workers'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_bucket_scan_args_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--bucket-workers', '16',
+            '--bucket-timeout', '300'
+        ])
+        kwargs = sync_entries.call_args[1]
+        self.assertEqual(16, kwargs['bucket_workers'])
+        self.assertEqual(300, kwargs['bucket_timeout'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.delete_entries')
+    def test_run_delete_entries_workers_should_be_forwarded(self, delete_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'delete-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--workers', '32'
+        ])
+        self.assertEqual(32, delete_entries.call_args[1]['workers'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_asyncio_engine_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--engine', 'asyncio',
+            '--max-in-flight', '2000'
+        ])
+        kwargs = sync_entries.call_args[1]
+        self.assertEqual('asyncio', kwargs['engine'])
+        self.assertEqual(2000, kwargs['max_in_flight'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_asyncio_engine_with_threads_args_should_raise_system_exit(
+            self, sync_entries):
+        for args in [['--state-path', 'state.db'], ['--stream'], ['--workers', '8'],
+                     ['--bucket-timeout', '60'], ['--prefix-workers', '4']]:
+            self.assertRaises(
+                SystemExit,
+                datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run,
+                [
+                    'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                    'my-project', '--entry-group-name', 'my-entry-group', '--engine', 'asyncio'
+                ] + args)
+        sync_entries.assert_not_called()
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_stream_with_listing_args_should_raise_system_exit(
+            self, sync_entries):
+        for args in [['--bucket-workers', '4'], ['--bucket-timeout', '60'],
+                     ['--prefix-workers', '4']]:
+            self.assertRaises(
+                SystemExit,
+                datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run,
+                [
+                    'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                    'my-project', '--entry-group-name', 'my-entry-group', '--stream'
+                ] + args)
+        sync_entries.assert_not_called()
+
+    def test_parse_args_sync_entries_invalid_engine_should_raise_system_exit(self):
+        self.assertRaises(
+            SystemExit, datacatalog_object_storage_processor_cli.
+            DatacatalogObjectStorageProcessorCLI._parse_args, [
+                'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--entry-group-name', 'my-entry-group', '--engine', 'invalid'
+            ])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_resume_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--state-path', 'state.db',
+            '--resume'
+        ])
+        self.assertTrue(sync_entries.call_args[1]['resume'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_resume_without_state_path_should_raise_system_exit(
+            self, sync_entries):
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--entry-group-name', 'my-entry-group', '--resume'
+            ])
+        sync_entries.assert_not_called()
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_shard_args_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--shard-index', '2',
+            '--shard-count', '4', '--shard-by', 'object', '--manifest-out', 'shard-2.jsonl'
+        ])
+        kwargs = sync_entries.call_args[1]
+        self.assertEqual((2, 4, 'object'),
+                         (kwargs['shard_index'], kwargs['shard_count'], kwargs['shard_by']))
+        self.assertEqual('shard-2.jsonl', kwargs['manifest_path'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.delete_entries')
+    @mock.patch('datacatalog_object_storage_processor.utils.RpcMetrics.write')
+    def test_run_delete_entries_metrics_out_should_write_metrics(self, write, delete_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'delete-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--metrics-out', 'rpcs.prom'
+        ])
+        delete_entries.assert_called_once()
+        write.assert_called_once_with('rpcs.prom')
+
+    def test_run_sync_entries_shard_index_out_of_range_should_raise_system_exit(self):
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--entry-group-name', 'my-entry-group', '--shard-index', '4',
+                '--shard-count', '4'
+            ])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.merge_shard_manifests')
+    def test_run_merge_shard_manifests_should_forward_every_manifest(self, merge_shard_manifests):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'merge-shard-manifests', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--manifest', 'shard-0.jsonl',
+            '--manifest', 'shard-1.jsonl'
+        ])
+        merge_shard_manifests.assert_called_once_with('my-entry-group',
+                                                      ['shard-0.jsonl', 'shard-1.jsonl'],
+                                                      workers=1)
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_plan_out_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--plan-out', 'plan.jsonl'
+        ])
+        self.assertEqual('plan.jsonl', sync_entries.call_args[1]['plan_path'])
+
+    def test_run_sync_entries_plan_out_with_state_path_should_raise_system_exit(self):
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--entry-group-name', 'my-entry-group', '--plan-out', 'plan.jsonl',
+                '--state-path', 'state.db'
+            ])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_group_depth_should_be_forwarded(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--group-depth', '2'
+        ])
+        self.assertEqual(2, sync_entries.call_args[1]['group_depth'])
+        self.assertIsNone(sync_entries.call_args[1]['group_pattern'])
+
+    def test_run_sync_entries_group_with_object_shards_should_raise_system_exit(self):
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--entry-group-name', 'my-entry-group', '--group-depth', '1',
+                '--shard-count', '2', '--shard-by', 'object'
+            ])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.apply_sync_plan')
+    def test_run_apply_should_forward_the_plan(self, apply_sync_plan):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'apply', '--type', 'cloud_storage', '--project-id', 'my-project',
+            '--entry-group-name', 'my-entry-group', '--plan', 'plan.jsonl', '--workers', '16'
+        ])
+        apply_sync_plan.assert_called_once_with('my-entry-group', 'plan.jsonl', workers=16)
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.watch_object_changes')
+    def test_run_watch_events_file_should_forward_a_json_lines_source(self, watch_object_changes):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'apply-events', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--events-file', 'events.jsonl',
+            '--window', '2'
+        ])
+        source = watch_object_changes.call_args[0][1]
+        self.assertIsInstance(source, object_change_events.JsonLinesEventSource)
+        self.assertEqual(2, watch_object_changes.call_args[1]['window'])
+
+    def test_run_serve_invalid_interval_should_raise_system_exit(self):
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'serve', '--type', 'cloud_storage', '--project-id', 'my-project',
+                '--entry-group-name', 'my-entry-group', '--interval', '0'
+            ])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_entries')
+    def test_run_sync_entries_filter_args_should_forward_an_object_filter(self, sync_entries):
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-entries', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--entry-group-name', 'my-entry-group', '--object-prefix', 'logs/',
+            '--exclude', '*.tmp', '--extension', 'csv,json', '--max-age', '30d'
+        ])
+        object_filter = sync_entries.call_args[1]['object_filter']
+        self.assertEqual(['logs/'], object_filter.get_listing_prefixes())
+        self.assertEqual(['csv', 'json'], object_filter.extensions)
+        self.assertEqual(86400 * 30, object_filter.max_age)
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_batch')
+    @mock.patch('datacatalog_object_storage_processor.batch_sync_config.BatchSyncConfig.read')
+    def test_run_sync_batch_should_forward_the_config(self, read, sync_batch):
+        sync_batch.return_value = []
+        datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run([
+            'object-storage', 'sync-batch', '--type', 'cloud_storage', '--project-id',
+            'my-project', '--config', 'routes.yaml', '--workers', '16'
+        ])
+        read.assert_called_once_with('routes.yaml')
+        self.assertIs(read.return_value, sync_batch.call_args[0][0])
+        self.assertEqual(16, sync_batch.call_args[1]['workers'])
+
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.__init__', lambda *args, **kwargs: None)
+    @mock.patch(f'{__PATCHED_OBJECT_STORAGE_PROCESSOR}.sync_batch')
+    @mock.patch('datacatalog_object_storage_processor.batch_sync_config.BatchSyncConfig.read')
+    def test_run_sync_batch_failed_routes_should_raise_system_exit(self, read, sync_batch):
+        sync_batch.return_value = ['my-entry-group']
+        self.assertRaises(
+            SystemExit,
+            datacatalog_object_storage_processor_cli.DatacatalogObjectStorageProcessorCLI.run, [
+                'object-storage', 'sync-batch', '--type', 'cloud_storage', '--project-id',
+                'my-project', '--config', 'routes.json'
+            ])
@@ -0,0 +1,63 @@
+import datetime
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor import listing_snapshot
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ListingSnapshotTest(TestCase):
+
+    def test_write_through_should_yield_pages_and_round_trip_records(self):
+        pages = [
+            self.__make_records('bucket-1', ['a.csv', 'dir/b.csv']),
+            object_storage_records.ListingCursor('bucket-1', None),
+            self.__make_records('bucket-2', ['c.csv'])
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot.bin')
+            yielded_pages = list(
+                listing_snapshot.ListingSnapshot.write_through(path, 'cloud_storage', pages))
+            snapshot = listing_snapshot.ListingSnapshot.read(path)
+            records = [record for page in snapshot.iterate_records_pages() for record in page]
+
+        self.assertEqual(pages, yielded_pages)
+        self.assertEqual((3, True), (snapshot.records_count, snapshot.complete))
+        self.assertEqual([('bucket-1', 'a.csv'), ('bucket-1', 'dir/b.csv'), ('bucket-2', 'c.csv')],
+                         [(record.bucket_name, record.file_name) for record in records])
+        self.assertEqual(10, records[0].size)
+        self.assertIsNone(records[0].time_created)
+        self.assertEqual(datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc),
+                         records[0].time_updated)
+
+    def test_read_truncated_snapshot_should_raise_value_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot.bin')
+            pages = listing_snapshot.ListingSnapshot.write_through(
+                path, 'cloud_storage', [self.__make_records('bucket-1', ['a.csv'])])
+            next(pages)
+            pages.close()
+
+            self.assertRaises(ValueError, listing_snapshot.ListingSnapshot.read, path)
+
+    def test_iterate_records_pages_should_filter_and_check_the_scope(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'snapshot.bin')
+            records = self.__make_records('bucket-1', ['a.csv'])
+            records.extend(self.__make_records('other-bucket', ['b.csv']))
+            listing_snapshot.ListingSnapshot.write(path, 'cloud_storage', records, 'bucket')
+            snapshot = listing_snapshot.ListingSnapshot.read(path)
+
+            pages = list(snapshot.iterate_records_pages('bucket-'))
+            self.assertEqual(['a.csv'], [record.file_name for record in pages[0]])
+            self.assertRaises(ValueError, snapshot.iterate_records_pages)
+
+    @classmethod
+    def __make_records(cls, bucket_name, file_names):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        for file_name in file_names:
+            records.append(bucket_name, file_name, 10, None,
+                           datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc))
+        return records
@@ -0,0 +1,114 @@
+import datetime
+from unittest import TestCase
+from unittest import mock
+
+from google.api_core import exceptions
+
+from datacatalog_object_storage_processor.object_storage.cloud_storage import \
+    storage_client_helper
+
+
+class StorageClientHelperTest(TestCase):
+
+    @mock.patch('google.cloud.storage.Client')
+    def test_list_blobs_pages_from_should_request_and_build_projected_blobs(self, client):
+        results_iterator = mock.MagicMock()
+        results_iterator.prefixes = set()
+        results_iterator.next_page_token = None
+
+        def make_pages():
+            yield [
+                results_iterator.item_to_value(
+                    results_iterator, {
+                        'name': 'dir/a.csv',
+                        'size': '10',
+                        'timeCreated': '2020-04-01T00:00:00.000Z',
+                        'updated': '2020-05-01T00:00:00.000Z'
+                    })
+            ]
+
+        results_iterator.pages = make_pages()
+        client.return_value.list_blobs.return_value = results_iterator
+
+        helper = storage_client_helper.StorageClientHelper('my-project')
+        pages = list(helper.list_blobs_pages_from('my-bucket'))
+
+        list_blobs_kwargs = client.return_value.list_blobs.call_args[1]
+        self.assertEqual(1000, list_blobs_kwargs['page_size'])
+        self.assertEqual('items(name,size,timeCreated,updated),prefixes,nextPageToken',
+                         list_blobs_kwargs['fields'])
+        blob = pages[0][0][0]
+        self.assertEqual(('dir/a.csv', 10), (blob.name, blob.size))
+        self.assertEqual(datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc), blob.updated)
+        self.assertIsNone(pages[0][1])
+
+    @mock.patch('google.cloud.storage.Client')
+    def test_list_blobs_split_flat_bucket_should_list_names_ranges(self, client):
+        names = ['a0', 'a1', 'b0', 'j0', 'q9', 'r0', 'z0', '~0']
+        client.return_value.list_blobs.side_effect = \
+            lambda bucket, **kwargs: self.__make_results_iterator(names, **kwargs)
+
+        helper = storage_client_helper.StorageClientHelper('my-project')
+        blobs = helper.list_blobs_split('my-bucket', 3)
+
+        self.assertEqual(names, sorted(blob.name for blob in blobs))
+        self.assertEqual([('a1', 'j'), ('j', 'r'), ('r', None)],
+                         sorted({(call[1]['start_offset'], call[1]['end_offset'])
+                                 for call in client.return_value.list_blobs.call_args_list
+                                 if 'start_offset' in call[1]}))
+
+    @mock.patch(f'{storage_client_helper.__name__}.time')
+    @mock.patch('google.cloud.storage.Client')
+    def test_list_blobs_split_timeout_should_cover_the_prefixes_discovery(self, client, time):
+        # Only the clock of the helper moves, by 3 seconds every reading.
+        time.monotonic.side_effect = range(0, 1000, 3)
+        client.return_value.list_blobs.side_effect = \
+            lambda bucket, **kwargs: self.__make_results_iterator(
+                ['a/0', 'b0', 'c0', 'd0', 'e0', 'f0'], **kwargs)
+
+        helper = storage_client_helper.StorageClientHelper('my-project')
+
+        self.assertRaises(exceptions.DeadlineExceeded,
+                          helper.list_blobs_split,
+                          'my-bucket',
+                          2,
+                          timeout=5)
+        client.return_value.list_blobs.assert_called_once()
+        # The page request itself is bounded by the time left.
+        self.assertEqual(2, client.return_value.list_blobs.call_args[1]['timeout'])
+
+    @classmethod
+    def __make_results_iterator(cls,
+                                names,
+                                page_token=None,
+                                prefix=None,
+                                delimiter=None,
+                                start_offset=None,
+                                end_offset=None,
+                                **kwargs):
+        # Pages of two items at most, with the prefixes of the page when
+        # listing with a delimiter.
+        names = [
+            name for name in names if (not start_offset or name >= start_offset) and (
+                not end_offset or name < end_offset) and name.startswith(prefix or '')
+        ]
+        start = int(page_token or 0)
+        page_names = names[start:start + 2]
+        results_iterator = mock.MagicMock()
+        results_iterator.prefixes = set()
+        if delimiter:
+            results_iterator.prefixes = {
+                name[:name.index(delimiter, len(prefix or '')) + 1]
+                for name in page_names if delimiter in name[len(prefix or ''):]
+            }
+            page_names = [name for name in page_names if delimiter not in name[len(prefix or ''):]]
+        results_iterator.next_page_token = str(start + 2) if start + 2 < len(names) else None
+
+        def make_pages():
+            yield [
+                results_iterator.item_to_value(results_iterator, {'name': name})
+                for name in page_names
+            ]
+
+        results_iterator.pages = make_pages()
+        return results_iterator
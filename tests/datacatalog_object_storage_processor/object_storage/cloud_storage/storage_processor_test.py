@@ -0,0 +1,42 @@
+import datetime
+from unittest import TestCase
+from unittest import mock
+
+from google.api_core import exceptions
+
+from datacatalog_object_storage_processor.object_storage.cloud_storage import \
+    storage_client_helper, storage_processor
+
+
+@mock.patch(f'{storage_processor.__name__}.StorageClientHelper')
+class StorageProcessorTest(TestCase):
+
+    def test_create_object_storage_data_should_report_timed_out_buckets(self, helper):
+        fast_bucket = mock.MagicMock()
+        fast_bucket.name = 'fast-bucket'
+        slow_bucket = mock.MagicMock()
+        slow_bucket.name = 'slow-bucket'
+        helper.return_value.list_buckets.return_value = [fast_bucket, slow_bucket]
+        time_updated = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+
+        def list_blobs_pages(bucket, prefix, timeout):
+            self.assertIsNotNone(timeout)
+            yield [storage_client_helper.ListedBlob('a.csv', 10, time_updated, time_updated)]
+            if bucket is slow_bucket:
+                raise exceptions.DeadlineExceeded('listing took too long')
+
+        helper.return_value.list_blobs_pages.side_effect = list_blobs_pages
+
+        records, bucket_stats = storage_processor.StorageProcessor(
+            'my-project').create_object_storage_data(workers=2, bucket_timeout=60)
+
+        self.assertEqual([('fast-bucket', 'a.csv')],
+                         [(record.bucket_name, record.file_name) for record in records])
+        self.assertEqual([{
+            'bucket_name': 'fast-bucket',
+            'files': 1
+        }, {
+            'bucket_name': 'slow-bucket',
+            'files': 0,
+            'timed_out': True
+        }], sorted(bucket_stats, key=lambda stats: stats['bucket_name']))
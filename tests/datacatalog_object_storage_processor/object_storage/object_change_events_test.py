@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor.object_storage import object_change_events
+
+
+class ObjectChangeEventsTest(TestCase):
+
+    def test_from_message_should_decode_the_object_resource(self):
+        event = object_change_events.ObjectChangeEvent.from_message(
+            {
+                'eventType': 'OBJECT_DELETE',
+                'bucketId': 'my-bucket',
+                'objectId': 'a.csv',
+                'overwrittenByGeneration': '2'
+            }, b'{"name": "a.csv", "generation": "1"}')
+
+        self.assertEqual(('my-bucket', 'a.csv'), event.key)
+        self.assertEqual('1', event.resource['generation'])
+        self.assertFalse(event.is_deletion)
+
+    def test_coalesce_should_keep_the_latest_event_of_every_object(self):
+        events = [
+            self.__make_event('OBJECT_FINALIZE', 'a.csv', 2),
+            self.__make_event('OBJECT_FINALIZE', 'a.csv', 1),
+            self.__make_event('OBJECT_FINALIZE', 'b.csv', 1),
+            self.__make_event('OBJECT_DELETE', 'b.csv', 1),
+            self.__make_event('OBJECT_DELETE', 'c.csv', 1, overwritten=True),
+            self.__make_event('OBJECT_FINALIZE', 'c.csv', 2)
+        ]
+
+        changes = object_change_events.ObjectChangeEvent.coalesce(events)
+
+        self.assertEqual([('a.csv', 'OBJECT_FINALIZE', '2'), ('b.csv', 'OBJECT_DELETE', '1'),
+                          ('c.csv', 'OBJECT_FINALIZE', '2')],
+                         [(event.object_name, event.event_type, event.resource['generation'])
+                          for event in changes])
+
+    def test_json_lines_source_should_read_events_in_batches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            with open(path, 'w') as events_file:
+                for name in ['a.csv', 'b.csv', 'c.csv']:
+                    events_file.write(
+                        json.dumps({
+                            'attributes': {
+                                'eventType': 'OBJECT_FINALIZE',
+                                'bucketId': 'my-bucket',
+                                'objectId': name
+                            },
+                            'data': {
+                                'name': name
+                            }
+                        }) + '\n')
+
+            source = object_change_events.JsonLinesEventSource(path, max_events=2)
+            self.assertEqual(2, len(source.pull(5)))
+            self.assertEqual(['c.csv'], [event.object_name for event in source.pull(5)])
+            self.assertIsNone(source.pull(5))
+
+    def test_json_lines_source_should_skip_invalid_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            with open(path, 'w') as events_file:
+                events_file.write(json.dumps({'attributes': {'objectId': 'a.csv'}}) + '\n')
+                events_file.write('{not json\n')
+                events_file.write(
+                    json.dumps({
+                        'attributes': {
+                            'eventType': 'OBJECT_DELETE',
+                            'bucketId': 'my-bucket',
+                            'objectId': 'b.csv'
+                        }
+                    }) + '\n')
+
+            source = object_change_events.JsonLinesEventSource(path)
+            self.assertEqual(['b.csv'], [event.object_name for event in source.pull(5)])
+            self.assertIsNone(source.pull(5))
+
+    @classmethod
+    def __make_event(cls, event_type, name, generation, overwritten=False):
+        return object_change_events.ObjectChangeEvent(event_type, 'my-bucket', name, {
+            'name': name,
+            'generation': str(generation)
+        }, overwritten)
@@ -0,0 +1,80 @@
+import datetime
+from unittest import TestCase
+
+from datacatalog_object_storage_processor.object_storage import object_storage_filter
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ObjectStorageFilterTest(TestCase):
+    __NOW = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+
+    def test_constructor_should_validate_bounds_and_patterns(self):
+        self.assertRaises(ValueError,
+                          object_storage_filter.ObjectStorageFilter,
+                          min_size=10,
+                          max_size=1)
+        self.assertRaises(ValueError,
+                          object_storage_filter.ObjectStorageFilter,
+                          min_age=60,
+                          max_age=1)
+        self.assertRaises(ValueError,
+                          object_storage_filter.ObjectStorageFilter,
+                          include_regex=['('])
+
+    def test_matches_name_should_apply_globs_regexes_and_extensions(self):
+        object_filter = object_storage_filter.ObjectStorageFilter(include=['logs/*.csv'],
+                                                                  exclude=['*/tmp/*'],
+                                                                  exclude_regex=[r'_\d+\.'],
+                                                                  extensions=['.CSV', 'json'])
+
+        self.assertTrue(object_filter.matches_name('logs/2020/a.csv'))
+        self.assertFalse(object_filter.matches_name('logs/tmp/a.csv'))
+        self.assertFalse(object_filter.matches_name('logs/a_1.csv'))
+        self.assertFalse(object_filter.matches_name('data/logs/a.csv'))
+        self.assertFalse(object_filter.matches_name('logs/a.json'))
+
+    def test_filter_records_should_apply_size_and_age_bounds(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append('bucket-1', 'a.csv', 10, None, self.__make_datetime(days=2))
+        records.append('bucket-1', 'b.csv', 1, None, self.__make_datetime(days=2))
+        records.append('bucket-1', 'c.csv', 10, None, self.__make_datetime(hours=1))
+        records.append('bucket-1', 'd.csv', 10, None, self.__make_datetime(days=60))
+
+        object_filter = object_storage_filter.ObjectStorageFilter(min_size=5)
+        self.assertEqual(['a.csv', 'c.csv', 'd.csv'],
+                         [record.file_name for record in object_filter.filter_records(records)])
+
+        object_filter = object_storage_filter.ObjectStorageFilter(min_size=5,
+                                                                  min_age=3600 * 12,
+                                                                  max_age=3600 * 24 * 30)
+        self.assertEqual(['a.csv'], [
+            record.file_name for record in records if object_filter.matches(
+                record.file_name, record.size, record.time_updated, self.__NOW)
+        ])
+
+    def test_get_listing_prefixes_should_drop_covered_prefixes(self):
+        self.assertEqual([None],
+                         object_storage_filter.ObjectStorageFilter().get_listing_prefixes())
+        self.assertEqual(['logs/', 'sales/'],
+                         object_storage_filter.ObjectStorageFilter(
+                             object_prefixes=['sales/', 'logs/', 'logs/2020/', 'sales/'
+                                              ]).get_listing_prefixes())
+        self.assertEqual(['logs/20', 'sales/dt='],
+                         object_storage_filter.ObjectStorageFilter(
+                             include=['sales/dt=*/*.parquet', 'logs/20?0/*', 'logs/2020/*'
+                                      ]).get_listing_prefixes())
+        self.assertEqual([None],
+                         object_storage_filter.ObjectStorageFilter(
+                             include=['*.csv', 'logs/*']).get_listing_prefixes())
+
+    def test_parse_duration_should_convert_units_to_seconds(self):
+        self.assertEqual(90, object_storage_filter.ObjectStorageFilter.parse_duration('90'))
+        self.assertEqual(900, object_storage_filter.ObjectStorageFilter.parse_duration('15m'))
+        self.assertEqual(86400 * 1.5,
+                         object_storage_filter.ObjectStorageFilter.parse_duration('1.5d'))
+        self.assertRaises(ValueError, object_storage_filter.ObjectStorageFilter.parse_duration,
+                          '2w')
+
+    @classmethod
+    def __make_datetime(cls, **age):
+        return cls.__NOW - datetime.timedelta(**age)
@@ -0,0 +1,65 @@
+import datetime
+from unittest import TestCase
+
+from datacatalog_object_storage_processor.object_storage import object_storage_grouping
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ObjectStorageGroupingTest(TestCase):
+
+    def test_constructor_should_require_either_depth_or_pattern(self):
+        self.assertRaises(ValueError, object_storage_grouping.ObjectStorageGrouping)
+        self.assertRaises(ValueError, object_storage_grouping.ObjectStorageGrouping, 1, 'a')
+        self.assertRaises(ValueError, object_storage_grouping.ObjectStorageGrouping, 0)
+
+    def test_get_prefix_should_use_depth_or_pattern(self):
+        by_depth = object_storage_grouping.ObjectStorageGrouping(depth=2)
+        self.assertEqual('sales/dt=2020-05-01/',
+                         by_depth.get_prefix('sales/dt=2020-05-01/part-0.parquet'))
+        self.assertIsNone(by_depth.get_prefix('sales/part-0.parquet'))
+
+        by_pattern = object_storage_grouping.ObjectStorageGrouping(pattern=r'.*/dt=[^/]+/')
+        self.assertEqual('sales/dt=2020-05-01/',
+                         by_pattern.get_prefix('sales/dt=2020-05-01/hour=1/part-0.parquet'))
+        self.assertIsNone(by_pattern.get_prefix('sales/part-0.parquet'))
+
+    def test_group_should_aggregate_records_by_bucket_and_prefix(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append('bucket-1', 'logs/a.csv', 10, None, self.__make_datetime(2))
+        records.append('bucket-1', 'logs/b.json', 5, None, self.__make_datetime(1))
+        records.append('bucket-1', 'README', 1, None, self.__make_datetime(1))
+        records.append('bucket-2', 'logs/c.csv', 7, None, self.__make_datetime(3))
+
+        grouping = object_storage_grouping.ObjectStorageGrouping(depth=1)
+        groups = list(grouping.group(records))
+
+        self.assertEqual([('bucket-1', 'README'), ('bucket-1', 'logs/'), ('bucket-2', 'logs/')],
+                         [(group.bucket_name, getattr(group, 'prefix', None) or group.file_name)
+                          for group in groups])
+        group = groups[1]
+        self.assertEqual((2, 15, ['csv', 'json']),
+                         (group.files_count, group.size, sorted(group.file_types)))
+        self.assertEqual('gs://bucket-1/logs/', group.linked_resource)
+        self.assertEqual(self.__make_datetime(1), group.min_time_updated)
+        self.assertEqual(self.__make_datetime(2), group.time_updated)
+
+    def test_group_should_only_pass_through_end_of_bucket_cursors(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append('bucket-1', 'logs/a.csv', 10, None, self.__make_datetime(1))
+        records.append('bucket-1', 'logs/b.csv', 10, None, self.__make_datetime(1))
+
+        grouping = object_storage_grouping.ObjectStorageGrouping(depth=1)
+        items = list(
+            grouping.group([
+                records[0],
+                object_storage_records.ListingCursor('bucket-1', 'token'), records[1],
+                object_storage_records.ListingCursor('bucket-1', None)
+            ]))
+
+        self.assertEqual(2, len(items))
+        self.assertEqual(2, items[0].files_count)
+        self.assertEqual(object_storage_records.ListingCursor('bucket-1', None), items[1])
+
+    @classmethod
+    def __make_datetime(cls, day):
+        return datetime.datetime(2020, 5, day, tzinfo=datetime.timezone.utc)
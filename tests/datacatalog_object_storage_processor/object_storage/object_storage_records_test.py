@@ -0,0 +1,64 @@
+import datetime
+from unittest import TestCase
+from unittest import mock
+
+from datacatalog_object_storage_processor.object_storage import object_storage_records
+
+
+class ObjectStorageRecordsTest(TestCase):
+
+    def test_append_blobs_should_expose_derived_fields(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append_blobs('my-bucket', [self.__make_blob('dir/my file.csv', 10)])
+
+        record = records[0]
+        self.assertEqual('my-bucket', record.bucket_name)
+        self.assertEqual('cloud_storage', record.system)
+        self.assertEqual('csv', record.file_type)
+        self.assertEqual('gs://my-bucket/dir/my file.csv', record.linked_resource)
+        self.assertEqual('https://storage.googleapis.com/my-bucket/dir/my%20file.csv',
+                         record.public_url)
+        self.assertEqual(10, record.size)
+        self.assertEqual(datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc),
+                         record.time_updated)
+
+    def test_file_type_without_extension_should_return_unknown(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append_blobs('my-bucket', [self.__make_blob('_SUCCESS', 0)])
+
+        self.assertEqual('unknown_file_type', records[0].file_type)
+
+    def test_extend_should_keep_bucket_names(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append_blobs('bucket-1', [self.__make_blob('a.csv', 1)])
+        other_records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        other_records.append_blobs('bucket-2', [self.__make_blob('b.csv', 2)])
+        other_records.append_blobs('bucket-1', [self.__make_blob('c.csv', 3)])
+
+        records.extend(other_records)
+
+        self.assertEqual(3, len(records))
+        self.assertEqual([('bucket-1', 'a.csv'), ('bucket-2', 'b.csv'), ('bucket-1', 'c.csv')],
+                         [(record.bucket_name, record.file_name) for record in records])
+
+    def test_to_dict_should_round_trip_through_from_dict(self):
+        records = object_storage_records.ObjectStorageRecords('cloud_storage')
+        records.append('my-bucket', 'dir/a.csv', 10, None,
+                       datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc))
+
+        record = object_storage_records.ObjectStorageRecord.from_dict(
+            'cloud_storage', records[0].to_dict())
+
+        self.assertEqual(('my-bucket', 'dir/a.csv', 10),
+                         (record.bucket_name, record.file_name, record.size))
+        self.assertIsNone(record.time_created)
+        self.assertEqual(records[0].time_updated, record.time_updated)
+
+    @classmethod
+    def __make_blob(cls, name, size):
+        blob = mock.MagicMock()
+        blob.name = name
+        blob.size = size
+        blob.time_created = datetime.datetime(2020, 4, 1, tzinfo=datetime.timezone.utc)
+        blob.updated = datetime.datetime(2020, 5, 1, tzinfo=datetime.timezone.utc)
+        return blob
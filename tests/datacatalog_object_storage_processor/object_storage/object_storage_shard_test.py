@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from datacatalog_object_storage_processor.object_storage import object_storage_shard
+
+
+class ObjectStorageShardTest(TestCase):
+
+    def test_shards_should_partition_objects(self):
+        shards = [
+            object_storage_shard.ObjectStorageShard(index, 3, 'object') for index in range(3)
+        ]
+        for file_index in range(100):
+            file_name = f'file{file_index}.csv'
+            owners = [shard for shard in shards if shard.owns_object('my-bucket', file_name)]
+            self.assertEqual(1, len(owners))
+
+    def test_shard_by_bucket_should_own_every_object_of_its_buckets(self):
+        shard = object_storage_shard.ObjectStorageShard(0, 2)
+        bucket_name = next(f'bucket-{index}' for index in range(100)
+                           if shard.owns_bucket(f'bucket-{index}'))
+
+        self.assertTrue(shard.owns_object(bucket_name, 'file1.csv'))
+        self.assertTrue(shard.owns_linked_resource(f'gs://{bucket_name}/dir/file2.csv'))
+
+    def test_shard_by_object_should_list_every_bucket(self):
+        shard = object_storage_shard.ObjectStorageShard(1, 4, 'object')
+        self.assertTrue(all(shard.owns_bucket(f'bucket-{index}') for index in range(20)))
+
+    def test_owns_linked_resource_other_system_should_return_false(self):
+        shard = object_storage_shard.ObjectStorageShard(0, 1)
+        self.assertFalse(shard.owns_linked_resource('//bigquery.googleapis.com/projects/p'))
+
+    def test_invalid_shard_index_should_raise_value_error(self):
+        self.assertRaises(ValueError, object_storage_shard.ObjectStorageShard, 2, 2)
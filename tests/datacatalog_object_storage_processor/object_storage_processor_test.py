@@ -0,0 +1,66 @@
+from unittest import TestCase, mock
+
+from datacatalog_object_storage_processor import object_storage_processor
+from datacatalog_object_storage_processor.object_storage import object_change_events
+
+__PATCHED_MODULE = 'datacatalog_object_storage_processor.object_storage_processor'
+
+
+@mock.patch(f'{__PATCHED_MODULE}.StorageProcessor.__init__', lambda self, *args: None)
+@mock.patch(f'{__PATCHED_MODULE}.DataCatalogHelper')
+class ObjectStorageProcessorTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my-group'
+
+    def test_watch_object_changes_should_handle_events_without_payload(self, datacatalog_helper):
+        apply_object_changes = datacatalog_helper.return_value.apply_object_changes
+        apply_object_changes.return_value = []
+        source = self.__EventSource([[
+            self.__make_event('OBJECT_FINALIZE', 'a.csv', b''),
+            self.__make_event('OBJECT_DELETE', 'b.csv', b''),
+            self.__make_event('OBJECT_FINALIZE', 'c.csv', b'{"name": "c.csv", "size": "10"}')
+        ]])
+
+        processor = object_storage_processor.ObjectStorageProcessor('cloud_storage', 'my-project')
+        result = processor.watch_object_changes(self.__ENTRY_GROUP_NAME, source)
+
+        records, deleted_records = apply_object_changes.call_args[0][:2]
+        self.assertEqual(['c.csv'], [record.file_name for record in records])
+        self.assertEqual(['b.csv'], [record.file_name for record in deleted_records])
+        self.assertEqual(['a.csv', 'b.csv', 'c.csv'],
+                         [event.object_name for event in source.acked_events])
+        self.assertEqual((2, 0), result)
+
+    def test_watch_object_changes_should_survive_failed_windows(self, datacatalog_helper):
+        apply_object_changes = datacatalog_helper.return_value.apply_object_changes
+        apply_object_changes.side_effect = [Exception('unexpected'), []]
+        source = self.__EventSource(
+            [[self.__make_event('OBJECT_DELETE', 'a.csv', b'{"name": "a.csv"}')],
+             [self.__make_event('OBJECT_DELETE', 'b.csv', b'{"name": "b.csv"}')]])
+
+        processor = object_storage_processor.ObjectStorageProcessor('cloud_storage', 'my-project')
+        result = processor.watch_object_changes(self.__ENTRY_GROUP_NAME, source)
+
+        self.assertEqual(2, apply_object_changes.call_count)
+        self.assertEqual(['b.csv'], [event.object_name for event in source.acked_events])
+        self.assertEqual((1, 1), result)
+
+    @classmethod
+    def __make_event(cls, event_type, name, data):
+        return object_change_events.ObjectChangeEvent.from_message(
+            {
+                'eventType': event_type,
+                'bucketId': 'my-bucket',
+                'objectId': name
+            }, data)
+
+    class __EventSource:
+
+        def __init__(self, windows):
+            self.__windows = list(windows)
+            self.acked_events = []
+
+        def pull(self, window):
+            return self.__windows.pop(0) if self.__windows else None
+
+        def ack(self, events):
+            self.acked_events.extend(events)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor import shard_manifest
+
+
+class ShardManifestTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my-entry-group'
+
+    def test_write_and_read_should_keep_entries_names(self):
+        manifest = self.__make_manifest(0, 2, ['entry_1', 'entry_2'])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'manifest.jsonl')
+            manifest.write(path)
+            read_manifest = shard_manifest.ShardManifest.read(path)
+
+        self.assertEqual(self.__ENTRY_GROUP_NAME, read_manifest.entry_group_name)
+        self.assertEqual((0, 2), (read_manifest.shard_index, read_manifest.shard_count))
+        self.assertEqual(manifest.entries_names, read_manifest.entries_names)
+        self.assertTrue(read_manifest.complete)
+
+    def test_write_and_read_should_keep_incomplete_flag(self):
+        manifest = shard_manifest.ShardManifest(self.__ENTRY_GROUP_NAME, 1, 2, [], complete=False)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'manifest.jsonl')
+            manifest.write(path)
+            self.assertFalse(shard_manifest.ShardManifest.read(path).complete)
+
+    def test_merge_should_return_entries_of_every_shard(self):
+        entries_names = shard_manifest.ShardManifest.merge(
+            [self.__make_manifest(1, 2, ['entry_2']),
+             self.__make_manifest(0, 2, ['entry_1'])], self.__ENTRY_GROUP_NAME)
+
+        self.assertEqual(
+            {
+                f'{self.__ENTRY_GROUP_NAME}/entries/{entry_id}'
+                for entry_id in ('entry_1', 'entry_2')
+            }, entries_names)
+
+    def test_merge_missing_shard_should_raise_value_error(self):
+        self.assertRaises(ValueError, shard_manifest.ShardManifest.merge,
+                          [self.__make_manifest(0, 2, ['entry_1'])], self.__ENTRY_GROUP_NAME)
+
+    def test_merge_different_shard_counts_should_raise_value_error(self):
+        self.assertRaises(ValueError, shard_manifest.ShardManifest.merge,
+                          [self.__make_manifest(0, 2, []),
+                           self.__make_manifest(1, 3, [])], self.__ENTRY_GROUP_NAME)
+
+    @classmethod
+    def __make_manifest(cls, shard_index, shard_count, entries_ids):
+        return shard_manifest.ShardManifest(
+            cls.__ENTRY_GROUP_NAME, shard_index, shard_count,
+            [f'{cls.__ENTRY_GROUP_NAME}/entries/{entry_id}' for entry_id in entries_ids])
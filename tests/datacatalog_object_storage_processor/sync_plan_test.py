@@ -0,0 +1,52 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor import sync_plan
+
+
+class SyncPlanTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my-entry-group'
+    __TAG_TEMPLATE_NAME = 'projects/my-project/locations/us-central1/tagTemplates/my-template'
+    __OPERATIONS = [{
+        'operation': sync_plan.SyncPlan.CREATE_ENTRY,
+        'entry_id': 'my_file',
+        'record': {
+            'bucket_name': 'my-bucket',
+            'file_name': 'my_file.csv',
+            'size': 10,
+            'time_created': 1588291200.0,
+            'time_updated': None
+        }
+    }, {
+        'operation': sync_plan.SyncPlan.DELETE_ENTRY,
+        'name': f'{__ENTRY_GROUP_NAME}/entries/old_file'
+    }]
+
+    def test_write_and_read_should_keep_operations(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plan.jsonl')
+            sync_plan.SyncPlan.write(path, self.__ENTRY_GROUP_NAME, 'cloud_storage',
+                                     self.__TAG_TEMPLATE_NAME, '2020-05-01T00:00:00+00:00',
+                                     iter(self.__OPERATIONS))
+            plan = sync_plan.SyncPlan.read(path)
+            operations = list(plan.iterate_operations())
+
+        self.assertEqual(self.__ENTRY_GROUP_NAME, plan.entry_group_name)
+        self.assertEqual('cloud_storage', plan.system)
+        self.assertEqual(self.__TAG_TEMPLATE_NAME, plan.tag_template_name)
+        self.assertEqual({'create_entry': 1, 'delete_entry': 1}, plan.operations_counts)
+        self.assertEqual(self.__OPERATIONS, operations)
+
+    def test_read_truncated_plan_should_raise_value_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'plan.jsonl')
+            sync_plan.SyncPlan.write(path, self.__ENTRY_GROUP_NAME, 'cloud_storage',
+                                     self.__TAG_TEMPLATE_NAME, '2020-05-01T00:00:00+00:00',
+                                     self.__OPERATIONS)
+            with open(path) as plan_file:
+                lines = plan_file.readlines()
+            with open(path, 'w') as plan_file:
+                plan_file.writelines(lines[:-1])
+
+            self.assertRaises(ValueError, sync_plan.SyncPlan.read, path)
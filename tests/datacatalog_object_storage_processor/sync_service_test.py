@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+import urllib.request
+from unittest import TestCase
+from unittest import mock
+
+from datacatalog_object_storage_processor import sync_service
+from datacatalog_object_storage_processor import utils
+from datacatalog_object_storage_processor.object_storage_processor import \
+    ObjectStorageProcessor
+
+
+class SyncServiceTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my_entry_group'
+
+    def setUp(self):
+        self.__processor = mock.create_autospec(ObjectStorageProcessor, instance=True)
+        self.__service = sync_service.SyncService(self.__processor, {'workers': 8},
+                                                  max_concurrent_jobs=2,
+                                                  rpc_metrics=utils.RpcMetrics())
+        self.__service.start()
+
+    def tearDown(self):
+        self.__service.stop()
+
+    def test_run_job_should_sync_with_default_options_and_record_status(self):
+        self.__service.add_job('my_job',
+                               self.__ENTRY_GROUP_NAME,
+                               run_now=False,
+                               bucket_prefix='my-bucket')
+        self.assertEqual(sync_service.SyncJob.IDLE, self.__service.get_job('my_job')['state'])
+
+        self.__service.run_job('my_job')
+        job = self.__wait_for_runs('my_job', 1)
+
+        self.__processor.sync_entries.assert_called_once_with(self.__ENTRY_GROUP_NAME,
+                                                              workers=8,
+                                                              bucket_prefix='my-bucket')
+        self.assertEqual(sync_service.SyncJob.SUCCEEDED, job['state'])
+        self.assertIsNone(job['next_run_time'])
+
+    def test_failed_job_should_clear_the_metadata_cache(self):
+        self.__processor.sync_entries.side_effect = ValueError('Invalid bucket')
+        self.__service.add_job('my_job', self.__ENTRY_GROUP_NAME, interval=3600)
+
+        job = self.__wait_for_runs('my_job', 1)
+
+        self.assertEqual(sync_service.SyncJob.FAILED, job['state'])
+        self.assertEqual('Invalid bucket', job['last_error'])
+        self.assertIsNotNone(job['next_run_time'])
+        self.__processor.clear_metadata_cache.assert_called_once()
+
+    def test_add_job_should_validate_options(self):
+        self.__service.add_job('my_job', self.__ENTRY_GROUP_NAME, run_now=False)
+
+        self.assertRaises(ValueError, self.__service.add_job, 'my_job', self.__ENTRY_GROUP_NAME)
+        self.assertRaises(ValueError,
+                          self.__service.add_job,
+                          'other_job',
+                          self.__ENTRY_GROUP_NAME,
+                          unknown_option=True)
+        self.assertRaises(ValueError, self.__service.add_job, 'other_job', self.__ENTRY_GROUP_NAME,
+                          0)
+        self.assertRaises(ValueError,
+                          self.__service.add_job,
+                          'other_job',
+                          self.__ENTRY_GROUP_NAME,
+                          resume=True)
+        # The default options take 8 workers, which the asyncio engine ignores.
+        self.assertRaises(ValueError,
+                          self.__service.add_job,
+                          'other_job',
+                          self.__ENTRY_GROUP_NAME,
+                          engine='asyncio')
+        self.assertRaises(KeyError, self.__service.run_job, 'unknown_job')
+
+    def test_http_server_should_add_run_and_list_jobs(self):
+        server = self.__service.make_http_server('127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        try:
+            request = urllib.request.Request(f'{url}/jobs',
+                                             data=json.dumps({
+                                                 'entry_group_name': self.__ENTRY_GROUP_NAME,
+                                                 'stream': True
+                                             }).encode('utf-8'))
+            with urllib.request.urlopen(request) as response:
+                self.assertEqual(201, response.status)
+                self.assertEqual('my_entry_group', json.load(response)['id'])
+
+            self.__wait_for_runs('my_entry_group', 1)
+            with urllib.request.urlopen(f'{url}/jobs') as response:
+                jobs = json.load(response)['jobs']
+            self.assertEqual(1, jobs[0]['runs_count'])
+
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(
+                    urllib.request.Request(f'{url}/jobs/unknown/run', method='POST'))
+            self.assertEqual(404, context.exception.code)
+
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(
+                    urllib.request.Request(f'{url}/jobs',
+                                           data=json.dumps({
+                                               'entry_group_name': self.__ENTRY_GROUP_NAME,
+                                               'id': 'other_job',
+                                               'state_path': '/etc/state.db'
+                                           }).encode('utf-8')))
+            self.assertEqual(400, context.exception.code)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def __wait_for_runs(self, job_id, runs_count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.__service.get_job(job_id)
+            if job['runs_count'] >= runs_count or time.monotonic() > deadline:
+                return job
+            time.sleep(0.01)
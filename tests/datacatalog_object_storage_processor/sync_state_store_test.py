@@ -0,0 +1,99 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from datacatalog_object_storage_processor import sync_state_store
+
+
+class SyncStateStoreTest(TestCase):
+    __ENTRY_GROUP_NAME = 'projects/my-project/locations/us-central1/entryGroups/my-entry-group'
+
+    def setUp(self):
+        self.__store = sync_state_store.SyncStateStore(':memory:')
+
+    def tearDown(self):
+        self.__store.close()
+
+    def test_has_entries_empty_store_should_return_false(self):
+        self.assertFalse(self.__store.has_entries(self.__ENTRY_GROUP_NAME))
+
+    def test_record_entry_should_store_fingerprint(self):
+        self.__record_entry('my_entry', 'abc')
+
+        self.assertTrue(self.__store.has_entries(self.__ENTRY_GROUP_NAME))
+        self.assertEqual(
+            'abc',
+            self.__store.get_fingerprint(self.__ENTRY_GROUP_NAME, self.__entry_name('my_entry')))
+
+    def test_record_entry_existing_entry_should_replace_fingerprint(self):
+        self.__record_entry('my_entry', 'abc')
+        self.__record_entry('my_entry', 'def')
+
+        self.assertEqual(
+            'def',
+            self.__store.get_fingerprint(self.__ENTRY_GROUP_NAME, self.__entry_name('my_entry')))
+
+    def test_get_fingerprint_unknown_entry_should_return_none(self):
+        self.assertIsNone(
+            self.__store.get_fingerprint(self.__ENTRY_GROUP_NAME, self.__entry_name('unknown')))
+
+    def test_delete_entries_should_remove_only_given_entries(self):
+        self.__record_entry('entry_1', 'abc')
+        self.__record_entry('entry_2', 'def')
+
+        self.__store.delete_entries(self.__ENTRY_GROUP_NAME, [self.__entry_name('entry_1')])
+
+        self.assertEqual([self.__entry_name('entry_2')],
+                         self.__store.list_entries_names(self.__ENTRY_GROUP_NAME))
+
+    def test_start_run_resume_unfinished_run_should_keep_checkpoint(self):
+        self.__store.start_run(self.__ENTRY_GROUP_NAME)
+        self.__store.record_run_entry(self.__ENTRY_GROUP_NAME, self.__entry_name('my_entry'))
+        self.__store.save_listing_cursor(self.__ENTRY_GROUP_NAME, 'my-bucket', 'token')
+
+        self.assertTrue(self.__store.start_run(self.__ENTRY_GROUP_NAME, resume=True))
+        self.assertEqual({'my-bucket': 'token'},
+                         self.__store.get_listing_cursors(self.__ENTRY_GROUP_NAME))
+        self.assertEqual([self.__entry_name('my_entry')],
+                         self.__store.list_run_entries_names(self.__ENTRY_GROUP_NAME))
+
+    def test_start_run_without_resume_should_clear_checkpoint(self):
+        self.__store.start_run(self.__ENTRY_GROUP_NAME)
+        self.__store.save_listing_cursor(self.__ENTRY_GROUP_NAME, 'my-bucket', 'token')
+
+        self.assertFalse(self.__store.start_run(self.__ENTRY_GROUP_NAME))
+        self.assertEqual({}, self.__store.get_listing_cursors(self.__ENTRY_GROUP_NAME))
+
+    def test_finish_run_should_clear_checkpoint_and_mark_run_completed(self):
+        self.__store.start_run(self.__ENTRY_GROUP_NAME)
+        self.__store.record_run_entry(self.__ENTRY_GROUP_NAME, self.__entry_name('my_entry'))
+        self.assertFalse(self.__store.has_completed_run(self.__ENTRY_GROUP_NAME))
+
+        self.__store.finish_run(self.__ENTRY_GROUP_NAME)
+
+        self.assertTrue(self.__store.has_completed_run(self.__ENTRY_GROUP_NAME))
+        self.assertEqual([], self.__store.list_run_entries_names(self.__ENTRY_GROUP_NAME))
+        self.assertFalse(self.__store.start_run(self.__ENTRY_GROUP_NAME, resume=True))
+
+    def test_scoped_stores_sharing_a_file_should_keep_their_own_runs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'state.db')
+            with sync_state_store.SyncStateStore(path, 'shard-0') as store_0, \
+                    sync_state_store.SyncStateStore(path, 'shard-1') as store_1:
+                store_0.start_run(self.__ENTRY_GROUP_NAME)
+                store_0.save_listing_cursor(self.__ENTRY_GROUP_NAME, 'my-bucket', 'token')
+                store_1.start_run(self.__ENTRY_GROUP_NAME)
+                store_1.finish_run(self.__ENTRY_GROUP_NAME)
+
+                self.assertEqual({'my-bucket': 'token'},
+                                 store_0.get_listing_cursors(self.__ENTRY_GROUP_NAME))
+                self.assertFalse(store_0.has_completed_run(self.__ENTRY_GROUP_NAME))
+                self.assertTrue(store_1.has_completed_run(self.__ENTRY_GROUP_NAME))
+
+    def __record_entry(self, entry_id, fingerprint):
+        self.__store.record_entry(self.__ENTRY_GROUP_NAME, self.__entry_name(entry_id),
+                                  f'gs://my-bucket/{entry_id}.csv', 10, 1588291200, fingerprint)
+
+    @classmethod
+    def __entry_name(cls, entry_id):
+        return f'{cls.__ENTRY_GROUP_NAME}/entries/{entry_id}'
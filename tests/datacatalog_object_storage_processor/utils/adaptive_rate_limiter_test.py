@@ -0,0 +1,51 @@
+from unittest import TestCase
+from unittest import mock
+
+from google.api_core import exceptions
+
+from datacatalog_object_storage_processor import utils
+
+
+@mock.patch('time.sleep', lambda seconds: None)
+class AdaptiveRateLimiterTest(TestCase):
+
+    def test_call_should_return_the_function_result(self):
+        limiter = utils.AdaptiveRateLimiter('test')
+        self.assertEqual(3, limiter.call(lambda a, b: a + b, 1, b=2))
+
+    def test_call_throttled_should_retry_and_halve_concurrency(self):
+        limiter = utils.AdaptiveRateLimiter('test', max_concurrency=8)
+        function = mock.MagicMock(side_effect=[exceptions.ResourceExhausted('quota'), 'result'])
+
+        self.assertEqual('result', limiter.call(function))
+        self.assertEqual(2, function.call_count)
+        self.assertEqual(4, limiter.concurrency_limit)
+
+    def test_call_throttled_too_many_times_should_raise(self):
+        limiter = utils.AdaptiveRateLimiter('test', max_retries=2)
+        function = mock.MagicMock(side_effect=exceptions.TooManyRequests('quota'))
+
+        self.assertRaises(exceptions.TooManyRequests, limiter.call, function)
+        self.assertEqual(3, function.call_count)
+
+    def test_call_other_error_should_not_retry(self):
+        limiter = utils.AdaptiveRateLimiter('test')
+        function = mock.MagicMock(side_effect=exceptions.PermissionDenied('denied'))
+
+        self.assertRaises(exceptions.PermissionDenied, limiter.call, function)
+        self.assertEqual(1, function.call_count)
+
+    def test_successful_calls_should_grow_concurrency_back(self):
+        limiter = utils.AdaptiveRateLimiter('test', max_concurrency=4)
+        limiter.on_throttled(1, 'quota')
+        for _ in range(10):
+            limiter.call(lambda: None)
+
+        self.assertEqual(4, limiter.concurrency_limit)
+
+    def test_reserve_should_wait_once_the_burst_is_used(self):
+        limiter = utils.AdaptiveRateLimiter('test', rate=10, burst=2)
+
+        self.assertEqual(0, limiter.reserve())
+        self.assertEqual(0, limiter.reserve())
+        self.assertGreater(limiter.reserve(), 0)
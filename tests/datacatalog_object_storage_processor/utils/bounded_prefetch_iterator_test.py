@@ -0,0 +1,42 @@
+import itertools
+import time
+from unittest import TestCase
+from unittest import mock
+
+from datacatalog_object_storage_processor import utils
+
+
+class BoundedPrefetchIteratorTest(TestCase):
+
+    def test_iterator_should_yield_items_then_raise_producer_errors(self):
+
+        def produce():
+            yield from range(3)
+            raise ValueError('listing failed')
+
+        iterator = utils.BoundedPrefetchIterator(produce(), max_buffered=1)
+
+        self.assertEqual([0, 1, 2], list(itertools.islice(iterator, 3)))
+        self.assertRaises(ValueError, next, iterator)
+        self.assertRaises(StopIteration, next, iterator)
+
+    @mock.patch.object(utils.BoundedPrefetchIterator, '_BoundedPrefetchIterator__POLL_TIMEOUT',
+                       0.01)
+    def test_close_should_stop_the_producer(self):
+        produced_items = []
+
+        def produce():
+            for item in itertools.count():
+                produced_items.append(item)
+                yield item
+
+        iterator = utils.BoundedPrefetchIterator(produce(), max_buffered=1)
+        self.assertEqual(0, next(iterator))
+        iterator.close()
+
+        time.sleep(0.1)
+        produced_count = len(produced_items)
+        time.sleep(0.1)
+        self.assertEqual(produced_count, len(produced_items))
+        self.assertLessEqual(produced_count, 3)
+        self.assertRaises(StopIteration, next, iterator)
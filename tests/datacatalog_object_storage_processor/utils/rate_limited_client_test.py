@@ -0,0 +1,63 @@
+from unittest import TestCase
+from unittest import mock
+
+from google.api_core import exceptions
+
+from datacatalog_object_storage_processor import utils
+
+
+@mock.patch('time.sleep', lambda seconds: None)
+class RateLimitedClientTest(TestCase):
+
+    def setUp(self):
+        self.__client = mock.MagicMock()
+        self.__read_limiter = utils.AdaptiveRateLimiter('read')
+        self.__write_limiter = utils.AdaptiveRateLimiter('write')
+        self.__metrics = utils.RpcMetrics()
+        self.__rate_limited_client = utils.RateLimitedClient(self.__client, self.__read_limiter,
+                                                             self.__write_limiter, self.__metrics,
+                                                             'datacatalog')
+
+    def test_get_limiter_should_route_reads_and_writes(self):
+        self.assertIs(self.__read_limiter, self.__rate_limited_client.get_limiter('list_tags'))
+        self.assertIs(self.__write_limiter, self.__rate_limited_client.get_limiter('create_entry'))
+
+    def test_paged_method_throttled_page_should_be_retried_from_its_token(self):
+        pages = {None: (['tag-1'], 'page-2'), 'page-2': (['tag-2'], None)}
+        results = self.__PagedResults(pages, throttled_tokens=['page-2'])
+        self.__client.list_tags.side_effect = lambda **kwargs: results
+
+        self.assertEqual(['tag-1', 'tag-2'], self.__rate_limited_client.list_tags(parent='entry'))
+        self.assertEqual([None, 'page-2', 'page-2'], results.requested_tokens)
+
+    def test_paged_method_should_record_each_page_request(self):
+        pages = {None: (['entry-1'], 'page-2'), 'page-2': (['entry-2'], None)}
+        results = self.__PagedResults(pages, throttled_tokens=['page-2'])
+        self.__client.list_entries.side_effect = lambda **kwargs: results
+
+        self.__rate_limited_client.list_entries(parent='entry-group')
+
+        summary = self.__metrics.summarize()[0]
+        self.assertEqual('list_entries', summary['method'])
+        self.assertEqual(3, summary['count'])
+        self.assertEqual({'RESOURCE_EXHAUSTED': 1}, summary['errors_by_code'])
+
+    class __PagedResults:
+        # Mimics the page iterators of google-api-core, which only call the
+        # API, hence fail, once consumed.
+
+        def __init__(self, pages, throttled_tokens=()):
+            self.next_page_token = None
+            self.requested_tokens = []
+            self.__pages = pages
+            self.__throttled_tokens = list(throttled_tokens)
+
+        @property
+        def pages(self):
+            page_token = self.next_page_token
+            self.requested_tokens.append(page_token)
+            if page_token in self.__throttled_tokens:
+                self.__throttled_tokens.remove(page_token)
+                raise exceptions.ResourceExhausted('quota')
+            items, self.next_page_token = self.__pages[page_token]
+            yield items
@@ -0,0 +1,20 @@
+from unittest import TestCase
+from unittest import mock
+
+from datacatalog_object_storage_processor import utils
+
+
+class RoundRobinClientPoolTest(TestCase):
+
+    def test_calls_should_be_spread_over_the_clients(self):
+        clients = [mock.MagicMock(), mock.MagicMock()]
+        pool = utils.RoundRobinClientPool(clients)
+
+        for _ in range(4):
+            pool.get_entry('name')
+
+        self.assertEqual(2, clients[0].get_entry.call_count)
+        self.assertEqual(2, clients[1].get_entry.call_count)
+
+    def test_pool_should_require_a_client(self):
+        self.assertRaises(ValueError, utils.RoundRobinClientPool, [])
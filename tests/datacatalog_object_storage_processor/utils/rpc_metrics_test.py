@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest import mock
+
+from google.api_core import exceptions
+
+from datacatalog_object_storage_processor import utils
+
+
+class RpcMetricsTest(TestCase):
+
+    def test_timed_should_record_calls_and_errors_by_code(self):
+        metrics = utils.RpcMetrics()
+        function = mock.MagicMock(side_effect=['entry', exceptions.NotFound('missing')])
+        timed_function = metrics.timed('datacatalog', 'get_entry', function)
+
+        self.assertEqual('entry', timed_function('name'))
+        self.assertRaises(exceptions.NotFound, timed_function, 'name')
+
+        summary = metrics.summarize()[0]
+        self.assertEqual('datacatalog', summary['service'])
+        self.assertEqual('get_entry', summary['method'])
+        self.assertEqual(2, summary['count'])
+        self.assertEqual(1, summary['errors'])
+        self.assertEqual({'NOT_FOUND': 1}, summary['errors_by_code'])
+
+    def test_timed_async_should_record_calls(self):
+        metrics = utils.RpcMetrics()
+
+        async def get_entry(name):
+            return name
+
+        loop = asyncio.new_event_loop()
+        try:
+            timed_get_entry = metrics.timed_async('datacatalog', 'get_entry', get_entry)
+            self.assertEqual('a', loop.run_until_complete(timed_get_entry('a')))
+        finally:
+            loop.close()
+
+        self.assertEqual(1, metrics.summarize()[0]['count'])
+
+    def test_summarize_should_estimate_percentiles_from_buckets(self):
+        metrics = utils.RpcMetrics()
+        for _ in range(98):
+            metrics.record('storage', 'list_blobs', 0.003)
+        metrics.record('storage', 'list_blobs', 0.2)
+        metrics.record('storage', 'list_blobs', 60)
+
+        summary = metrics.summarize()[0]
+        self.assertEqual(0.005, summary['p50_seconds'])
+        self.assertEqual(0.25, summary['p99_seconds'])
+        self.assertEqual(60, summary['max_seconds'])
+        self.assertEqual(1, summary['latency_buckets']['+Inf'])
+
+    def test_to_prometheus_should_render_counters_and_cumulative_histograms(self):
+        metrics = utils.RpcMetrics()
+        metrics.record('storage', 'list_blobs', 0.003)
+        metrics.record('storage', 'list_blobs', 0.2, 'RESOURCE_EXHAUSTED')
+
+        lines = metrics.to_prometheus().splitlines()
+        labels = 'service="storage",method="list_blobs"'
+        self.assertIn(f'datacatalog_object_storage_rpc_calls_total{{{labels},code="OK"}} 1', lines)
+        self.assertIn(
+            f'datacatalog_object_storage_rpc_calls_total{{{labels},code="RESOURCE_EXHAUSTED"}} 1',
+            lines)
+        self.assertIn(
+            f'datacatalog_object_storage_rpc_latency_seconds_bucket{{{labels},'
+            f'le="0.1"}} 1', lines)
+        self.assertIn(
+            f'datacatalog_object_storage_rpc_latency_seconds_bucket{{{labels},'
+            f'le="+Inf"}} 2', lines)
+        self.assertIn(f'datacatalog_object_storage_rpc_latency_seconds_count{{{labels}}} 2', lines)
+
+    def test_write_should_pick_the_format_from_the_extension(self):
+        metrics = utils.RpcMetrics()
+        metrics.record('datacatalog', 'create_entry', 0.05)
+
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, 'metrics.json')
+            prometheus_path = os.path.join(directory, 'metrics.prom')
+            utils.MetricsExporter(metrics, json_path).stop()
+            utils.MetricsExporter(metrics, prometheus_path).stop()
+
+            with open(json_path) as json_file:
+                self.assertEqual(1, json.load(json_file)['rpcs'][0]['count'])
+            with open(prometheus_path) as prometheus_file:
+                self.assertTrue(prometheus_file.read().startswith('# HELP'))
+            self.assertEqual(['metrics.json', 'metrics.prom'], sorted(os.listdir(directory)))
+
+    @mock.patch('urllib.request.urlopen')
+    def test_exporter_should_push_prometheus_text(self, urlopen):
+        metrics = utils.RpcMetrics()
+        metrics.record('datacatalog', 'create_entry', 0.05)
+
+        with utils.MetricsExporter(metrics, push_url='http://pushgateway:9091/metrics/job/sync'):
+            pass
+
+        request = urlopen.call_args[0][0]
+        self.assertEqual('PUT', request.get_method())
+        self.assertIn(b'method="create_entry"', request.data)
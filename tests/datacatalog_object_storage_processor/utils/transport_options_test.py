@@ -0,0 +1,35 @@
+from unittest import TestCase
+from unittest import mock
+
+from datacatalog_object_storage_processor import utils
+
+
+class TransportOptionsTest(TestCase):
+
+    @mock.patch('google.cloud.storage.Client')
+    @mock.patch('google.cloud.datacatalog_v1.DataCatalogClient')
+    def test_default_options_should_make_default_clients(self, datacatalog_client, storage_client):
+        transport_options = utils.TransportOptions()
+
+        self.assertEqual(datacatalog_client.return_value,
+                         transport_options.make_datacatalog_client())
+        self.assertEqual(storage_client.return_value,
+                         transport_options.make_storage_client('my-project'))
+        datacatalog_client.assert_called_once_with()
+        storage_client.assert_called_once_with(project='my-project')
+
+    def test_grpc_channel_options_should_not_share_connections(self):
+        options = dict(
+            utils.TransportOptions(grpc_channels=4,
+                                   keepalive_seconds=30).make_grpc_channel_options(2))
+
+        self.assertEqual(1, options['grpc.use_local_subchannel_pool'])
+        self.assertEqual(2, options['grpc.channel_pool_index'])
+        self.assertEqual(30000, options['grpc.keepalive_time_ms'])
+        options = dict(utils.TransportOptions(grpc_channels=4).make_grpc_channel_options(0))
+        self.assertNotIn('grpc.keepalive_time_ms', options)
+
+    def test_invalid_options_should_raise_value_error(self):
+        self.assertRaises(ValueError, utils.TransportOptions, grpc_channels=0)
+        self.assertRaises(ValueError, utils.TransportOptions, keepalive_seconds=0)
+        self.assertRaises(ValueError, utils.TransportOptions, http_pool_size=0)